@@ -0,0 +1,106 @@
+"""
+Benchmark of the Memory Used by Chart Rendering
+
+This script renders thousands of energy usage charts with website/chart_renderer.py and checks that the resident
+memory (RSS) of the process stays flat. The first renders warm up matplotlib's caches, so memory is measured
+from the end of the warm-up. The script exits with status 1 if the memory grew by more than the allowed limit,
+which makes it usable as a regression check before a release.
+tests/test_chart_memory.py runs the same check on fewer renders with tracemalloc.
+
+Usage Example:
+    python benchmarks/chart_memory.py --renders 5000 --threads 4 --max-growth-mb 20
+
+Requirements:
+    - Python 3.12
+    - numpy, pandas and matplotlib libraries
+    - Linux (the RSS is read from /proc/self/statm)
+    - The configuration needed to import the website package ('appconfig.json', website/secret.py);
+      the database is not used
+"""
+
+import argparse
+import datetime
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from website.chart_renderer import render_chart  # noqa: E402
+
+PAGE_SIZE: int = os.sysconf("SC_PAGE_SIZE")
+
+
+def get_rss_mb() -> float:
+    """
+    Returns the resident memory of the process in megabytes.
+
+    Returns:
+        float: The resident set size in MB.
+    """
+    with open("/proc/self/statm", "r") as file:
+        return int(file.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+def render_random_chart(number: int) -> int:
+    """
+    Renders a one-day line chart or a 30-day bar chart of random readings.
+
+    Parameters:
+        number (int): The number of the render; even numbers draw a line chart, odd numbers a bar chart.
+
+    Returns:
+        int: The size of the base64-encoded PNG image.
+    """
+    rng = np.random.default_rng(number)
+    day = datetime.date(2024, 5, 1)
+    if number % 2 == 0:
+        times = np.arange(
+            np.datetime64("2024-05-01T00:00"),
+            np.datetime64("2024-05-02T00:00"),
+            np.timedelta64(15, "m"),
+        )
+        return len(render_chart(times, rng.random(len(times)), day, day))
+    times = np.arange("2024-05-01", "2024-05-31", dtype="datetime64[D]")
+    end_day = day + datetime.timedelta(days=29)
+    return len(render_chart(times, rng.random(len(times)) * 20, day, end_day))
+
+
+def run(renders: int, warm_up: int, threads: int) -> float:
+    """
+    Renders the charts and reports the memory growth after the warm-up.
+
+    Parameters:
+        renders (int): The number of measured renders.
+        warm_up (int): The number of renders before the first measurement.
+        threads (int): The number of threads rendering at the same time.
+
+    Returns:
+        float: The growth of the resident memory in MB.
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(render_random_chart, range(warm_up)))
+        baseline: float = get_rss_mb()
+        print(f"RSS after {warm_up} warm-up renders: {baseline:.1f} MB")
+        for checkpoint in range(1, 5):
+            start, end = renders * (checkpoint - 1) // 4, renders * checkpoint // 4
+            list(executor.map(render_random_chart, range(start, end)))
+            print(f"RSS after {end} renders: {get_rss_mb():.1f} MB")
+    growth: float = get_rss_mb() - baseline
+    print(f"RSS growth: {growth:+.1f} MB over {renders} renders")
+    return growth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that chart rendering does not leak memory."
+    )
+    parser.add_argument("--renders", type=int, default=3000)
+    parser.add_argument("--warm-up", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--max-growth-mb", type=float, default=20.0)
+    arguments = parser.parse_args()
+    memory_growth: float = run(arguments.renders, arguments.warm_up, arguments.threads)
+    sys.exit(1 if memory_growth > arguments.max_growth_mb else 0)
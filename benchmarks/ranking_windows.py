@@ -0,0 +1,242 @@
+"""
+Check of the Ranking Windows against the Previous Ranking Queries
+
+This script checks the half-open time windows of website/time_windows.py on a live database:
+
+1. Results: for every day with started challenges (or a sample of them), the day, week and month rankings computed
+   with the windows are compared with the previous queries, which filtered with
+   `extract(day/month/year from start_date)` (and `BETWEEN` Monday and Sunday for weeks).
+2. Plans: the window condition is explained with sequential scans disabled, and the plan must contain
+   an index range scan of `ix_customizedchallenge_start_date` with `start_date` in its index condition.
+   The `extract()` filter is explained too, for comparison.
+
+The script exits with status 1 if a ranking differs or the index is not used for a range scan.
+tests/test_time_windows.py runs both checks as the `db` tests, with MYENERGY_TEST_DATABASE_URI.
+
+Usage Example:
+    python benchmarks/ranking_windows.py --days 60
+
+Requirements:
+    - Python 3.12
+    - A PostgreSQL database with the website tables and some customized challenges
+    - The configuration needed to import the website package ('appconfig.json', website/secret.py)
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import and_, extract, func, select, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from website import create_app, db  # noqa: E402
+from website.models import CustomizedChallenge  # noqa: E402
+from website.time_windows import TimeWindow, get_window  # noqa: E402
+
+START_DATE_INDEX: str = "ix_customizedchallenge_start_date"
+
+
+def window_points(window: TimeWindow) -> dict:
+    """
+    Sums up the points of every client in a window with the half-open range condition.
+
+    Parameters:
+        window (TimeWindow): The window of the start dates.
+
+    Returns:
+        dict: The points by client ID.
+    """
+    return dict(
+        db.session.execute(
+            select(
+                CustomizedChallenge.id_client,
+                func.sum(CustomizedChallenge.points_scored),
+            )
+            .where(window.condition(CustomizedChallenge.start_date))
+            .group_by(CustomizedChallenge.id_client)
+        ).all()
+    )
+
+
+def extract_condition(period: str, day: date):
+    """
+    Builds the condition of the previous ranking queries for a period.
+
+    Parameters:
+        period (str): 'day', 'week' or 'month'.
+        day (date): A day of the period.
+
+    Returns:
+        ColumnElement: The condition on `start_date`.
+    """
+    start_date = CustomizedChallenge.start_date
+    if period == "week":
+        start_of_week = day - timedelta(days=day.weekday())
+        return start_date.between(start_of_week, start_of_week + timedelta(days=6))
+    conditions = [
+        extract("month", start_date) == day.month,
+        extract("year", start_date) == day.year,
+    ]
+    if period == "day":
+        conditions.append(extract("day", start_date) == day.day)
+    return and_(*conditions)
+
+
+def extract_points(period: str, day: date) -> dict:
+    """
+    Sums up the points of every client in a period with the previous `extract()` conditions.
+
+    Parameters:
+        period (str): 'day', 'week' or 'month'.
+        day (date): A day of the period.
+
+    Returns:
+        dict: The points by client ID.
+    """
+    return dict(
+        db.session.execute(
+            select(
+                CustomizedChallenge.id_client,
+                func.sum(CustomizedChallenge.points_scored),
+            )
+            .where(extract_condition(period, day))
+            .group_by(CustomizedChallenge.id_client)
+        ).all()
+    )
+
+
+def compare_rankings(days: int) -> int:
+    """
+    Compares the rankings of the windows with the previous queries for the days with started challenges.
+
+    Parameters:
+        days (int): The maximum number of days checked, spread evenly over the days with challenges.
+
+    Returns:
+        int: The number of rankings that differ.
+    """
+    start_days: list = sorted(
+        {
+            row[0]
+            for row in db.session.execute(
+                select(func.date(CustomizedChallenge.start_date)).distinct()
+            )
+            if row[0] is not None
+        }
+    )
+    step: int = max(len(start_days) // days, 1)
+    differences: int = 0
+    checked: int = 0
+    for day in start_days[::step]:
+        for period in ("day", "week", "month"):
+            checked += 1
+            expected, actual = extract_points(period, day), window_points(
+                get_window(period, day)
+            )
+            if expected != actual:
+                differences += 1
+                print(
+                    f"{period} of {day}: {len(expected)} clients with extract(), "
+                    f"{len(actual)} with the window"
+                )
+    print(f"Rankings compared: {checked}, different: {differences}")
+    return differences
+
+
+def explain(condition) -> dict:
+    """
+    Explains a query counting the challenges matching a condition, with sequential scans disabled.
+
+    Parameters:
+        condition (ColumnElement): The condition on `start_date`.
+
+    Returns:
+        dict: The root node of the JSON plan.
+    """
+    query = select(func.count()).where(condition)
+    compiled = query.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    db.session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    db.session.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def find_range_scan(node: dict) -> dict | None:
+    """
+    Finds a scan of the start date index with `start_date` in its index condition.
+
+    Parameters:
+        node (dict): A node of a JSON plan.
+
+    Returns:
+        dict | None: The scan node, or None if the plan has no such scan.
+    """
+    if node.get("Index Name") == START_DATE_INDEX and "start_date" in node.get(
+        "Index Cond", ""
+    ):
+        return node
+    for child in node.get("Plans", []):
+        found = find_range_scan(child)
+        if found is not None:
+            return found
+    return None
+
+
+def describe(node: dict) -> str:
+    """
+    Describes the node types of a plan, from the root down.
+
+    Parameters:
+        node (dict): The root node of a JSON plan.
+
+    Returns:
+        str: The node types separated by arrows.
+    """
+    types = [node["Node Type"]]
+    while node.get("Plans"):
+        node = node["Plans"][0]
+        types.append(node["Node Type"])
+    return " -> ".join(types)
+
+
+def check_plans() -> int:
+    """
+    Checks that every window condition is served by an index range scan on `start_date`.
+
+    Returns:
+        int: The number of window conditions without an index range scan.
+    """
+    today: date = date.today()
+    failures: int = 0
+    for period in ("day", "week", "month"):
+        window_plan = explain(
+            get_window(period, today).condition(CustomizedChallenge.start_date)
+        )
+        scan = find_range_scan(window_plan)
+        extract_plan = explain(extract_condition(period, today))
+        print(f"{period}: window  {describe(window_plan)}")
+        print(f"{period}: extract {describe(extract_plan)}")
+        if scan is None:
+            failures += 1
+            print(f"{period}: no index range scan of {START_DATE_INDEX}")
+        else:
+            print(f"{period}: index condition {scan['Index Cond']}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the ranking windows against the previous ranking queries."
+    )
+    parser.add_argument("--days", type=int, default=60)
+    arguments = parser.parse_args()
+    with create_app().app_context():
+        failed: int = compare_rankings(arguments.days) + check_plans()
+    sys.exit(1 if failed else 0)
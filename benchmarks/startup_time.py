@@ -0,0 +1,80 @@
+"""
+Benchmark of the Start-up Time of the Website
+
+This script measures how long a fresh Python process takes to import the website and build the app with
+`create_app`, which is what every new web worker pays before serving its first request. Every run is a new process,
+so no import is cached between runs. It also measures the first import of the chart renderer (matplotlib and pandas),
+which is deferred to the first chart, and reports whether those libraries were loaded at start-up.
+
+The schema check is skipped (MYENERGY_SCHEMA_CHECK=skip), so no database is needed.
+
+Usage Example:
+    python benchmarks/startup_time.py --runs 10
+
+Requirements:
+    - Python 3.12
+    - The configuration needed to import the website package ('appconfig.json', website/secret.py)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT: str = """
+import json, sys, time
+start = time.perf_counter()
+from website import create_app
+create_app()
+startup = time.perf_counter() - start
+eager = {name: name in sys.modules for name in ("pandas", "matplotlib")}
+start = time.perf_counter()
+import website.chart_renderer
+first_chart_import = time.perf_counter() - start
+print(json.dumps({"startup": startup, "first_chart_import": first_chart_import, "eager": eager}))
+"""
+
+
+def measure_startup() -> dict:
+    """
+    Starts the website in a new process and measures its start-up.
+
+    Returns:
+        dict: The start-up time, the time of the first chart renderer import (in seconds)
+              and whether pandas and matplotlib were imported at start-up.
+    """
+    environment: dict = {**os.environ, "MYENERGY_SCHEMA_CHECK": "skip"}
+    output: str = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=ROOT_DIR,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the start-up time of the website."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    arguments = parser.parse_args()
+    results: list[dict] = [measure_startup() for _ in range(arguments.runs)]
+    startup_times: list[float] = [result["startup"] for result in results]
+    chart_import_times: list[float] = [
+        result["first_chart_import"] for result in results
+    ]
+    print(
+        f"create_app: median {statistics.median(startup_times) * 1000:.0f} ms, "
+        f"min {min(startup_times) * 1000:.0f} ms over {arguments.runs} runs"
+    )
+    print(
+        f"first chart import: median {statistics.median(chart_import_times) * 1000:.0f} ms"
+    )
+    print(f"imported at start-up: {results[-1]['eager']}")
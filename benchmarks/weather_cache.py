@@ -0,0 +1,125 @@
+"""
+Benchmark of the Weather Cache against a Slow Weather API
+
+This script runs many concurrent weather lookups for a handful of cities through website/weather.py against the stub
+server from benchmarks/weather_stub_server.py, which answers after a delay. It reports the latency of the lookups
+and the number of API calls in three phases:
+
+1. Cold: every city is missing, and the concurrent misses of a city must share one API call.
+2. Warm: every city is fresh, so no API call is made.
+3. Stale: the TTL has passed, so the lookups must be answered from the stale values
+   while one background refresh per city runs.
+
+The script exits with status 1 if a city was fetched more than once in a phase or if a stale lookup waited
+for the API.
+
+Usage Example:
+    python benchmarks/weather_cache.py --threads 32 --lookups 50 --cities 10 --delay 0.5
+
+Requirements:
+    - Python 3.12
+    - requests library
+    - The configuration needed to import the website package ('appconfig.json', website/secret.py);
+      the database is not used
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.weather_stub_server import start_stub_server  # noqa: E402
+from website.weather import WeatherCache, fetch_current_weather  # noqa: E402
+
+
+def run_phase(
+    name: str,
+    cache: WeatherCache,
+    server,
+    cities: list[str],
+    threads: int,
+    lookups: int,
+) -> tuple[float, int]:
+    """
+    Runs concurrent lookups of the cities and reports their latency and the API calls.
+
+    Parameters:
+        name (str): The name of the phase.
+        cache (WeatherCache): The weather cache.
+        server (ThreadingHTTPServer): The stub server.
+        cities (list[str]): The cities looked up in turn.
+        threads (int): The number of threads looking up at the same time.
+        lookups (int): The number of lookups per thread.
+
+    Returns:
+        tuple[float, int]: The slowest lookup in seconds and the largest number of API calls for one city.
+    """
+
+    def look_up(number: int) -> float:
+        start = time.perf_counter()
+        cache.get(cities[number % len(cities)])
+        return time.perf_counter() - start
+
+    server.calls.clear()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = sorted(executor.map(look_up, range(threads * lookups)))
+    time.sleep(server.delay * 2)  # let the background refreshes finish
+    calls = max(server.calls.values(), default=0)
+    print(
+        f"{name:>5}: {len(latencies)} lookups, p50 {statistics.median(latencies) * 1000:.1f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms, "
+        f"API calls {sum(server.calls.values())} (at most {calls} per city)"
+    )
+    return latencies[-1], calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the weather cache against a slow weather API."
+    )
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--ttl", type=float, default=2.0)
+    arguments = parser.parse_args()
+
+    stub_server = start_stub_server(delay=arguments.delay)
+    base_url = f"http://127.0.0.1:{stub_server.server_address[1]}/v1"
+    weather_cache = WeatherCache(
+        partial(
+            fetch_current_weather,
+            base_url=base_url,
+            api_key="stub",
+            timeout=arguments.delay * 4,
+        ),
+        ttl=arguments.ttl,
+        stale_ttl=60,
+    )
+    city_names = [f"City {number}" for number in range(arguments.cities)]
+    phase = partial(
+        run_phase,
+        cache=weather_cache,
+        server=stub_server,
+        cities=city_names,
+        threads=arguments.threads,
+        lookups=arguments.lookups,
+    )
+    _, cold_calls = phase("cold")
+    _, warm_calls = phase("warm")
+    time.sleep(arguments.ttl)
+    stale_max, stale_calls = phase("stale")
+    print(f"cache: {weather_cache.stats()}")
+    stub_server.shutdown()
+    failed = (
+        cold_calls > 1
+        or warm_calls > 0
+        or stale_calls > 1
+        or stale_max >= arguments.delay
+    )
+    sys.exit(1 if failed else 0)
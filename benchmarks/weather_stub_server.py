@@ -0,0 +1,143 @@
+"""
+Stub of the WeatherAPI for Benchmarks and Local Development
+
+This script serves `GET /v1/current.json?key=...&q=<city>` like https://www.weatherapi.com/, without the network and
+without an API key quota. The weather of a city is derived from its name, so it is the same on every call.
+The server can answer slowly or fail on purpose, to show how the website behaves with a slow or broken API,
+and it counts the calls per city (`GET /stats`, reset with `POST /stats/reset`).
+
+Point the website at it with:
+    MYENERGY_WEATHER_API_URL=http://localhost:8765/v1 python app.py
+
+Usage Example:
+    python benchmarks/weather_stub_server.py --port 8765 --delay 0.5 --failure-rate 0.1
+
+Requirements:
+    - Python 3.12
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class WeatherStubHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests of the stub server; its settings and counters are attributes of the server.
+    """
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            with self.server.lock:
+                self.send_json(200, {"calls": dict(self.server.calls)})
+            return
+        if url.path != "/v1/current.json":
+            self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        city = parse_qs(url.query).get("q", [""])[0]
+        with self.server.lock:
+            self.server.calls[city] += 1
+        time.sleep(self.server.delay)
+        if random.random() < self.server.failure_rate:
+            self.send_json(503, {"error": {"code": 9999, "message": "Internal error"}})
+        elif not city:
+            self.send_json(
+                400, {"error": {"code": 1003, "message": "Parameter q is missing."}}
+            )
+        else:
+            self.send_json(200, get_stub_weather(city))
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path != "/stats/reset":
+            self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        with self.server.lock:
+            self.server.calls.clear()
+        self.send_json(200, {"calls": {}})
+
+    def send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def get_stub_weather(city: str) -> dict:
+    """
+    Returns a response of the current weather of a city, derived from its name.
+
+    Parameters:
+        city (str): The name of the city.
+
+    Returns:
+        dict: A response shaped like the WeatherAPI `current.json` response.
+    """
+    seed = int(hashlib.sha256(city.lower().encode("utf-8")).hexdigest(), 16)
+    return {
+        "location": {"name": city},
+        "current": {
+            "temp_c": round(-5 + seed % 300 / 10, 1),
+            "humidity": 30 + seed // 300 % 60,
+            "wind_kph": round(seed // 18000 % 400 / 10, 1),
+        },
+    }
+
+
+def start_stub_server(
+    port: int = 0,
+    delay: float = 0.0,
+    failure_rate: float = 0.0,
+    verbose: bool = False,
+) -> ThreadingHTTPServer:
+    """
+    Starts the stub server in a background thread.
+
+    Parameters:
+        port (int, optional): The port to listen on; 0 picks a free one. Default is 0.
+        delay (float, optional): The number of seconds every weather request takes. Default is 0.
+        failure_rate (float, optional): The share of weather requests answered with an error. Default is 0.
+        verbose (bool, optional): Whether requests are logged. Default is False.
+
+    Returns:
+        ThreadingHTTPServer: The running server; its address is `server.server_address`,
+                             its calls per city are `server.calls`. Stop it with `server.shutdown()`.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), WeatherStubHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.failure_rate = failure_rate
+    server.verbose = verbose
+    server.calls = Counter()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stub of the WeatherAPI.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    arguments = parser.parse_args()
+    stub_server = start_stub_server(
+        arguments.port, arguments.delay, arguments.failure_rate, verbose=True
+    )
+    print(f"Weather stub listening on http://127.0.0.1:{arguments.port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub_server.shutdown()
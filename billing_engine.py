@@ -0,0 +1,203 @@
+"""
+Script for Generating Monthly Invoices in a PostgreSQL Database
+
+This script defines a `BillingEngine` class that creates the invoices of a closed month for all meters in one pass.
+The work is done by the set-based `generate_invoices` SQL function (database_myenergy/billing.sql), which reads
+the month's usage of every meter with readings in the month from the monthly rollup and prices it with the meter's offer.
+Meters without readings get no invoice. A meter has at most one invoice per month (a unique constraint), and meters that
+already have one are skipped, so running the engine twice, or with overlapping ranges at the same time, is safe.
+The meters can be split into ranges that are billed by several worker processes at the same time.
+
+Classes:
+    BillingEngine: A class to generate monthly invoices.
+
+Functions:
+    open_connection_with_db, close_connection_with_db: Inherited from DatabaseConnection (database_connection.py).
+    get_previous_billing_period: Returns the first day of the last closed month.
+    get_all_meters: Retrieves all meter IDs from the database.
+    generate_invoices: Creates the invoices of a month for all meters or a range of meters.
+
+Module functions:
+    generate_invoices_for_shard: Bills one range of meters over its own database connection.
+    parallel_generate_invoices: Bills a month with several worker processes sharded by meter range.
+
+Usage Example:
+    billing_engine = BillingEngine()
+    billing_engine.generate_invoices(datetime.date(2024, 4, 1))
+    billing_engine.close_connection_with_db()
+
+    python billing_engine.py --billing-period 2024-04 --workers 4
+
+Requirements:
+    - Python 3.12
+    - psycopg2 library
+    - A PostgreSQL database with the `generate_invoices` function from database_myenergy/billing.sql
+      and the consumption rollups from database_myenergy/rollups.sql
+    - A configuration file named 'appconfig.json' with database connection details
+"""
+
+import argparse
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from database_connection import DatabaseConnection
+from sharding import split_into_shards
+
+
+class BillingEngine(DatabaseConnection):
+    @staticmethod
+    def get_previous_billing_period(
+        today: datetime.date | None = None,
+    ) -> datetime.date:
+        """
+        Returns the first day of the last closed month.
+
+        Parameters:
+            today (date, optional): The reference date. Default is today.
+
+        Returns:
+            date: The first day of the month before `today`.
+
+        Example usage:
+            BillingEngine.get_previous_billing_period(datetime.date(2024, 5, 14))  # 2024-04-01
+        """
+        today = today or datetime.date.today()
+        last_day_of_previous_month: datetime.date = today.replace(
+            day=1
+        ) - datetime.timedelta(days=1)
+        return last_day_of_previous_month.replace(day=1)
+
+    def get_all_meters(self) -> list[int]:
+        """
+        Retrieves all meter IDs from the database.
+
+        Returns:
+            list[int]: A list of meter IDs.
+        """
+        query: str = "SELECT id_meter FROM meter"
+        self.db_cursor.execute(query)
+        return [row[0] for row in self.db_cursor.fetchall()]
+
+    def generate_invoices(
+        self,
+        billing_period: datetime.date,
+        id_meter_from: int | None = None,
+        id_meter_to: int | None = None,
+    ) -> int:
+        """
+        Creates the invoices of a month for all meters or a range of meters.
+
+        The month's usage is read from the monthly rollup and priced in a single set-based statement, and the invoices are
+        committed in one transaction. Meters without readings in the month are not billed, and meters that already have
+        an invoice for the month are skipped (ON CONFLICT DO NOTHING on the unique constraint), so the method is
+        idempotent, also when runs overlap.
+
+        Parameters:
+            billing_period (date): Any day of the month to bill; the month must be closed.
+            id_meter_from (int, optional): The first meter ID of the range (inclusive). Default is no lower bound.
+            id_meter_to (int, optional): The last meter ID of the range (inclusive). Default is no upper bound.
+
+        Returns:
+            int: The number of invoices created.
+
+        Raises:
+            ValueError: If the month is not closed yet.
+
+        Example usage:
+            created = self.generate_invoices(datetime.date(2024, 4, 1), 1, 5000)
+        """
+        billing_period = billing_period.replace(day=1)
+        if billing_period > self.get_previous_billing_period():
+            raise ValueError(f"The month {billing_period:%Y-%m} is not closed yet")
+        query: str = "SELECT generate_invoices(%s, %s, %s)"
+        self.db_cursor.execute(query, (billing_period, id_meter_from, id_meter_to))
+        created_invoices: int = self.db_cursor.fetchone()[0]
+        self.db_connection.commit()
+        print(
+            f"{created_invoices} invoices created for {billing_period:%Y-%m} "
+            f"(meters {id_meter_from or 'first'}-{id_meter_to or 'last'})"
+        )
+        return created_invoices
+
+
+def generate_invoices_for_shard(
+    billing_period: datetime.date, id_meter_from: int, id_meter_to: int
+) -> int:
+    """
+    Bills one range of meters over its own database connection.
+
+    This function runs in a worker process.
+
+    Parameters:
+        billing_period (date): Any day of the month to bill.
+        id_meter_from (int): The first meter ID of the range (inclusive).
+        id_meter_to (int): The last meter ID of the range (inclusive).
+
+    Returns:
+        int: The number of invoices created.
+    """
+    billing_engine = BillingEngine()
+    try:
+        return billing_engine.generate_invoices(
+            billing_period, id_meter_from, id_meter_to
+        )
+    finally:
+        billing_engine.close_connection_with_db()
+
+
+def parallel_generate_invoices(
+    billing_period: datetime.date, workers: int = os.cpu_count() or 1
+) -> int:
+    """
+    Bills a month with several worker processes sharded by meter range.
+
+    Parameters:
+        billing_period (date): Any day of the month to bill.
+        workers (int, optional): The number of worker processes. Default is the number of CPUs.
+
+    Returns:
+        int: The total number of invoices created.
+
+    Example usage:
+        parallel_generate_invoices(datetime.date(2024, 4, 1), workers=4)
+    """
+    billing_engine = BillingEngine()
+    try:
+        all_meters: list[int] = billing_engine.get_all_meters()
+    finally:
+        billing_engine.close_connection_with_db()
+    shards: list[list[int]] = split_into_shards(all_meters, workers)
+    with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+        futures = [
+            executor.submit(
+                generate_invoices_for_shard, billing_period, shard[0], shard[-1]
+            )
+            for shard in shards
+        ]
+        created_invoices: int = sum(future.result() for future in futures)
+    print(f"{created_invoices} invoices created for {billing_period:%Y-%m} in total")
+    return created_invoices
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate monthly invoices.")
+    parser.add_argument(
+        "--billing-period",
+        type=lambda value: datetime.datetime.strptime(value, "%Y-%m").date(),
+        default=BillingEngine.get_previous_billing_period(),
+        help="the month to bill as YYYY-MM (default: the previous month)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="the number of worker processes sharded by meter range (default: 1)",
+    )
+    arguments = parser.parse_args()
+    if arguments.workers > 1:
+        parallel_generate_invoices(arguments.billing_period, arguments.workers)
+    else:
+        billing_engine = BillingEngine()
+        billing_engine.generate_invoices(arguments.billing_period)
+        billing_engine.close_connection_with_db()
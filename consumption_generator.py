@@ -8,15 +8,27 @@ generate consumption data, and insert multiple records efficiently.
 Classes:
     ConsumptionGenerator: A class to generate and manage energy consumption readings.
 
+Module functions:
+    backfill_shard: Backfills the readings of one shard of meters over its own database connection.
+    parallel_backfill_readings: Backfills readings with several worker processes sharded by meter range.
+
 Functions:
-    __init__: Initializes the ConsumptionGenerator instance and sets up the database connection.
-    open_connection_with_db: Opens a connection with the PostgreSQL database.
-    close_connection_with_db: Closes the connection with the PostgreSQL database.
+    open_connection_with_db, close_connection_with_db: Inherited from DatabaseConnection (database_connection.py).
     generate_energy_consumption: Generates energy consumption for a given hour (in kW).
     generate_noise: Introduces noise into the electricity consumption profile.
+    generate_time_grid: Builds the array of reading timestamps for a date range.
+    generate_consumption_matrix: Generates a meters x time matrix of energy consumption.
     get_all_meters: Retrieves all meter IDs from the database.
-    add_readings_to_table: Adds multiple readings to the Reading table in the database.
+    create_reading_partitions: Creates the monthly partitions of the Reading table for a date range.
+    refresh_reading_rollups: Recomputes the hourly, daily and monthly rollups touched by a range of readings.
+    iter_readings: Yields readings from a consumption matrix one row at a time.
+    copy_readings_to_table: Streams readings into the Reading table with COPY FROM STDIN in fixed-size chunks.
+    upsert_readings: Stages readings in bulk and merges them into the Reading table, skipping or overwriting duplicates.
     generate_readings: Generates and inserts readings for each meter over a specified date range and interval.
+    load_checkpoint: Reads the progress of an interrupted backfill from a checkpoint file.
+    save_checkpoint: Atomically records the progress of a backfill in a checkpoint file.
+    generate_chunk_rng: Derives the random generator of one chunk of a backfill from the seed of the backfill.
+    backfill_readings: Generates, writes and commits readings in time-window and meter-batch chunks, resumably.
 
 Usage Example:
     start_date = datetime.datetime(2024, 1, 1)
@@ -25,6 +37,10 @@ Usage Example:
     consumption_generator.generate_readings(start_date, end_date)
     consumption_generator._close_connection_with_db()
 
+    parallel_backfill_readings(start_date, end_date, interval_minutes=15, workers=8, seed=42)
+
+    python consumption_generator.py --start-date 2024-04-01 --end-date 2024-05-31 --interval 15 --workers 8 --seed 42
+
 Requirements:
     - Python 3.12
     - psycopg2 library
@@ -33,76 +49,46 @@ Requirements:
     - A configuration file named 'appconfig.json' with database connection details
 """
 
-import psycopg2
-import psycopg2.extras
+import argparse
+import csv
+import io
+import itertools
 import json
 import numpy as np
+import os
 import random
 import datetime
-
-
-class ConsumptionGenerator:
-    def __init__(self) -> None:
-        """
-        Initializes the ConsumptionGenerator instance.
-
-        This method sets up the database connection and cursor by calling `_open_connection_with_db`.
-        """
-        self.db_connection: psycopg2.extensions.connection | None
-        self.db_cursor: psycopg2.extensions.cursor | None
-        self.db_connection, self.db_cursor = self.open_connection_with_db()
-
-    def open_connection_with_db(
-        self,
-    ) -> tuple[psycopg2.extensions.cursor | None, psycopg2.extensions.cursor | None]:
-        """
-        Opens a connection with the PostgreSQL database.
-
-        This method reads database connection details from a configuration file (`appconfig.json`)
-        and establishes a connection using `psycopg2.connect`. If successful, it returns the connection
-        and cursor objects; otherwise, it returns None for both.
-
-        Returns:
-            tuple: A tuple containing the database connection and cursor objects, or (None, None) if the connection fails.
-
-        Example usage:
-            db_connection, db_cursor = self._open_connection_with_db()
-        """
-        try:
-            with open("appconfig.json", "r") as file:
-                json_data: dict = json.load(file)
-            db_connection: psycopg2.extensions.connection = psycopg2.connect(
-                **json_data
-            )
-            db_cursor: psycopg2.extensions.cursor = db_connection.cursor()
-            print("PostgreSQL connection is opened")
-            return db_connection, db_cursor
-        except Exception as error:
-            print("Failed to connect to database,", error)
-            return None, None
-
-    def close_connection_with_db(self) -> None:
-        """
-        Closes the connection with the PostgreSQL database.
-
-        This method closes both the cursor and the connection if they are open.
-        """
-        if self.db_connection:
-            self.db_cursor.close()
-            self.db_connection.close()
-            print("PostgreSQL connection is closed")
-
-    def generate_energy_consumption(self, hour_of_reading: int) -> float:
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+from database_connection import DatabaseConnection
+from sharding import split_into_shards
+
+COPY_CHUNK_SIZE: int = 100_000
+CHECKPOINT_PATH: str = "backfill_checkpoint.json"
+ON_CONFLICT_ACTIONS: dict[str, str] = {
+    "skip": "DO NOTHING",
+    "overwrite": "DO UPDATE SET used_energy = EXCLUDED.used_energy",
+}
+WORKERS: int = os.cpu_count() or 1
+
+
+class ConsumptionGenerator(DatabaseConnection):
+    def generate_energy_consumption(
+        self, hour_of_reading: int | np.ndarray
+    ) -> float | np.ndarray:
         """
         Generates energy consumption for a given hour (in kW).
 
         This method simulates energy consumption based on a sinusoidal function that varies with the time of day.
+        It also accepts an array of hours, in which case the profile is evaluated element-wise.
 
         Parameters:
-            hour_of_reading (int): The hour of the day (0-23) for which to generate energy consumption.
+            hour_of_reading (int | np.ndarray): The hour of the day (0-23) for which to generate energy consumption.
 
         Returns:
-            float: The simulated energy consumption for the given hour.
+            float | np.ndarray: The simulated energy consumption for the given hour(s).
 
         Example usage:
             consumption = self.generate_energy_consumption(14)
@@ -129,6 +115,66 @@ class ConsumptionGenerator:
         """
         return random.uniform(-0.2, 0.2)
 
+    def generate_time_grid(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        interval_minutes: int = 60,
+    ) -> np.ndarray:
+        """
+        Builds the array of reading timestamps for a date range.
+
+        The grid starts at `start_date` and advances by `interval_minutes` up to and including `end_date`,
+        which matches the timestamps visited by the original per-reading loop.
+
+        Parameters:
+            start_date (datetime): The first timestamp of the grid.
+            end_date (datetime): The last timestamp that may appear in the grid.
+            interval_minutes (int, optional): The interval between readings in minutes. Default is 60 minutes.
+
+        Returns:
+            np.ndarray: A `datetime64[us]` array of reading timestamps.
+
+        Example usage:
+            timestamps = self.generate_time_grid(start_date, end_date, 15)
+        """
+        return np.arange(
+            np.datetime64(start_date, "us"),
+            np.datetime64(end_date, "us") + np.timedelta64(1, "us"),
+            np.timedelta64(interval_minutes, "m"),
+        )
+
+    def generate_consumption_matrix(
+        self,
+        timestamps: np.ndarray,
+        number_of_meters: int,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+        """
+        Generates a meters x time matrix of energy consumption (in kW).
+
+        Every cell follows the same profile as a single reading: the sinusoid for the hour of the timestamp,
+        plus uniform noise between -0.2 and 0.2, clamped at zero.
+
+        Parameters:
+            timestamps (np.ndarray): A `datetime64` array of reading timestamps.
+            number_of_meters (int): The number of rows (meters) of the matrix.
+            rng (np.random.Generator): The random generator used to draw the noise.
+
+        Returns:
+            np.ndarray: A float array of shape (number_of_meters, len(timestamps)).
+
+        Example usage:
+            rng = np.random.default_rng(42)
+            matrix = self.generate_consumption_matrix(timestamps, len(meters), rng)
+        """
+        hours: np.ndarray = (
+            timestamps.astype("datetime64[h]") - timestamps.astype("datetime64[D]")
+        ).astype(np.int64)
+        profile: np.ndarray = self.generate_energy_consumption(hours)
+        noise: np.ndarray = rng.uniform(-0.2, 0.2, size=(number_of_meters, len(hours)))
+        return np.maximum(0, profile + noise)
+
     def get_all_meters(self) -> list[int]:
         """
         Retrieves all meter IDs from the database.
@@ -145,51 +191,199 @@ class ConsumptionGenerator:
         self.db_cursor.execute(query)
         return [row[0] for row in self.db_cursor.fetchall()]
 
-    def add_readings_to_table(
-        self, readings: list[tuple[int, str, float, int]]
+    def create_reading_partitions(
+        self, start_date: datetime.datetime, end_date: datetime.datetime
     ) -> None:
         """
-        Adds multiple readings to the Reading table.
+        Creates the monthly partitions of the Reading table for a date range.
 
-        This method inserts a batch of energy consumption readings into the Reading table.
-        It uses the `psycopg2.extras.execute_values` method to efficiently insert multiple rows in a single query.
+        The Reading table is partitioned by month (see database_myenergy/partitioning.sql), and a reading
+        can only be inserted once the partition of its month exists. Existing partitions are left untouched.
 
         Parameters:
-            readings (list of tuples): A list of tuples where each tuple represents a reading.
-                                       Each tuple contains the following elements:
-                                       - time (str): The timestamp of the reading.
-                                       - used_energy (float): The amount of energy used (in kW).
-                                       - id_meter (int): The identifier of the meter for which the reading was taken.
+            start_date (datetime): Any moment of the first month.
+            end_date (datetime): Any moment of the last month.
 
-        The method performs the following steps:
-        1. Constructs an SQL query for inserting multiple readings.
-        2. Uses `psycopg2.extras.execute_values` to execute the query and insert the readings.
-        3. Prints a success message indicating the number of records inserted.
+        Raises:
+            psycopg2.Error: If a month of the range is archived (see reading_archiver.py).
 
-        In case of an error during the insertion process, it catches the exception and prints an error message.
+        Example usage:
+            self.create_reading_partitions(start_date, end_date)
+        """
+        query: str = "SELECT create_reading_partitions(%s, %s)"
+        self.db_cursor.execute(query, (start_date.date(), end_date.date()))
+        self.db_connection.commit()
+
+    def refresh_reading_rollups(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        id_meter_from: int | None = None,
+        id_meter_to: int | None = None,
+    ) -> int:
+        """
+        Recomputes the hourly, daily and monthly rollups touched by a range of readings.
+
+        The rollup tables (database_myenergy/rollups.sql) are read by the charts and the billing engine,
+        so every batch of written readings is followed by a refresh of the buckets it touched.
+        The method does not commit; it belongs in the transaction that wrote the readings.
+
+        Parameters:
+            start_date (datetime): The time of the first written reading.
+            end_date (datetime): The time of the last written reading.
+            id_meter_from (int, optional): The first meter ID of the range (inclusive). Default is no lower bound.
+            id_meter_to (int, optional): The last meter ID of the range (inclusive). Default is no upper bound.
+
+        Returns:
+            int: The number of hourly buckets refreshed.
 
         Example usage:
-            readings = [
-                ('2024-05-18 12:00:00', 0.35, 101),
-                ('2024-05-18 12:15:00', 0.40, 102),
-                ...
-            ]
-            self.add_readings_to_table(readings)
+            self.refresh_reading_rollups(window_start, window_end, batch[0], batch[-1])
         """
-        try:
-            query: str = "INSERT INTO reading (time, used_energy, id_meter) VALUES %s"
-            psycopg2.extras.execute_values(self.db_cursor, query, readings)
-            print(
-                f"{len(readings)} records inserted successfully into the reading table"
-            )
-        except Exception as error:
-            print("Failed to insert records into the reading table,", error)
+        query: str = "SELECT refresh_reading_rollups(%s, %s, %s, %s)"
+        self.db_cursor.execute(
+            query, (start_date, end_date, id_meter_from, id_meter_to)
+        )
+        return self.db_cursor.fetchone()[0]
+
+    def iter_readings(
+        self,
+        timestamps: np.ndarray,
+        meters: list[int],
+        consumption: np.ndarray,
+    ) -> Iterator[tuple[datetime.datetime, float, int]]:
+        """
+        Yields readings from a consumption matrix one row at a time.
+
+        Readings are ordered by time, then by meter, and only one timestamp column is converted
+        to Python objects at a time, so the generator never materializes the whole date range.
+
+        Parameters:
+            timestamps (np.ndarray): A `datetime64` array of reading timestamps.
+            meters (list[int]): The meter IDs, in the order of the rows of `consumption`.
+            consumption (np.ndarray): A meters x time matrix of energy consumption.
+
+        Yields:
+            tuple: A reading as (time, used_energy, id_meter).
+
+        Example usage:
+            readings = self.iter_readings(timestamps, meters, consumption)
+            self.copy_readings_to_table(readings)
+        """
+        for column, timestamp in enumerate(timestamps.tolist()):
+            for meter, used_energy in zip(meters, consumption[:, column].tolist()):
+                yield timestamp, used_energy, meter
+
+    def copy_readings_to_table(
+        self,
+        readings: Iterable[tuple[datetime.datetime, float, int]],
+        chunk_size: int = COPY_CHUNK_SIZE,
+        table: str = "reading",
+    ) -> int:
+        """
+        Streams readings into the Reading table with COPY FROM STDIN in fixed-size chunks.
+
+        Each chunk of at most `chunk_size` readings is written to an in-memory CSV buffer and sent
+        to PostgreSQL with `COPY reading (time, used_energy, id_meter) FROM STDIN`. Only one chunk is
+        held in memory at a time, so `readings` can be a generator over an arbitrarily long date range.
+        The method does not commit; the caller decides the transaction boundaries.
+        COPY fails on a reading that already exists for its meter and time; use `upsert_readings`
+        when the readings may overlap with the table.
+
+        Parameters:
+            readings (iterable of tuples): Readings as (time, used_energy, id_meter).
+            chunk_size (int, optional): The maximum number of readings per COPY. Default is 100 000.
+            table (str, optional): The table to copy into. Default is 'reading'.
+
+        Returns:
+            int: The number of readings copied into the table.
+
+        Example usage:
+            copied = self.copy_readings_to_table(readings, chunk_size=50_000)
+        """
+        query: str = (
+            f"COPY {table} (time, used_energy, id_meter) FROM STDIN WITH (FORMAT csv)"
+        )
+        readings_iterator: Iterator = iter(readings)
+        copied: int = 0
+        started_at: float = time.perf_counter()
+        while True:
+            chunk: list = list(itertools.islice(readings_iterator, chunk_size))
+            if not chunk:
+                break
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            self.db_cursor.copy_expert(query, buffer)
+            copied += len(chunk)
+        elapsed: float = time.perf_counter() - started_at
+        rows_per_second: float = copied / elapsed if elapsed > 0 else 0.0
+        print(
+            f"{copied} records copied into the {table} table "
+            f"in {elapsed:.2f} s ({rows_per_second:.0f} rows/s)"
+        )
+        return copied
+
+    def upsert_readings(
+        self,
+        readings: Iterable[tuple[datetime.datetime, float, int]],
+        on_conflict: str = "skip",
+        chunk_size: int = COPY_CHUNK_SIZE,
+    ) -> int:
+        """
+        Stages readings in bulk and merges them into the Reading table, skipping or overwriting duplicates.
+
+        A reading is unique for its meter and time. The readings are first copied into a temporary staging
+        table with COPY and then merged with a single `INSERT ... SELECT ... ON CONFLICT (id_meter, time)`.
+        With `on_conflict="skip"` readings that already exist are left untouched, and with `"overwrite"`
+        their used energy is replaced, so re-ingesting an overlapping or corrected batch is safe.
+        If the batch itself repeats a meter and time, the last occurrence wins. The method does not commit.
+
+        Parameters:
+            readings (iterable of tuples): Readings as (time, used_energy, id_meter).
+            on_conflict (str, optional): 'skip' or 'overwrite'. Default is 'skip'.
+            chunk_size (int, optional): The maximum number of readings per COPY into staging. Default is 100 000.
+
+        Returns:
+            int: The number of readings inserted or overwritten.
+
+        Raises:
+            ValueError: If `on_conflict` is neither 'skip' nor 'overwrite'.
+
+        Example usage:
+            self.upsert_readings(corrected_readings, on_conflict="overwrite")
+        """
+        if on_conflict not in ON_CONFLICT_ACTIONS:
+            raise ValueError("on_conflict must be either 'skip' or 'overwrite'")
+        self.db_cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS reading_staging ("
+            "position BIGSERIAL, time timestamp NOT NULL, used_energy decimal(10,5) NOT NULL, "
+            "id_meter int NOT NULL) ON COMMIT DELETE ROWS"
+        )
+        self.db_cursor.execute("TRUNCATE reading_staging")
+        staged: int = self.copy_readings_to_table(
+            readings, chunk_size, table="reading_staging"
+        )
+        query: str = (
+            "INSERT INTO reading (time, used_energy, id_meter) "
+            "SELECT DISTINCT ON (id_meter, time) time, used_energy, id_meter "
+            "FROM reading_staging ORDER BY id_meter, time, position DESC "
+            f"ON CONFLICT (id_meter, time) {ON_CONFLICT_ACTIONS[on_conflict]}"
+        )
+        self.db_cursor.execute(query)
+        merged: int = self.db_cursor.rowcount
+        self.db_cursor.execute("TRUNCATE reading_staging")
+        print(
+            f"{merged} of {staged} staged records merged into the reading table ({on_conflict} on conflict)"
+        )
+        return merged
 
     def generate_readings(
         self,
         start_date: datetime.datetime,
         end_date: datetime.datetime,
         interval_minutes: int = 60,
+        rng: np.random.Generator | None = None,
     ) -> None:
         """
         Generates readings for each meter in the database over a specified date range with the given interval.
@@ -202,42 +396,450 @@ class ConsumptionGenerator:
             start_date (datetime): The starting date and time for generating readings.
             end_date (datetime): The ending date and time for generating readings.
             interval_minutes (int, optional): The interval between readings in minutes. Default is 60 minutes.
+            rng (np.random.Generator, optional): The random generator used to draw the noise.
+                                                 Pass a seeded generator to make a run reproducible.
 
         The method performs the following steps:
         1. Fetches all meter IDs from the database.
-        2. Iterates over the specified date range, generating readings for each meter at each interval.
-        3. Accumulates the generated readings in a list.
-        4. Inserts all accumulated readings into the database in a single transaction.
+        2. Builds the timestamp grid and the meters x time consumption matrix in a few array operations.
+        3. Streams the matrix, ordered by time, then by meter, into the database with COPY.
+        4. Refreshes the consumption rollups of the date range.
+        5. Commits all readings in a single transaction.
 
         Example usage:
             start_date = datetime.datetime(2024, 1, 1)
             end_date = datetime.datetime(2024, 1, 2)
-            self.generate_readings(start_date, end_date)
+            self.generate_readings(start_date, end_date, rng=np.random.default_rng(42))
         """
+        if rng is None:
+            rng = np.random.default_rng()
+        self.create_reading_partitions(start_date, end_date)
         all_meters: list[int] = self.get_all_meters()
-        current_date: datetime.datetime = start_date
-        readings = []
-        while current_date <= end_date:
-            for meter in all_meters:
-                reading = (
-                    current_date,
-                    max(
-                        0,
-                        (
-                            self.generate_energy_consumption(current_date.hour)
-                            + self.generate_noise()
-                        ),
-                    ),
-                    meter,
-                )
-                readings.append(reading)
-            current_date += datetime.timedelta(minutes=interval_minutes)
-        self.add_readings_to_table(readings)
+        timestamps: np.ndarray = self.generate_time_grid(
+            start_date, end_date, interval_minutes
+        )
+        consumption: np.ndarray = self.generate_consumption_matrix(
+            timestamps, len(all_meters), rng
+        )
+        self.copy_readings_to_table(
+            self.iter_readings(timestamps, all_meters, consumption)
+        )
+        self.refresh_reading_rollups(start_date, end_date)
         self.db_connection.commit()
 
+    def load_checkpoint(
+        self,
+        checkpoint_path: str,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        interval_minutes: int,
+    ) -> tuple[datetime.datetime, int | None, np.random.SeedSequence | None]:
+        """
+        Reads the progress of an interrupted backfill from a checkpoint file.
+
+        Parameters:
+            checkpoint_path (str): The path of the checkpoint file.
+            start_date (datetime): The starting date of the backfill being resumed.
+            end_date (datetime): The ending date of the backfill being resumed.
+            interval_minutes (int): The interval between readings of the backfill being resumed.
+
+        Returns:
+            tuple: The start of the time window to resume from, the last meter already written in that
+                   window (or None) and the seed the backfill was started with. Without a checkpoint file,
+                   the backfill starts at `start_date` with no seed.
+
+        Raises:
+            ValueError: If the checkpoint file was written by a backfill with different parameters.
+
+        Example usage:
+            window_start, last_meter, seed = self.load_checkpoint(CHECKPOINT_PATH, start_date, end_date, 15)
+        """
+        if not os.path.exists(checkpoint_path):
+            return start_date, None, None
+        with open(checkpoint_path, "r") as file:
+            checkpoint: dict = json.load(file)
+        if (
+            checkpoint["start_date"] != start_date.isoformat()
+            or checkpoint["end_date"] != end_date.isoformat()
+            or checkpoint["interval_minutes"] != interval_minutes
+        ):
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} belongs to a different backfill, remove it to start over"
+            )
+        print(
+            f"Resuming backfill from {checkpoint['window_start']} after meter {checkpoint['last_meter']}"
+        )
+        return (
+            datetime.datetime.fromisoformat(checkpoint["window_start"]),
+            checkpoint["last_meter"],
+            (
+                np.random.SeedSequence(
+                    checkpoint["seed_entropy"], spawn_key=checkpoint["seed_spawn_key"]
+                )
+                if "seed_entropy" in checkpoint
+                else None
+            ),
+        )
+
+    def save_checkpoint(
+        self,
+        checkpoint_path: str,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        interval_minutes: int,
+        window_start: datetime.datetime,
+        last_meter: int | None,
+        seed: np.random.SeedSequence,
+    ) -> None:
+        """
+        Atomically records the progress of a backfill in a checkpoint file.
+
+        The checkpoint is written to a temporary file first and then moved over the old one,
+        so an interruption never leaves a half-written checkpoint behind.
+
+        Parameters:
+            checkpoint_path (str): The path of the checkpoint file.
+            start_date (datetime): The starting date of the backfill.
+            end_date (datetime): The ending date of the backfill.
+            interval_minutes (int): The interval between readings of the backfill.
+            window_start (datetime): The start of the time window in progress.
+            last_meter (int | None): The last meter committed in that window, or None if none was.
+            seed (np.random.SeedSequence): The seed of the backfill, so a resumed run draws the same noise.
+        """
+        checkpoint: dict = {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "interval_minutes": interval_minutes,
+            "window_start": window_start.isoformat(),
+            "last_meter": last_meter,
+            "seed_entropy": seed.entropy,
+            "seed_spawn_key": list(seed.spawn_key),
+        }
+        temporary_path: str = f"{checkpoint_path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(checkpoint, file)
+        os.replace(temporary_path, checkpoint_path)
+
+    def generate_chunk_rng(
+        self, seed: np.random.SeedSequence, window_number: int, first_meter: int
+    ) -> np.random.Generator:
+        """
+        Derives the random generator of one chunk of a backfill from the seed of the backfill.
+
+        Every chunk gets its own stream, keyed by the number of its time window and its first meter,
+        so the noise of a chunk does not depend on the chunks generated before it in the same process.
+        A backfill resumed from a checkpoint therefore writes the same readings as an uninterrupted one.
+
+        Parameters:
+            seed (np.random.SeedSequence): The seed of the backfill.
+            window_number (int): The number of the time window, counted from `start_date`.
+            first_meter (int): The first meter of the meter batch.
 
-start_date: datetime.datetime = datetime.datetime(2024, 4, 1)
-end_date: datetime.datetime = datetime.datetime(2024, 5, 31)
-consumption_generator = ConsumptionGenerator()
-consumption_generator.generate_readings(start_date, end_date)
-consumption_generator.close_connection_with_db()
+        Returns:
+            np.random.Generator: The random generator of the chunk.
+
+        Example usage:
+            rng = self.generate_chunk_rng(np.random.SeedSequence(42), 0, 1)
+        """
+        return np.random.default_rng(
+            np.random.SeedSequence(
+                seed.entropy, spawn_key=(*seed.spawn_key, window_number, first_meter)
+            )
+        )
+
+    def backfill_readings(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        interval_minutes: int = 60,
+        window: datetime.timedelta = datetime.timedelta(days=1),
+        meter_batch_size: int = 1000,
+        checkpoint_path: str = CHECKPOINT_PATH,
+        seed: int | np.random.SeedSequence | None = None,
+        meters: list[int] | None = None,
+        on_conflict: str | None = "skip",
+    ) -> int:
+        """
+        Generates, writes and commits readings in time-window and meter-batch chunks, resumably.
+
+        The date range is split into windows of `window` length, and the meters into batches of
+        `meter_batch_size`. Each window x batch chunk is generated, streamed with COPY, rolled up and committed on its own,
+        after which the checkpoint records the window and the last meter written. Peak memory is bounded by
+        one chunk, regardless of the length of the date range. If the backfill is interrupted, calling it again
+        with the same arguments resumes after the last committed chunk; the checkpoint is removed once the
+        whole range has been written. The noise of every chunk is drawn from a stream derived from the seed and
+        the position of the chunk (see `generate_chunk_rng`), and the seed is kept in the checkpoint, so a resumed
+        backfill writes the same readings as an uninterrupted one.
+
+        Parameters:
+            start_date (datetime): The starting date and time for generating readings.
+            end_date (datetime): The ending date and time for generating readings.
+            interval_minutes (int, optional): The interval between readings in minutes. Default is 60 minutes.
+            window (timedelta, optional): The length of a time window; a multiple of the interval. Default is one day.
+            meter_batch_size (int, optional): The number of meters per chunk. Default is 1000.
+            checkpoint_path (str, optional): The path of the checkpoint file.
+            seed (int | np.random.SeedSequence, optional): The seed of the noise. Default is a random seed.
+                                                           A resumed backfill uses the seed of its checkpoint.
+            meters (list[int], optional): The meters to generate readings for. Default is all meters.
+            on_conflict (str | None, optional): How to treat readings that already exist: 'skip' or 'overwrite'
+                                                them (see `upsert_readings`), or None to COPY straight into the
+                                                table, which is faster but fails on any overlap. Default is 'skip'.
+                                                With None, the first chunk after a resume is still merged with
+                                                'skip', since it may have been committed before the checkpoint
+                                                recording it was saved.
+
+        Returns:
+            int: The number of readings written by this call.
+
+        Raises:
+            ValueError: If `start_date` is after `end_date` or `window` is not a multiple of the interval.
+
+        Example usage:
+            start_date = datetime.datetime(2024, 1, 1)
+            end_date = datetime.datetime(2024, 6, 30)
+            self.backfill_readings(start_date, end_date, 15, window=datetime.timedelta(days=7))
+        """
+        if start_date > end_date:
+            raise ValueError("The start date must not be after the end date")
+        step: datetime.timedelta = datetime.timedelta(minutes=interval_minutes)
+        if window < step or window % step:
+            raise ValueError("The window must be a multiple of the reading interval")
+        self.create_reading_partitions(start_date, end_date)
+        all_meters: list[int] = sorted(
+            self.get_all_meters() if meters is None else meters
+        )
+        resuming: bool = os.path.exists(checkpoint_path)
+        window_start, last_meter, checkpoint_seed = self.load_checkpoint(
+            checkpoint_path, start_date, end_date, interval_minutes
+        )
+        if checkpoint_seed is not None:
+            seed = checkpoint_seed
+        elif not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        written: int = 0
+        while window_start <= end_date:
+            window_number: int = (window_start - start_date) // window
+            window_end: datetime.datetime = min(window_start + window - step, end_date)
+            timestamps: np.ndarray = self.generate_time_grid(
+                window_start, window_end, interval_minutes
+            )
+            pending_meters: list[int] = [
+                meter
+                for meter in all_meters
+                if last_meter is None or meter > last_meter
+            ]
+            for batch_start in range(0, len(pending_meters), meter_batch_size):
+                batch: list[int] = pending_meters[
+                    batch_start : batch_start + meter_batch_size
+                ]
+                consumption: np.ndarray = self.generate_consumption_matrix(
+                    timestamps,
+                    len(batch),
+                    self.generate_chunk_rng(seed, window_number, batch[0]),
+                )
+                readings: Iterator = self.iter_readings(timestamps, batch, consumption)
+                if on_conflict is None and not resuming:
+                    written += self.copy_readings_to_table(readings)
+                else:
+                    written += self.upsert_readings(readings, on_conflict or "skip")
+                resuming = False
+                self.refresh_reading_rollups(
+                    window_start, window_end, batch[0], batch[-1]
+                )
+                self.db_connection.commit()
+                self.save_checkpoint(
+                    checkpoint_path,
+                    start_date,
+                    end_date,
+                    interval_minutes,
+                    window_start,
+                    batch[-1],
+                    seed,
+                )
+            window_start += window
+            last_meter = None
+            self.save_checkpoint(
+                checkpoint_path,
+                start_date,
+                end_date,
+                interval_minutes,
+                window_start,
+                last_meter,
+                seed,
+            )
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        print(f"Backfill finished, {written} records written")
+        return written
+
+
+def backfill_shard(
+    shard_number: int,
+    meters: list[int],
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    interval_minutes: int,
+    seed: np.random.SeedSequence,
+    **backfill_options,
+) -> tuple[int, int, float]:
+    """
+    Backfills the readings of one shard of meters over its own database connection.
+
+    This function runs in a worker process. It opens a dedicated connection, calls `backfill_readings`
+    for its meters with a checkpoint file named after the meter range, and closes the connection.
+
+    Parameters:
+        shard_number (int): The number of the shard, used in progress messages.
+        meters (list[int]): The meter IDs of the shard.
+        start_date (datetime): The starting date and time for generating readings.
+        end_date (datetime): The ending date and time for generating readings.
+        interval_minutes (int): The interval between readings in minutes.
+        seed (np.random.SeedSequence): The seed of the shard's random generators.
+        **backfill_options: Further keyword arguments for `backfill_readings`.
+
+    Returns:
+        tuple: The shard number, the number of readings written and the elapsed time in seconds.
+    """
+    started_at: float = time.perf_counter()
+    checkpoint_path: str = backfill_options.pop("checkpoint_path", CHECKPOINT_PATH)
+    root, extension = os.path.splitext(checkpoint_path)
+    consumption_generator = ConsumptionGenerator()
+    try:
+        written: int = consumption_generator.backfill_readings(
+            start_date,
+            end_date,
+            interval_minutes,
+            checkpoint_path=f"{root}_meters_{meters[0]}-{meters[-1]}{extension}",
+            seed=seed,
+            meters=meters,
+            **backfill_options,
+        )
+    finally:
+        consumption_generator.close_connection_with_db()
+    return shard_number, written, time.perf_counter() - started_at
+
+
+def parallel_backfill_readings(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    interval_minutes: int = 60,
+    workers: int = WORKERS,
+    seed: int | None = None,
+    **backfill_options,
+) -> int:
+    """
+    Backfills readings with several worker processes sharded by meter range.
+
+    All meters are split into `workers` contiguous ranges (see sharding.py), and every range is backfilled by its own process
+    with its own database connection, so generation and loading run on all cores at the same time.
+    Each shard draws its noise from an independent stream spawned from `seed`, so a seeded run is reproducible
+    for a given number of workers. Throughput is reported per worker and in total.
+
+    Parameters:
+        start_date (datetime): The starting date and time for generating readings.
+        end_date (datetime): The ending date and time for generating readings.
+        interval_minutes (int, optional): The interval between readings in minutes. Default is 60 minutes.
+        workers (int, optional): The number of worker processes. Default is the number of CPUs.
+        seed (int, optional): The seed of the random generators.
+        **backfill_options: Further keyword arguments for `backfill_readings`, e.g. `window` or `meter_batch_size`.
+
+    Returns:
+        int: The total number of readings written.
+
+    Raises:
+        ValueError: If `workers` is less than 1.
+
+    Example usage:
+        parallel_backfill_readings(start_date, end_date, interval_minutes=15, workers=8, seed=42)
+    """
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1")
+    started_at: float = time.perf_counter()
+    consumption_generator = ConsumptionGenerator()
+    try:
+        all_meters: list[int] = consumption_generator.get_all_meters()
+        consumption_generator.create_reading_partitions(start_date, end_date)
+    finally:
+        consumption_generator.close_connection_with_db()
+    shards: list[list[int]] = split_into_shards(all_meters, workers)
+    seeds: list[np.random.SeedSequence] = np.random.SeedSequence(seed).spawn(
+        len(shards)
+    )
+    total_written: int = 0
+    with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+        futures = [
+            executor.submit(
+                backfill_shard,
+                shard_number,
+                shard,
+                start_date,
+                end_date,
+                interval_minutes,
+                seeds[shard_number],
+                **backfill_options,
+            )
+            for shard_number, shard in enumerate(shards)
+        ]
+        for future in futures:
+            shard_number, written, elapsed = future.result()
+            total_written += written
+            print(
+                f"Worker {shard_number} (meters {shards[shard_number][0]}-{shards[shard_number][-1]}): "
+                f"{written} records in {elapsed:.2f} s ({written / elapsed if elapsed > 0 else 0:.0f} rows/s)"
+            )
+    elapsed: float = time.perf_counter() - started_at
+    print(
+        f"Parallel backfill finished with {len(shards)} workers: {total_written} records "
+        f"in {elapsed:.2f} s ({total_written / elapsed if elapsed > 0 else 0:.0f} rows/s)"
+    )
+    return total_written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate meter readings for all meters in the database."
+    )
+    parser.add_argument(
+        "--start-date",
+        type=datetime.datetime.fromisoformat,
+        required=True,
+        help="the first reading time, e.g. 2024-04-01",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=datetime.datetime.fromisoformat,
+        required=True,
+        help="the last reading time, e.g. 2024-05-31",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=60,
+        help="the interval between readings in minutes (default: 60)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="the number of worker processes (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="the seed of the random generators"
+    )
+    parser.add_argument(
+        "--on-conflict",
+        choices=list(ON_CONFLICT_ACTIONS),
+        default="skip",
+        help="whether to skip or overwrite readings that already exist (default: skip)",
+    )
+    arguments = parser.parse_args()
+    if arguments.workers < 1:
+        parser.error("--workers must be at least 1")
+    parallel_backfill_readings(
+        arguments.start_date,
+        arguments.end_date,
+        arguments.interval,
+        arguments.workers,
+        arguments.seed,
+        on_conflict=arguments.on_conflict,
+    )
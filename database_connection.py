@@ -0,0 +1,88 @@
+"""
+Connection with the PostgreSQL Database for the Command-Line Scripts
+
+This module defines the `DatabaseConnection` base class shared by the scripts that work on the database directly
+(consumption_generator.py, billing_engine.py, partition_manager.py, reading_archiver.py and dataset_generator.py).
+It opens a psycopg2 connection from the details in 'appconfig.json' and closes it.
+
+Classes:
+    DatabaseConnection: A base class holding a connection and a cursor to the PostgreSQL database.
+
+Functions:
+    __init__: Opens the connection with the database.
+    open_connection_with_db: Opens a connection with the PostgreSQL database.
+    close_connection_with_db: Closes the connection with the PostgreSQL database.
+
+Usage Example:
+    class BillingEngine(DatabaseConnection):
+        ...
+
+    billing_engine = BillingEngine()
+    billing_engine.db_cursor.execute("SELECT 1")
+    billing_engine.close_connection_with_db()
+
+Requirements:
+    - Python 3.12
+    - psycopg2 library
+    - A configuration file named 'appconfig.json' with database connection details
+"""
+
+import json
+
+import psycopg2
+
+CONFIG_PATH: str = "appconfig.json"
+
+
+class DatabaseConnection:
+    def __init__(self) -> None:
+        """
+        Initializes the DatabaseConnection instance.
+
+        This method sets up the database connection and cursor by calling `open_connection_with_db`.
+        """
+        self.db_connection: psycopg2.extensions.connection | None
+        self.db_cursor: psycopg2.extensions.cursor | None
+        self.db_connection, self.db_cursor = self.open_connection_with_db()
+
+    def open_connection_with_db(
+        self,
+    ) -> tuple[
+        psycopg2.extensions.connection | None, psycopg2.extensions.cursor | None
+    ]:
+        """
+        Opens a connection with the PostgreSQL database.
+
+        This method reads database connection details from a configuration file (`appconfig.json`)
+        and establishes a connection using `psycopg2.connect`. If successful, it returns the connection
+        and cursor objects; otherwise, it returns None for both.
+
+        Returns:
+            tuple: A tuple containing the database connection and cursor objects, or (None, None) if the connection fails.
+
+        Example usage:
+            db_connection, db_cursor = self.open_connection_with_db()
+        """
+        try:
+            with open(CONFIG_PATH, "r") as file:
+                json_data: dict = json.load(file)
+            db_connection: psycopg2.extensions.connection = psycopg2.connect(
+                **json_data
+            )
+            db_cursor: psycopg2.extensions.cursor = db_connection.cursor()
+            print("PostgreSQL connection is opened")
+            return db_connection, db_cursor
+        except Exception as error:
+            print("Failed to connect to database,", error)
+            return None, None
+
+    def close_connection_with_db(self) -> None:
+        """
+        Closes the connection with the PostgreSQL database.
+
+        This method closes both the cursor and the connection if they are open.
+        """
+        if self.db_connection:
+            self.db_cursor.close()
+            self.db_connection.close()
+            print("PostgreSQL connection is closed")
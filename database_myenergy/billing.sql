@@ -0,0 +1,65 @@
+-- Set-based billing engine.
+-- Creates the invoices of one month for all meters (or for a range of meters) in a single statement.
+-- It replaces the per-row generate_invoice trigger, which ran on every inserted reading.
+-- The usage of a month is read from the reading_monthly rollup (see rollups.sql), one row per meter.
+
+-- Removing the per-row trigger from the reading insert path
+DROP TRIGGER IF EXISTS after_insert_reading ON Reading;
+DROP FUNCTION IF EXISTS generate_invoice();
+
+-- A meter has at most one invoice per billing period, so overlapping or concurrent runs cannot bill it twice.
+-- New databases get the constraint from create_tables.sql. If adding it fails, an existing database already has
+-- duplicated invoices; find them with
+--     SELECT id_meter, billing_period FROM Invoice GROUP BY 1, 2 HAVING count(*) > 1;
+-- and resolve them by hand (they may already be paid).
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'invoice_id_meter_billing_period_uq') THEN
+        ALTER TABLE Invoice
+            ADD CONSTRAINT invoice_id_meter_billing_period_uq UNIQUE (id_meter, billing_period);
+    END IF;
+END;
+$$;
+
+-- The plain index on the same columns is now redundant
+DROP INDEX IF EXISTS ix_invoice_id_meter_billing_period;
+
+CREATE OR REPLACE FUNCTION generate_invoices(
+    p_billing_period DATE,
+    p_id_meter_from BIGINT DEFAULT NULL,
+    p_id_meter_to BIGINT DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    period_start TIMESTAMP := date_trunc('month', p_billing_period);
+    created_invoices INTEGER;
+BEGIN
+    -- Read the energy usage of the billing period for every meter in the range from the monthly rollup
+    WITH monthly_usage AS (
+        SELECT id_meter, used_energy AS total_energy
+        FROM reading_monthly
+        WHERE bucket = period_start
+        AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+        AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    )
+    -- Insert one invoice per meter with readings in the period (meters without readings are not billed,
+    -- as with the old trigger), skipping meters that are already billed for the period
+    INSERT INTO Invoice (id_meter, date_of_issue, amount_to_pay, used_energy, billing_period, is_it_paid)
+    SELECT
+        meter.id_meter,
+        now(),
+        monthly_usage.total_energy * offer.kwh_price,
+        monthly_usage.total_energy,
+        period_start,
+        false
+    FROM meter
+    INNER JOIN offer
+    ON meter.id_offer = offer.id_offer
+    INNER JOIN monthly_usage
+    ON monthly_usage.id_meter = meter.id_meter
+    ON CONFLICT (id_meter, billing_period) DO NOTHING;
+
+    GET DIAGNOSTICS created_invoices = ROW_COUNT;
+    RETURN created_invoices;
+END;
+$$ LANGUAGE plpgsql;
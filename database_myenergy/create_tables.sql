@@ -80,7 +80,8 @@ CREATE TABLE Invoice (
     used_energy decimal(10,5)  NOT NULL,
     billing_period timestamp NOT NULL,
     is_it_paid boolean NOT NULL,
-    CONSTRAINT Invoice_pk PRIMARY KEY (id_invoice)
+    CONSTRAINT Invoice_pk PRIMARY KEY (id_invoice),
+    CONSTRAINT invoice_id_meter_billing_period_uq UNIQUE (id_meter, billing_period)
 );
 
 -- Table: Meter
@@ -111,14 +112,15 @@ CREATE TABLE Post (
     CONSTRAINT Post_pk PRIMARY KEY (id_post)
 );
 
--- Table: Reading
+-- Table: Reading (partitioned by month, see partitioning.sql)
 CREATE TABLE Reading (
     id_reading BIGSERIAL,
     time timestamp  NOT NULL,
     used_energy decimal(10,5)  NOT NULL,
     id_meter int  NOT NULL,
-    CONSTRAINT Reading_pk PRIMARY KEY (id_reading)
-);
+    CONSTRAINT Reading_pk PRIMARY KEY (id_reading, time),
+    CONSTRAINT reading_id_meter_time_uq UNIQUE (id_meter, time)
+) PARTITION BY RANGE (time);
 
 -- foreign keys
 -- Reference: CustomizedChallenge_Client (table: CustomizedChallenge)
@@ -0,0 +1,34 @@
+-- Secondary indexes for the hot query paths.
+-- They mirror the indexes declared on the SQLAlchemy models in website/models.py;
+-- `flask --app website:create_app index-report` compares both with a live database.
+
+-- Readings of a meter in a time range (home.get_readings, billing) are served by
+-- the unique (id_meter, time) constraint of the Reading table, see reading_uniqueness.sql.
+
+-- Cheap time-range scans over the whole (append-only, time-ordered) reading table
+CREATE INDEX IF NOT EXISTS ix_reading_time_brin ON Reading USING brin (time);
+
+-- Meter of a client (home, dashboard)
+CREATE INDEX IF NOT EXISTS ix_meter_id_client ON Meter (id_client);
+
+-- Challenges of a client (challenge views)
+CREATE INDEX IF NOT EXISTS ix_customizedchallenge_id_client_id_challenge
+    ON CustomizedChallenge (id_client, id_challenge);
+
+-- Ranking windows
+CREATE INDEX IF NOT EXISTS ix_customizedchallenge_start_date ON CustomizedChallenge (start_date);
+
+-- Invoices of a meter by billing period (invoice listing, billing idempotency) are served by
+-- the unique (id_meter, billing_period) constraint of the Invoice table, see billing.sql.
+
+-- Unpaid invoices of a meter (dashboard)
+CREATE INDEX IF NOT EXISTS ix_invoice_unpaid ON Invoice (id_meter) WHERE NOT is_it_paid;
+
+-- Comments under a post (forum)
+CREATE INDEX IF NOT EXISTS ix_comment_id_post ON Comment (id_post);
+
+-- Like of a post by an author (forum)
+CREATE INDEX IF NOT EXISTS ix_favourite_id_post_id_author ON Favourite (id_post, id_author);
+
+-- Login and profile lookups by username (auth, forum)
+CREATE INDEX IF NOT EXISTS ix_client_username ON Client (username);
@@ -0,0 +1,49 @@
+-- Points of every client per ranking period (day, week, month and overall).
+-- The website adds the points of a finished challenge to the four periods of its start date, and takes them back
+-- when a client resigns, so a ranking page reads one period of this table instead of aggregating CustomizedChallenge.
+
+CREATE TABLE IF NOT EXISTS leaderboard_score (
+    period varchar(7)  NOT NULL,
+    period_start date  NOT NULL,
+    id_client int  NOT NULL REFERENCES Client (id_client),
+    points int  NOT NULL,
+    CONSTRAINT leaderboard_score_pk PRIMARY KEY (period, period_start, id_client)
+);
+
+-- The top of a ranking and the neighbours of a client are range scans of this index
+CREATE INDEX IF NOT EXISTS ix_leaderboard_score_rank ON leaderboard_score (period, period_start, points, id_client);
+
+-- Number of clients with each score per ranking period, updated together with leaderboard_score.
+-- The rank of a score is one plus the clients of the higher scores, so it costs one row per distinct higher score
+-- instead of one row per client ranked above.
+CREATE TABLE IF NOT EXISTS leaderboard_points (
+    period varchar(7)  NOT NULL,
+    period_start date  NOT NULL,
+    points int  NOT NULL,
+    clients int  NOT NULL,
+    CONSTRAINT leaderboard_points_pk PRIMARY KEY (period, period_start, points)
+);
+
+-- Counting the scores of an existing leaderboard (only when the table is still empty)
+INSERT INTO leaderboard_points (period, period_start, points, clients)
+SELECT period, period_start, points, COUNT(*)
+FROM leaderboard_score
+WHERE points > 0
+AND NOT EXISTS (SELECT 1 FROM leaderboard_points)
+GROUP BY period, period_start, points;
+
+-- Fill the table from the existing challenges (and repair it at any time) with:
+--   flask --app website:create_app rebuild-leaderboard
+
+-- Frozen top of the daily, weekly and monthly rankings of closed periods, read in rank order by the history pages.
+-- Filled when the periods close by:
+--   flask --app website:create_app snapshot-rankings
+CREATE TABLE IF NOT EXISTS ranking_snapshot (
+    period varchar(7)  NOT NULL,
+    period_start date  NOT NULL,
+    rank int  NOT NULL,
+    id_client int  NOT NULL REFERENCES Client (id_client),
+    username varchar(50)  NULL,
+    points int  NOT NULL,
+    CONSTRAINT ranking_snapshot_pk PRIMARY KEY (period, period_start, rank, id_client)
+);
@@ -0,0 +1,73 @@
+-- Monthly range partitioning of the Reading table.
+-- Every month of readings lives in its own partition named reading_yYYYYmMM, so range queries
+-- on time only scan the partitions in their range and old months can be detached cheaply.
+
+-- The months whose partitions were exported to the archive and dropped (reading_archiver.py).
+-- Their readings are only in the archive files, and their consumption rollups are kept (rollups.sql).
+CREATE TABLE IF NOT EXISTS reading_archive (
+    month date  NOT NULL,
+    file text  NOT NULL,
+    readings bigint  NOT NULL,
+    archived_at timestamp  NOT NULL DEFAULT now(),
+    CONSTRAINT reading_archive_pk PRIMARY KEY (month)
+);
+
+-- Creating the partition of one month (does nothing if it already exists).
+-- An archived month is refused: new readings in it would be hidden by the archive file and lost to its rollups.
+CREATE OR REPLACE FUNCTION create_reading_partition(
+    p_month DATE,
+    p_parent TEXT DEFAULT 'reading'
+)
+RETURNS TEXT AS $$
+DECLARE
+    partition_start DATE := date_trunc('month', p_month);
+    partition_end DATE := date_trunc('month', p_month) + INTERVAL '1 month';
+    partition_name TEXT := 'reading_' || to_char(date_trunc('month', p_month), '"y"YYYY"m"MM');
+BEGIN
+    IF EXISTS (SELECT 1 FROM reading_archive WHERE month = partition_start) THEN
+        RAISE EXCEPTION 'The readings of % are archived, its partition cannot be created again',
+            to_char(partition_start, 'YYYY-MM')
+            USING HINT = 'Choose months after the archived ones, listed in reading_archive.';
+    END IF;
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, p_parent, partition_start, partition_end
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Creating the partitions of every month between two dates (none if one of them is archived)
+CREATE OR REPLACE FUNCTION create_reading_partitions(
+    p_from DATE,
+    p_to DATE,
+    p_parent TEXT DEFAULT 'reading'
+)
+RETURNS INTEGER AS $$
+DECLARE
+    current_month DATE := date_trunc('month', p_from);
+    partitions INTEGER := 0;
+BEGIN
+    WHILE current_month <= p_to LOOP
+        PERFORM create_reading_partition(current_month, p_parent);
+        current_month := current_month + INTERVAL '1 month';
+        partitions := partitions + 1;
+    END LOOP;
+    RETURN partitions;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Creating the partitions of the current month and the next months (run it periodically)
+CREATE OR REPLACE FUNCTION create_future_reading_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+BEGIN
+    RETURN create_reading_partitions(
+        current_date,
+        (current_date + make_interval(months => p_months_ahead))::DATE
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_future_reading_partitions(3);
@@ -0,0 +1,15 @@
+-- Uniqueness of readings per meter and time for an existing database.
+-- New databases get the constraint from create_tables.sql.
+
+-- Removing duplicated readings, keeping the first one inserted
+DELETE FROM Reading
+USING Reading AS original
+WHERE Reading.id_meter = original.id_meter
+AND Reading.time = original.time
+AND Reading.id_reading > original.id_reading;
+
+-- Adding the constraint (its index also serves lookups of a meter's readings in a time range)
+ALTER TABLE Reading ADD CONSTRAINT reading_id_meter_time_uq UNIQUE (id_meter, time);
+
+-- The plain index on the same columns is now redundant
+DROP INDEX IF EXISTS ix_reading_id_meter_time;
@@ -0,0 +1,14 @@
+-- Readings sent to /ingest/readings that the database refused, e.g. for a month without a partition.
+-- The write-behind queue splits a failing flush until it finds the refused readings, moves them here
+-- with the error and writes the rest, so one bad reading cannot block the queue.
+-- Replay fixed readings with INSERT ... SELECT and delete them from this table.
+
+CREATE TABLE IF NOT EXISTS reading_rejected (
+    id_rejected BIGSERIAL,
+    time timestamp  NOT NULL,
+    used_energy decimal(10,5)  NOT NULL,
+    id_meter int  NOT NULL,
+    error text  NOT NULL,
+    rejected_at timestamp  NOT NULL DEFAULT now(),
+    CONSTRAINT reading_rejected_pk PRIMARY KEY (id_rejected)
+);
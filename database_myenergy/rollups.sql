@@ -0,0 +1,310 @@
+-- Hourly, daily and monthly consumption rollups of the Reading table.
+-- Charts of several days and the billing engine read these small tables instead of re-summing raw readings.
+-- The rollups are maintained incrementally: every writer of readings recomputes the buckets it touched
+-- in the same transaction, with refresh_reading_rollups for a dense range of times and meters (backfills),
+-- or with refresh_reading_rollup_buckets for a scattered set of (meter, hour) buckets (ingestion).
+-- A refreshed bucket left without readings (e.g. after readings were deleted) is deleted, unless its month
+-- is archived (reading_archive): the rollups of archived months are kept, as their readings are no longer in Reading.
+-- Refreshers of the same buckets are serialized with lock_reading_rollups, so none of them writes a total
+-- computed without the readings of another one.
+
+CREATE TABLE IF NOT EXISTS reading_hourly (
+    id_meter int  NOT NULL REFERENCES Meter (id_meter),
+    bucket timestamp  NOT NULL,
+    used_energy decimal(14,5)  NOT NULL,
+    readings int  NOT NULL,
+    CONSTRAINT reading_hourly_pk PRIMARY KEY (id_meter, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS reading_daily (
+    id_meter int  NOT NULL REFERENCES Meter (id_meter),
+    bucket date  NOT NULL,
+    used_energy decimal(14,5)  NOT NULL,
+    readings int  NOT NULL,
+    CONSTRAINT reading_daily_pk PRIMARY KEY (id_meter, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS reading_monthly (
+    id_meter int  NOT NULL REFERENCES Meter (id_meter),
+    bucket date  NOT NULL,
+    used_energy decimal(14,5)  NOT NULL,
+    readings int  NOT NULL,
+    CONSTRAINT reading_monthly_pk PRIMARY KEY (id_meter, bucket)
+);
+
+-- Serializing the refreshers of the same buckets until the end of the transaction.
+-- A refresher recomputes totals from the readings it can see: two transactions refreshing the same bucket at once
+-- would each miss the readings of the other one, and the last to commit would overwrite the right total.
+-- The buckets are locked by month and block of 1024 meters, in a fixed order so two refreshers cannot deadlock,
+-- before anything is recomputed; the statements run after the lock is granted see every reading committed
+-- by the refresher that held it. A refresher of more than 256 blocks and months, or of all the meters,
+-- takes one exclusive lock of all the rollups instead, which the others take shared.
+CREATE OR REPLACE FUNCTION lock_reading_rollups(
+    p_id_meters INTEGER[],
+    p_months DATE[]
+)
+RETURNS VOID AS $$
+DECLARE
+    lock_key RECORD;
+BEGIN
+    IF p_id_meters IS NULL OR p_months IS NULL OR (
+        SELECT COUNT(DISTINCT (bucket.id_meter / 1024, date_trunc('month', bucket.month)))
+        FROM unnest(p_id_meters, p_months) AS bucket(id_meter, month)
+    ) > 256 THEN
+        PERFORM pg_advisory_xact_lock(0, 0);
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock_shared(0, 0);
+    FOR lock_key IN
+        SELECT DISTINCT
+            (EXTRACT(YEAR FROM bucket.month) * 12 + EXTRACT(MONTH FROM bucket.month))::INTEGER AS month,
+            bucket.id_meter / 1024 AS block
+        FROM unnest(p_id_meters, p_months) AS bucket(id_meter, month)
+        ORDER BY month, block
+    LOOP
+        PERFORM pg_advisory_xact_lock(lock_key.month, lock_key.block);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recomputing the hours, days and months touched by the readings between two moments.
+-- Each level is rebuilt from the level below it, so a refresh reads the raw readings of whole hours only.
+CREATE OR REPLACE FUNCTION refresh_reading_rollups(
+    p_from TIMESTAMP,
+    p_to TIMESTAMP,
+    p_id_meter_from BIGINT DEFAULT NULL,
+    p_id_meter_to BIGINT DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    hours_start TIMESTAMP := date_trunc('hour', p_from);
+    hours_end TIMESTAMP := date_trunc('hour', p_to) + INTERVAL '1 hour';
+    days_start DATE := date_trunc('day', p_from);
+    days_end DATE := date_trunc('day', p_to) + INTERVAL '1 day';
+    months_start DATE := date_trunc('month', p_from);
+    months_end DATE := date_trunc('month', p_to) + INTERVAL '1 month';
+    refreshed_hours INTEGER;
+    lock_id_meters INTEGER[];
+    lock_months DATE[];
+BEGIN
+    IF p_from IS NULL OR p_to IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    -- Every block of meters in every month of the range; none (all the rollups) without a range of meters
+    SELECT array_agg(block * 1024), array_agg(month::date)
+    INTO lock_id_meters, lock_months
+    FROM generate_series((p_id_meter_from / 1024)::INTEGER, (p_id_meter_to / 1024)::INTEGER) AS block
+    CROSS JOIN generate_series(months_start, months_end - INTERVAL '1 day', INTERVAL '1 month') AS month;
+    PERFORM lock_reading_rollups(lock_id_meters, lock_months);
+
+    INSERT INTO reading_hourly (id_meter, bucket, used_energy, readings)
+    SELECT id_meter, date_trunc('hour', time), SUM(used_energy), COUNT(*)
+    FROM Reading
+    WHERE time >= hours_start
+    AND time < hours_end
+    AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+    AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    GROUP BY id_meter, date_trunc('hour', time)
+    ON CONFLICT (id_meter, bucket)
+    DO UPDATE SET used_energy = EXCLUDED.used_energy, readings = EXCLUDED.readings;
+    GET DIAGNOSTICS refreshed_hours = ROW_COUNT;
+
+    DELETE FROM reading_hourly
+    WHERE bucket >= hours_start
+    AND bucket < hours_end
+    AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+    AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    AND NOT EXISTS (
+        SELECT 1 FROM Reading
+        WHERE Reading.id_meter = reading_hourly.id_meter
+        AND Reading.time >= reading_hourly.bucket
+        AND Reading.time < reading_hourly.bucket + INTERVAL '1 hour'
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_archive
+        WHERE reading_archive.month = date_trunc('month', reading_hourly.bucket)::date
+    );
+
+    INSERT INTO reading_daily (id_meter, bucket, used_energy, readings)
+    SELECT id_meter, date_trunc('day', bucket)::date, SUM(used_energy), SUM(readings)
+    FROM reading_hourly
+    WHERE bucket >= days_start
+    AND bucket < days_end
+    AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+    AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    GROUP BY id_meter, date_trunc('day', bucket)
+    ON CONFLICT (id_meter, bucket)
+    DO UPDATE SET used_energy = EXCLUDED.used_energy, readings = EXCLUDED.readings;
+
+    DELETE FROM reading_daily
+    WHERE bucket >= days_start
+    AND bucket < days_end
+    AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+    AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_hourly
+        WHERE reading_hourly.id_meter = reading_daily.id_meter
+        AND reading_hourly.bucket >= reading_daily.bucket
+        AND reading_hourly.bucket < reading_daily.bucket + INTERVAL '1 day'
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_archive
+        WHERE reading_archive.month = date_trunc('month', reading_daily.bucket)::date
+    );
+
+    INSERT INTO reading_monthly (id_meter, bucket, used_energy, readings)
+    SELECT id_meter, date_trunc('month', bucket)::date, SUM(used_energy), SUM(readings)
+    FROM reading_daily
+    WHERE bucket >= months_start
+    AND bucket < months_end
+    AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+    AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    GROUP BY id_meter, date_trunc('month', bucket)
+    ON CONFLICT (id_meter, bucket)
+    DO UPDATE SET used_energy = EXCLUDED.used_energy, readings = EXCLUDED.readings;
+
+    DELETE FROM reading_monthly
+    WHERE bucket >= months_start
+    AND bucket < months_end
+    AND (p_id_meter_from IS NULL OR id_meter >= p_id_meter_from)
+    AND (p_id_meter_to IS NULL OR id_meter <= p_id_meter_to)
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_daily
+        WHERE reading_daily.id_meter = reading_monthly.id_meter
+        AND reading_daily.bucket >= reading_monthly.bucket
+        AND reading_daily.bucket < reading_monthly.bucket + INTERVAL '1 month'
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_archive
+        WHERE reading_archive.month = reading_monthly.bucket
+    );
+
+    RETURN refreshed_hours;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recomputing the hours, days and months of a set of (meter, hour) buckets, given as two arrays of equal length.
+-- Unlike refresh_reading_rollups, it touches only the listed buckets (and their days and months), so a batch
+-- of readings scattered over many meters and a long time span refreshes no more than what it changed.
+CREATE OR REPLACE FUNCTION refresh_reading_rollup_buckets(
+    p_id_meters INTEGER[],
+    p_hours TIMESTAMP[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed_hours INTEGER;
+BEGIN
+    IF p_id_meters IS NULL OR p_hours IS NULL OR cardinality(p_id_meters) = 0 THEN
+        RETURN 0;
+    END IF;
+
+    CREATE TEMPORARY TABLE IF NOT EXISTS rollup_buckets (
+        id_meter int  NOT NULL,
+        hour timestamp  NOT NULL,
+        day date  NOT NULL,
+        month date  NOT NULL
+    ) ON COMMIT DELETE ROWS;
+    DELETE FROM rollup_buckets;
+    INSERT INTO rollup_buckets (id_meter, hour, day, month)
+    SELECT DISTINCT
+        bucket.id_meter,
+        date_trunc('hour', bucket.hour),
+        date_trunc('day', bucket.hour)::date,
+        date_trunc('month', bucket.hour)::date
+    FROM unnest(p_id_meters, p_hours) AS bucket(id_meter, hour);
+    PERFORM lock_reading_rollups(array_agg(id_meter), array_agg(month)) FROM rollup_buckets;
+
+    -- Hours: re-summed from the readings of each touched hour, through the unique (id_meter, time) index
+    INSERT INTO reading_hourly (id_meter, bucket, used_energy, readings)
+    SELECT rollup_buckets.id_meter, rollup_buckets.hour, SUM(Reading.used_energy), COUNT(*)
+    FROM rollup_buckets
+    JOIN Reading
+    ON Reading.id_meter = rollup_buckets.id_meter
+    AND Reading.time >= rollup_buckets.hour
+    AND Reading.time < rollup_buckets.hour + INTERVAL '1 hour'
+    GROUP BY rollup_buckets.id_meter, rollup_buckets.hour
+    ON CONFLICT (id_meter, bucket)
+    DO UPDATE SET used_energy = EXCLUDED.used_energy, readings = EXCLUDED.readings;
+    GET DIAGNOSTICS refreshed_hours = ROW_COUNT;
+
+    DELETE FROM reading_hourly
+    USING rollup_buckets
+    WHERE reading_hourly.id_meter = rollup_buckets.id_meter
+    AND reading_hourly.bucket = rollup_buckets.hour
+    AND NOT EXISTS (
+        SELECT 1 FROM Reading
+        WHERE Reading.id_meter = rollup_buckets.id_meter
+        AND Reading.time >= rollup_buckets.hour
+        AND Reading.time < rollup_buckets.hour + INTERVAL '1 hour'
+   
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_archive
+        WHERE reading_archive.month = rollup_buckets.month
+    );
+
+    -- Days: re-summed from the hours of each touched day
+    INSERT INTO reading_daily (id_meter, bucket, used_energy, readings)
+    SELECT days.id_meter, days.day, SUM(reading_hourly.used_energy), SUM(reading_hourly.readings)
+    FROM (SELECT DISTINCT id_meter, day FROM rollup_buckets) AS days
+    JOIN reading_hourly
+    ON reading_hourly.id_meter = days.id_meter
+    AND reading_hourly.bucket >= days.day
+    AND reading_hourly.bucket < days.day + INTERVAL '1 day'
+    GROUP BY days.id_meter, days.day
+    ON CONFLICT (id_meter, bucket)
+    DO UPDATE SET used_energy = EXCLUDED.used_energy, readings = EXCLUDED.readings;
+
+    DELETE FROM reading_daily
+    USING (SELECT DISTINCT id_meter, day FROM rollup_buckets) AS days
+    WHERE reading_daily.id_meter = days.id_meter
+    AND reading_daily.bucket = days.day
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_hourly
+        WHERE reading_hourly.id_meter = days.id_meter
+        AND reading_hourly.bucket >= days.day
+        AND reading_hourly.bucket < days.day + INTERVAL '1 day'
+   
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_archive
+        WHERE reading_archive.month = date_trunc('month', days.day)::date
+    );
+
+    -- Months: re-summed from the days of each touched month
+    INSERT INTO reading_monthly (id_meter, bucket, used_energy, readings)
+    SELECT months.id_meter, months.month, SUM(reading_daily.used_energy), SUM(reading_daily.readings)
+    FROM (SELECT DISTINCT id_meter, month FROM rollup_buckets) AS months
+    JOIN reading_daily
+    ON reading_daily.id_meter = months.id_meter
+    AND reading_daily.bucket >= months.month
+    AND reading_daily.bucket < months.month + INTERVAL '1 month'
+    GROUP BY months.id_meter, months.month
+    ON CONFLICT (id_meter, bucket)
+    DO UPDATE SET used_energy = EXCLUDED.used_energy, readings = EXCLUDED.readings;
+
+    DELETE FROM reading_monthly
+    USING (SELECT DISTINCT id_meter, month FROM rollup_buckets) AS months
+    WHERE reading_monthly.id_meter = months.id_meter
+    AND reading_monthly.bucket = months.month
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_daily
+        WHERE reading_daily.id_meter = months.id_meter
+        AND reading_daily.bucket >= months.month
+        AND reading_daily.bucket < months.month + INTERVAL '1 month'
+   
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM reading_archive
+        WHERE reading_archive.month = months.month
+    );
+
+    RETURN refreshed_hours;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Building the rollups of the readings that already exist.
+-- It can be run again to repair them: it locks all the rollups while it runs and keeps those of archived months.
+SELECT refresh_reading_rollups(MIN(time), MAX(time)) FROM Reading;
@@ -0,0 +1,776 @@
+"""
+Script for Generating a Synthetic MyEnergy Dataset at a Chosen Scale
+
+This script defines a `DatasetGenerator` class that fills a PostgreSQL database with a realistic dataset
+for performance testing: addresses, clients, offers, meters, challenges with the history of customized challenges,
+forum posts, comments, likes and meter readings. Every table is loaded in bulk with COPY, and all random choices
+come from one seed, so the same command always produces the same dataset.
+
+New rows get IDs after the largest existing ones, so the generator can be run on top of the init data
+from database_myenergy/insert_data.sql. Readings are generated by the parallel backfill of `consumption_generator`.
+Every generated client can log in with the username `user_<id_client>` and the password `benchmark-password`.
+
+Classes:
+    DatasetGenerator: A class to generate a synthetic dataset.
+
+Functions:
+    __init__: Initializes the DatasetGenerator instance.
+    open_connection_with_db, close_connection_with_db: Inherited from DatabaseConnection (database_connection.py).
+    copy_rows_to_table: Streams rows into a table with COPY FROM STDIN in fixed-size chunks.
+    get_next_id: Returns the first free ID of a table.
+    reset_sequence: Moves the ID sequence of a table past its largest ID.
+    generate_addresses: Generates addresses.
+    generate_clients: Generates registered clients living at the generated addresses.
+    generate_offers: Generates offers.
+    generate_meters: Generates one meter per client.
+    generate_challenges: Generates challenges based on the existing ones.
+    generate_customized_challenges: Generates the history of challenges taken by the clients.
+    generate_forum: Generates forum posts, comments and likes.
+    generate_dataset: Generates the whole dataset except readings.
+
+Module functions:
+    get_complete_billing_periods: Returns the closed months fully covered by the generated readings.
+
+Usage Example:
+    python dataset_generator.py --clients 100000 --start-date 2024-01-01 --end-date 2024-12-31 --interval 15 --seed 42
+
+Requirements:
+    - Python 3.12
+    - psycopg2, numpy and werkzeug libraries
+    - A PostgreSQL database created with the scripts from the database_myenergy folder, including insert_data.sql
+    - A configuration file named 'appconfig.json' with database connection details
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import itertools
+import time
+from typing import Iterable, Iterator
+
+import numpy as np
+from psycopg2 import sql
+from werkzeug.security import generate_password_hash
+
+from billing_engine import BillingEngine, parallel_generate_invoices
+from consumption_generator import COPY_CHUNK_SIZE, WORKERS, parallel_backfill_readings
+from database_connection import DatabaseConnection
+
+BENCHMARK_PASSWORD: str = "benchmark-password"
+FIRST_NAMES: list[str] = [
+    "Anna", "Maria", "Katarzyna", "Aleksandra", "Zofia", "Julia", "Dorota", "Ewa",
+    "Jan", "Piotr", "Krzysztof", "Tomasz", "Kamil", "Michał", "Paweł", "Jakub",
+]  # fmt: skip
+SURNAMES: list[str] = [
+    "Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kowalczyk", "Kamiński", "Lewandowski", "Zieliński",
+    "Szymański", "Woźniak", "Dąbrowski", "Kozłowski", "Jankowski", "Mazur", "Kwiatkowski", "Ostrowski",
+]  # fmt: skip
+STREETS: list[str] = [
+    "Koszykowa", "Kwiatowa", "Jesionowa", "Lipowa", "Polna", "Leśna", "Słoneczna", "Krótka",
+    "Szkolna", "Ogrodowa", "Brzozowa", "Łąkowa", "Długa", "Parkowa", "Sosnowa", "Wiejska",
+]  # fmt: skip
+CITIES: list[str] = [
+    "Warszawa", "Kraków", "Łódź", "Wrocław", "Poznań", "Gdańsk", "Szczecin", "Bydgoszcz",
+    "Lublin", "Białystok", "Katowice", "Gdynia", "Sopot", "Toruń", "Rzeszów", "Olsztyn",
+]  # fmt: skip
+OFFER_NAMES: list[str] = [
+    "Economical family", "Optimal household", "Green home", "Sunny roof", "Night owl", "Smart saver",
+]  # fmt: skip
+TARIFFS: list[str] = ["G11", "G12", "G12w", "G13"]
+FORUM_SENTENCES: list[str] = [
+    "I replaced all bulbs with LEDs this week.",
+    "Does anyone dry laundry outside in winter?",
+    "My consumption dropped by 10% after setting sleep mode.",
+    "What is your favourite way to save energy?",
+    "The new offer with PV installation looks interesting.",
+    "Great tips, thanks for sharing!",
+    "I got the Golden Sunbeam badge today!",
+    "Turning off standby devices really helps.",
+]
+# Points and weights of the badges from website/game/badges.py (small challenges).
+BADGE_POINTS: list[int] = [1, 2, 5, 13, 34]
+BADGE_WEIGHTS: list[float] = [0.4, 0.25, 0.2, 0.1, 0.05]
+
+
+class DatasetGenerator(DatabaseConnection):
+    def __init__(self, seed: int | None = None) -> None:
+        """
+        Initializes the DatasetGenerator instance.
+
+        This method sets up the database connection and cursor by calling `open_connection_with_db`
+        and creates the random generator shared by all tables.
+
+        Parameters:
+            seed (int, optional): The seed of the random generator.
+        """
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        super().__init__()
+
+    def copy_rows_to_table(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple],
+        chunk_size: int = COPY_CHUNK_SIZE,
+    ) -> int:
+        """
+        Streams rows into a table with COPY FROM STDIN in fixed-size chunks.
+
+        `None` values are written as empty CSV fields, which COPY loads as NULL.
+        The method does not commit.
+
+        Parameters:
+            table (str): The name of the table.
+            columns (list[str]): The names of the columns, in the order of the row values.
+            rows (iterable of tuples): The rows to load.
+            chunk_size (int, optional): The maximum number of rows per COPY. Default is 100 000.
+
+        Returns:
+            int: The number of rows copied.
+        """
+        query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+        rows_iterator: Iterator = iter(rows)
+        copied: int = 0
+        started_at: float = time.perf_counter()
+        while True:
+            chunk: list = list(itertools.islice(rows_iterator, chunk_size))
+            if not chunk:
+                break
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            self.db_cursor.copy_expert(query, buffer)
+            copied += len(chunk)
+        elapsed: float = time.perf_counter() - started_at
+        print(
+            f"{copied} records copied into the {table} table "
+            f"in {elapsed:.2f} s ({copied / elapsed if elapsed > 0 else 0:.0f} rows/s)"
+        )
+        return copied
+
+    def get_next_id(self, table: str, id_column: str) -> int:
+        """
+        Returns the first free ID of a table.
+
+        Parameters:
+            table (str): The name of the table.
+            id_column (str): The name of the ID column.
+
+        Returns:
+            int: The largest ID in the table plus one.
+        """
+        query = sql.SQL("SELECT COALESCE(MAX({}), 0) + 1 FROM {}").format(
+            sql.Identifier(id_column), sql.Identifier(table)
+        )
+        self.db_cursor.execute(query)
+        return self.db_cursor.fetchone()[0]
+
+    def reset_sequence(self, table: str, id_column: str) -> None:
+        """
+        Moves the ID sequence of a table past its largest ID.
+
+        Rows loaded with explicit IDs do not advance a SERIAL sequence, so it has to be moved
+        before the application inserts new rows.
+
+        Parameters:
+            table (str): The name of the table.
+            id_column (str): The name of the SERIAL ID column.
+        """
+        query = sql.SQL(
+            "SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({}), 1)) FROM {}"
+        ).format(sql.Identifier(id_column), sql.Identifier(table))
+        self.db_cursor.execute(query, (table, id_column))
+
+    def generate_addresses(self, number_of_addresses: int) -> np.ndarray:
+        """
+        Generates addresses.
+
+        Parameters:
+            number_of_addresses (int): The number of addresses.
+
+        Returns:
+            np.ndarray: The IDs of the generated addresses.
+        """
+        first_id: int = self.get_next_id("address", "id_address")
+        ids: np.ndarray = np.arange(first_id, first_id + number_of_addresses)
+        streets: np.ndarray = self.rng.choice(STREETS, number_of_addresses)
+        cities: np.ndarray = self.rng.choice(CITIES, number_of_addresses)
+        house_numbers: np.ndarray = self.rng.integers(1, 200, number_of_addresses)
+        local_numbers: np.ndarray = self.rng.integers(1, 100, number_of_addresses)
+        zip_codes: np.ndarray = self.rng.integers(0, 100_000, number_of_addresses)
+        rows = (
+            (
+                id_address,
+                street,
+                str(house_number),
+                str(local_number),
+                f"{zip_code // 1000:02d}-{zip_code % 1000:03d}",
+                city,
+                "",
+            )
+            for id_address, street, house_number, local_number, zip_code, city in zip(
+                ids.tolist(),
+                streets.tolist(),
+                house_numbers.tolist(),
+                local_numbers.tolist(),
+                zip_codes.tolist(),
+                cities.tolist(),
+            )
+        )
+        columns: list[str] = [
+            "id_address",
+            "street",
+            "house_number",
+            "local_number",
+            "zip_code",
+            "city",
+            "additional_info",
+        ]
+        self.copy_rows_to_table("address", columns, rows)
+        return ids
+
+    def generate_clients(
+        self, number_of_clients: int, address_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Generates registered clients living at the generated addresses.
+
+        Every client has a username, an email and the benchmark password, so they can log in,
+        and most of them have filled in the questionnaire and joined the game. Points start at zero
+        and are set by `generate_customized_challenges`.
+
+        Parameters:
+            number_of_clients (int): The number of clients.
+            address_ids (np.ndarray): The IDs of the addresses to assign.
+
+        Returns:
+            np.ndarray: The IDs of the generated clients.
+        """
+        first_id: int = self.get_next_id("client", "id_client")
+        ids: np.ndarray = np.arange(first_id, first_id + number_of_clients)
+        password: str = generate_password_hash(
+            BENCHMARK_PASSWORD, method="pbkdf2:sha256"
+        )
+        names: np.ndarray = self.rng.choice(FIRST_NAMES, number_of_clients)
+        surnames: np.ndarray = self.rng.choice(SURNAMES, number_of_clients)
+        addresses: np.ndarray = self.rng.choice(address_ids, number_of_clients)
+        members: np.ndarray = self.rng.random(number_of_clients) < 0.8
+        rooms: np.ndarray = self.rng.integers(1, 8, number_of_clients)
+        residents: np.ndarray = self.rng.integers(1, 6, number_of_clients)
+        rows = (
+            (
+                id_client,
+                f"user_{id_client}",
+                name,
+                surname,
+                f"9{id_client:010d}",
+                0,
+                id_address,
+                f"user_{id_client}@example.com",
+                password,
+                member,
+                number_of_rooms,
+                number_of_residents,
+            )
+            for id_client, name, surname, id_address, member, number_of_rooms, number_of_residents in zip(
+                ids.tolist(),
+                names.tolist(),
+                surnames.tolist(),
+                addresses.tolist(),
+                members.tolist(),
+                rooms.tolist(),
+                residents.tolist(),
+            )
+        )
+        columns: list[str] = [
+            "id_client",
+            "username",
+            "name",
+            "surname",
+            "pesel",
+            "points",
+            "id_clients_mailing_address",
+            "email",
+            "password",
+            "member_of_challenge",
+            "number_of_rooms",
+            "number_of_residents",
+        ]
+        self.copy_rows_to_table("client", columns, rows)
+        return ids
+
+    def generate_offers(self, number_of_offers: int) -> np.ndarray:
+        """
+        Generates offers.
+
+        Parameters:
+            number_of_offers (int): The number of offers.
+
+        Returns:
+            np.ndarray: The IDs of the generated offers.
+        """
+        first_id: int = self.get_next_id("offer", "id_offer")
+        ids: np.ndarray = np.arange(first_id, first_id + number_of_offers)
+        prices: np.ndarray = np.round(self.rng.uniform(0.8, 1.6, number_of_offers), 5)
+        rows = (
+            (
+                id_offer,
+                f"{OFFER_NAMES[number % len(OFFER_NAMES)]} {number // len(OFFER_NAMES) + 1}",
+                self.rng.choice(TARIFFS),
+                bool(self.rng.random() < 0.3),
+                price,
+            )
+            for number, (id_offer, price) in enumerate(
+                zip(ids.tolist(), prices.tolist())
+            )
+        )
+        columns: list[str] = [
+            "id_offer",
+            "name",
+            "tarrif",
+            "pv_installation",
+            "kwh_price",
+        ]
+        self.copy_rows_to_table("offer", columns, rows)
+        self.reset_sequence("offer", "id_offer")
+        return ids
+
+    def generate_meters(self, client_ids: np.ndarray, offer_ids: np.ndarray) -> int:
+        """
+        Generates one meter per client.
+
+        Parameters:
+            client_ids (np.ndarray): The IDs of the clients.
+            offer_ids (np.ndarray): The IDs of the offers to assign.
+
+        Returns:
+            int: The number of generated meters.
+        """
+        offers: np.ndarray = self.rng.choice(offer_ids, len(client_ids))
+        ppe_numbers: np.ndarray = self.rng.integers(
+            0, 10**18, len(client_ids), dtype=np.uint64
+        )
+        rows = (
+            (id_client, f"{ppe:018d}", id_offer)
+            for id_client, ppe, id_offer in zip(
+                client_ids.tolist(), ppe_numbers.tolist(), offers.tolist()
+            )
+        )
+        return self.copy_rows_to_table("meter", ["id_client", "ppe", "id_offer"], rows)
+
+    def generate_challenges(self, number_of_challenges: int) -> np.ndarray:
+        """
+        Generates challenges based on the existing ones.
+
+        A challenge description is a template filled in by its customizing function in
+        website/customized_tasks.py, so the generated challenges are numbered copies of the challenges
+        from insert_data.sql rather than random text.
+
+        Parameters:
+            number_of_challenges (int): The number of additional challenges.
+
+        Returns:
+            np.ndarray: The IDs of all challenges, existing and generated.
+
+        Raises:
+            ValueError: If there are no challenges to copy.
+        """
+        self.db_cursor.execute(
+            "SELECT id_challenge, name, type_small_big, description, customizing_function "
+            "FROM challenge ORDER BY id_challenge"
+        )
+        templates: list[tuple] = self.db_cursor.fetchall()
+        if not templates:
+            raise ValueError(
+                "There are no challenges to copy, run insert_data.sql first"
+            )
+        first_id: int = self.get_next_id("challenge", "id_challenge")
+        rows = (
+            (
+                first_id + number,
+                f"{name[:40]} #{number // len(templates) + 2}",
+                type_small_big,
+                description,
+                customizing_function,
+            )
+            for number, (
+                _,
+                name,
+                type_small_big,
+                description,
+                customizing_function,
+            ) in zip(range(number_of_challenges), itertools.cycle(templates))
+        )
+        columns: list[str] = [
+            "id_challenge",
+            "name",
+            "type_small_big",
+            "description",
+            "customizing_function",
+        ]
+        self.copy_rows_to_table("challenge", columns, rows)
+        self.reset_sequence("challenge", "id_challenge")
+        return np.concatenate(
+            [
+                np.array([template[0] for template in templates]),
+                np.arange(first_id, first_id + number_of_challenges),
+            ]
+        )
+
+    def generate_customized_challenges(
+        self,
+        client_ids: np.ndarray,
+        challenge_ids: np.ndarray,
+        challenges_per_client: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> int:
+        """
+        Generates the history of challenges taken by the clients.
+
+        Every client takes up to `challenges_per_client` different challenges, each started on a random day
+        of the date range and lasting a week. Most of them are finished with a badge, whose points are drawn with
+        the weights of small challenges; the clients' points are then set to the sum of their badges.
+
+        Parameters:
+            client_ids (np.ndarray): The IDs of the clients.
+            challenge_ids (np.ndarray): The IDs of the challenges.
+            challenges_per_client (int): The maximum number of challenges per client.
+            start_date (date): The first possible start date.
+            end_date (date): The last possible start date.
+
+        Returns:
+            int: The number of generated customized challenges.
+        """
+        challenges_per_client = min(challenges_per_client, len(challenge_ids))
+        days: int = max((end_date - start_date).days, 0) + 1
+        points_per_client: dict[int, int] = {}
+
+        def rows() -> Iterator[tuple]:
+            for id_client in client_ids.tolist():
+                taken: int = int(self.rng.integers(0, challenges_per_client + 1))
+                challenges: list[int] = self.rng.choice(
+                    challenge_ids, taken, replace=False
+                ).tolist()
+                offsets: list[int] = self.rng.integers(0, days, taken).tolist()
+                done: list[bool] = (self.rng.random(taken) < 0.7).tolist()
+                points: list[int] = self.rng.choice(
+                    BADGE_POINTS, taken, p=BADGE_WEIGHTS
+                ).tolist()
+                total: int = 0
+                for id_challenge, offset, is_done, badge_points in zip(
+                    challenges, offsets, done, points
+                ):
+                    challenge_start: datetime.date = start_date + datetime.timedelta(
+                        days=offset
+                    )
+                    points_scored: int = badge_points if is_done else 0
+                    total += points_scored
+                    yield (
+                        id_client,
+                        id_challenge,
+                        is_done,
+                        points_scored,
+                        challenge_start,
+                        challenge_start + datetime.timedelta(days=8),
+                    )
+                points_per_client[id_client] = total
+
+        columns: list[str] = [
+            "id_client",
+            "id_challenge",
+            "is_done",
+            "points_scored",
+            "start_date",
+            "end_date",
+        ]
+        copied: int = self.copy_rows_to_table("customizedchallenge", columns, rows())
+        self.db_cursor.execute(
+            "CREATE TEMPORARY TABLE client_points (id_client int, points int) ON COMMIT DROP"
+        )
+        self.copy_rows_to_table(
+            "client_points", ["id_client", "points"], points_per_client.items()
+        )
+        self.db_cursor.execute(
+            "UPDATE client SET points = client_points.points "
+            "FROM client_points WHERE client.id_client = client_points.id_client"
+        )
+        return copied
+
+    def generate_forum(
+        self,
+        client_ids: np.ndarray,
+        number_of_posts: int,
+        number_of_comments: int,
+        number_of_likes: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> None:
+        """
+        Generates forum posts, comments and likes.
+
+        Authors are drawn from the clients, comments and likes are spread over the posts,
+        and every like is unique for a (post, author) pair.
+
+        Parameters:
+            client_ids (np.ndarray): The IDs of the clients.
+            number_of_posts (int): The number of posts.
+            number_of_comments (int): The number of comments.
+            number_of_likes (int): The number of likes.
+            start_date (date): The first possible creation date.
+            end_date (date): The last possible creation date.
+        """
+        seconds: int = max(int((end_date - start_date).total_seconds()), 1) + 86_400
+        start: datetime.datetime = datetime.datetime.combine(
+            start_date, datetime.time()
+        )
+
+        def random_times(size: int) -> list[datetime.datetime]:
+            return [
+                start + datetime.timedelta(seconds=offset)
+                for offset in self.rng.integers(0, seconds, size).tolist()
+            ]
+
+        first_post_id: int = self.get_next_id("post", "id_post")
+        post_ids: np.ndarray = np.arange(first_post_id, first_post_id + number_of_posts)
+        post_rows = zip(
+            post_ids.tolist(),
+            self.rng.choice(FORUM_SENTENCES, number_of_posts).tolist(),
+            random_times(number_of_posts),
+            self.rng.choice(client_ids, number_of_posts).tolist(),
+        )
+        self.copy_rows_to_table(
+            "post", ["id_post", "text", "date_created", "id_author"], post_rows
+        )
+        self.reset_sequence("post", "id_post")
+        if not number_of_posts:
+            return
+
+        comment_rows = zip(
+            self.rng.choice(FORUM_SENTENCES, number_of_comments).tolist(),
+            random_times(number_of_comments),
+            self.rng.choice(post_ids, number_of_comments).tolist(),
+            self.rng.choice(client_ids, number_of_comments).tolist(),
+        )
+        self.copy_rows_to_table(
+            "comment", ["text", "date_created", "id_post", "id_author"], comment_rows
+        )
+
+        number_of_likes = min(number_of_likes, number_of_posts * len(client_ids))
+        likes: np.ndarray = np.unique(
+            self.rng.integers(0, number_of_posts * len(client_ids), number_of_likes)
+        )
+        like_rows = zip(
+            random_times(len(likes)),
+            post_ids[likes // len(client_ids)].tolist(),
+            client_ids[likes % len(client_ids)].tolist(),
+        )
+        self.copy_rows_to_table(
+            "favourite", ["date_created", "id_post", "id_author"], like_rows
+        )
+
+    def generate_dataset(
+        self,
+        number_of_clients: int,
+        number_of_addresses: int,
+        number_of_offers: int,
+        number_of_challenges: int,
+        challenges_per_client: int,
+        number_of_posts: int,
+        number_of_comments: int,
+        number_of_likes: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> None:
+        """
+        Generates the whole dataset except readings, in one transaction.
+
+        Parameters:
+            number_of_clients (int): The number of clients (and meters).
+            number_of_addresses (int): The number of addresses shared by the clients.
+            number_of_offers (int): The number of offers.
+            number_of_challenges (int): The number of additional challenges.
+            challenges_per_client (int): The maximum number of challenges taken per client.
+            number_of_posts (int): The number of forum posts.
+            number_of_comments (int): The number of forum comments.
+            number_of_likes (int): The number of forum likes.
+            start_date (date): The first day of the generated history.
+            end_date (date): The last day of the generated history.
+        """
+        address_ids: np.ndarray = self.generate_addresses(number_of_addresses)
+        client_ids: np.ndarray = self.generate_clients(number_of_clients, address_ids)
+        offer_ids: np.ndarray = self.generate_offers(number_of_offers)
+        self.generate_meters(client_ids, offer_ids)
+        challenge_ids: np.ndarray = self.generate_challenges(number_of_challenges)
+        self.generate_customized_challenges(
+            client_ids, challenge_ids, challenges_per_client, start_date, end_date
+        )
+        self.generate_forum(
+            client_ids,
+            number_of_posts,
+            number_of_comments,
+            number_of_likes,
+            start_date,
+            end_date,
+        )
+        self.db_connection.commit()
+
+
+def get_complete_billing_periods(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    interval_minutes: int,
+    today: datetime.date | None = None,
+) -> list[datetime.date]:
+    """
+    Returns the closed months fully covered by the generated readings.
+
+    A month is billed only if the readings start at its beginning and run to its end, because an invoice is never
+    corrected: billing a partially generated month would keep its partial usage even after the rest is backfilled.
+
+    Parameters:
+        start_date (datetime): The first reading time.
+        end_date (datetime): The last reading time.
+        interval_minutes (int): The interval between readings in minutes.
+        today (date, optional): The reference date for closed months. Default is today.
+
+    Returns:
+        list[date]: The first days of the months to bill, oldest first.
+
+    Example usage:
+        get_complete_billing_periods(datetime.datetime(2024, 1, 1), datetime.datetime(2024, 3, 15), 15)
+        # [2024-01-01, 2024-02-01]
+    """
+    billing_period: datetime.date = start_date.date().replace(day=1)
+    if start_date > datetime.datetime.combine(billing_period, datetime.time()):
+        billing_period = (billing_period + datetime.timedelta(days=32)).replace(day=1)
+    # The month of the next reading after the range is the first one that is not complete
+    first_incomplete_period: datetime.date = (
+        (end_date + datetime.timedelta(minutes=interval_minutes)).date().replace(day=1)
+    )
+    last_billing_period: datetime.date = BillingEngine.get_previous_billing_period(
+        today
+    )
+    billing_periods: list[datetime.date] = []
+    while (
+        billing_period < first_incomplete_period
+        and billing_period <= last_billing_period
+    ):
+        billing_periods.append(billing_period)
+        billing_period = (billing_period + datetime.timedelta(days=32)).replace(day=1)
+    return billing_periods
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic MyEnergy dataset for performance testing."
+    )
+    parser.add_argument(
+        "--clients", type=int, required=True, help="the number of clients and meters"
+    )
+    parser.add_argument(
+        "--addresses",
+        type=int,
+        help="the number of addresses (default: one per client)",
+    )
+    parser.add_argument(
+        "--offers", type=int, default=10, help="the number of offers (default: 10)"
+    )
+    parser.add_argument(
+        "--challenges",
+        type=int,
+        default=0,
+        help="the number of additional challenges (default: 0)",
+    )
+    parser.add_argument(
+        "--challenges-per-client",
+        type=int,
+        default=3,
+        help="the maximum number of challenges taken per client (default: 3)",
+    )
+    parser.add_argument(
+        "--posts",
+        type=int,
+        help="the number of forum posts (default: a tenth of the clients)",
+    )
+    parser.add_argument(
+        "--comments",
+        type=int,
+        help="the number of forum comments (default: three per post)",
+    )
+    parser.add_argument(
+        "--likes", type=int, help="the number of forum likes (default: five per post)"
+    )
+    parser.add_argument(
+        "--start-date",
+        type=datetime.datetime.fromisoformat,
+        required=True,
+        help="the first reading time",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=datetime.datetime.fromisoformat,
+        required=True,
+        help="the last reading time",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=15,
+        help="the interval between readings in minutes (default: 15)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="the number of worker processes (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="the seed of the random generators"
+    )
+    parser.add_argument(
+        "--skip-readings", action="store_true", help="do not generate readings"
+    )
+    parser.add_argument(
+        "--with-invoices",
+        action="store_true",
+        help="bill every closed month fully covered by the date range",
+    )
+    arguments = parser.parse_args()
+    posts: int = (
+        arguments.posts if arguments.posts is not None else arguments.clients // 10
+    )
+
+    dataset_generator = DatasetGenerator(arguments.seed)
+    dataset_generator.generate_dataset(
+        number_of_clients=arguments.clients,
+        number_of_addresses=arguments.addresses or arguments.clients,
+        number_of_offers=arguments.offers,
+        number_of_challenges=arguments.challenges,
+        challenges_per_client=arguments.challenges_per_client,
+        number_of_posts=posts,
+        number_of_comments=(
+            arguments.comments if arguments.comments is not None else 3 * posts
+        ),
+        number_of_likes=arguments.likes if arguments.likes is not None else 5 * posts,
+        start_date=arguments.start_date.date(),
+        end_date=arguments.end_date.date(),
+    )
+    dataset_generator.close_connection_with_db()
+
+    if not arguments.skip_readings:
+        parallel_backfill_readings(
+            arguments.start_date,
+            arguments.end_date,
+            arguments.interval,
+            arguments.workers,
+            arguments.seed,
+        )
+    if arguments.with_invoices:
+        for billing_period in get_complete_billing_periods(
+            arguments.start_date, arguments.end_date, arguments.interval
+        ):
+            parallel_generate_invoices(billing_period, arguments.workers)
@@ -0,0 +1,463 @@
+"""
+Script for Managing the Monthly Partitions of the Reading Table
+
+This script defines a `PartitionManager` class that maintains the monthly range partitions of the `reading` table
+created by database_myenergy/partitioning.sql. It creates future partitions, moves an existing unpartitioned
+`reading` table into partitions while the application keeps running, and detaches old months.
+
+Classes:
+    PartitionManager: A class to manage the partitions of the reading table.
+
+Functions:
+    open_connection_with_db, close_connection_with_db: Inherited from DatabaseConnection (database_connection.py).
+    is_partitioned: Checks whether a table is partitioned.
+    add_constraint: Adds a constraint to a table unless a constraint with the same name exists.
+    create_partitions: Creates the partitions of every month between two dates.
+    create_future_partitions: Creates the partitions of the current month and the next months.
+    migrate_to_partitions: Moves an unpartitioned reading table into monthly partitions online, resumably.
+    copy_to_partitions: Performs the repeatable steps of the migration.
+    copy_missing_readings: Copies the readings of the old table that are missing from the partitioned one.
+    get_partitions: Retrieves the monthly partitions of the reading table.
+    get_detached_partitions: Retrieves the month tables detached from the reading table and not dropped.
+    detach_partition: Detaches (and optionally drops) one partition of the reading table.
+    detach_partitions: Detaches (and optionally drops) the partitions of months before a date.
+
+Usage Example:
+    python partition_manager.py create-future --months 3
+    python partition_manager.py migrate --batch-size 100000
+    python partition_manager.py detach --before 2023-01 --drop
+
+Requirements:
+    - Python 3.12
+    - psycopg2 library
+    - PostgreSQL 14 or newer with the functions from database_myenergy/partitioning.sql
+    - A configuration file named 'appconfig.json' with database connection details
+"""
+
+import argparse
+import datetime
+
+from psycopg2 import sql
+
+from database_connection import DatabaseConnection
+
+MIGRATION_BATCH_SIZE: int = 100_000
+
+
+class PartitionManager(DatabaseConnection):
+    def is_partitioned(self, table: str = "reading") -> bool:
+        """
+        Checks whether a table is partitioned.
+
+        Parameters:
+            table (str, optional): The name of the table. Default is 'reading'.
+
+        Returns:
+            bool: True if the table is a partitioned table.
+        """
+        query: str = (
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))"
+        )
+        self.db_cursor.execute(query, (table,))
+        return self.db_cursor.fetchone()[0]
+
+    def add_constraint(self, table: str, name: str, definition: str) -> None:
+        """
+        Adds a constraint to a table unless a constraint with the same name exists.
+
+        Parameters:
+            table (str): The name of the table.
+            name (str): The name of the constraint.
+            definition (str): The SQL definition of the constraint, e.g. 'UNIQUE (id_meter, time)'.
+        """
+        self.db_cursor.execute(
+            "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s",
+            (table, name),
+        )
+        if self.db_cursor.fetchone() is None:
+            self.db_cursor.execute(
+                sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                    sql.Identifier(table), sql.Identifier(name), sql.SQL(definition)
+                )
+            )
+
+    def create_partitions(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        parent: str = "reading",
+    ) -> int:
+        """
+        Creates the partitions of every month between two dates.
+
+        Partitions that already exist are left untouched.
+
+        Parameters:
+            start_date (date): Any day of the first month.
+            end_date (date): Any day of the last month.
+            parent (str, optional): The partitioned table. Default is 'reading'.
+
+        Returns:
+            int: The number of months covered.
+
+        Raises:
+            psycopg2.Error: If a month of the range is archived (see reading_archiver.py).
+        """
+        query: str = "SELECT create_reading_partitions(%s, %s, %s)"
+        self.db_cursor.execute(query, (start_date, end_date, parent))
+        months: int = self.db_cursor.fetchone()[0]
+        self.db_connection.commit()
+        print(
+            f"Partitions of {parent} from {start_date:%Y-%m} to {end_date:%Y-%m} are ready"
+        )
+        return months
+
+    def create_future_partitions(
+        self, months_ahead: int = 3, parent: str = "reading"
+    ) -> int:
+        """
+        Creates the partitions of the current month and the next months.
+
+        Run it periodically (e.g. daily from cron) so incoming readings always find their partition.
+
+        Parameters:
+            months_ahead (int, optional): The number of months to create ahead of the current one. Default is 3.
+            parent (str, optional): The partitioned table. Default is 'reading'.
+
+        Returns:
+            int: The number of months covered.
+        """
+        today: datetime.date = datetime.date.today()
+        years, month = divmod(today.month - 1 + months_ahead, 12)
+        last_month: datetime.date = datetime.date(today.year + years, month + 1, 1)
+        return self.create_partitions(today, last_month, parent)
+
+    def migrate_to_partitions(
+        self, batch_size: int = MIGRATION_BATCH_SIZE, drop_old: bool = False
+    ) -> int:
+        """
+        Moves an unpartitioned reading table into monthly partitions online.
+
+        The method performs the following steps:
+        1. Creates `reading_partitioned` with the same columns and the monthly partitions covering all readings.
+        2. Copies the readings in batches of `batch_size` IDs, committing after each batch, while the application
+           keeps reading from and writing to the old table.
+        3. Copies the readings the batches missed: readings inserted in the meantime, and readings of transactions
+           that committed after the batch of their IDs was copied.
+        4. In one transaction that blocks writes (reads are still allowed), repeats step 3 as a final catch-up
+           and swaps the tables, so `reading` becomes the partitioned table.
+        5. Keeps the old table as `reading_unpartitioned`, or drops it if `drop_old` is set.
+
+        The partitioned table gets the primary key, the unique (id_meter, time) constraint (duplicated readings
+        are dropped on the way) and the BRIN index on time; the old table's constraints and indexes are renamed
+        with an `_unpartitioned` suffix.
+        Readings are append-only; updates or deletes of already copied readings made during step 2 are not carried over.
+        The final catch-up compares the IDs of both tables, so writes wait for one pass over them.
+
+        Every step can be repeated, so a migration that failed or was interrupted is resumed by running it again:
+        the existing `reading_partitioned` table is reused and the copy continues after its last reading.
+        The current batch (or the swap) is rolled back on failure.
+
+        Parameters:
+            batch_size (int, optional): The number of reading IDs copied per batch. Default is 100 000.
+            drop_old (bool, optional): Whether to drop the old table after the swap. Default is False.
+
+        Returns:
+            int: The number of readings moved.
+        """
+        if self.is_partitioned("reading"):
+            print("The reading table is already partitioned")
+            return 0
+        try:
+            return self.copy_to_partitions(batch_size, drop_old)
+        except Exception:
+            self.db_connection.rollback()
+            print(
+                "The migration failed, run it again to resume from the last copied batch"
+            )
+            raise
+
+    def copy_to_partitions(self, batch_size: int, drop_old: bool) -> int:
+        """
+        Performs the steps of `migrate_to_partitions`; each of them can be repeated after a failure.
+
+        Parameters:
+            batch_size (int): The number of reading IDs copied per batch.
+            drop_old (bool): Whether to drop the old table after the swap.
+
+        Returns:
+            int: The number of readings moved by this run.
+        """
+        self.db_cursor.execute(
+            "CREATE TABLE IF NOT EXISTS reading_partitioned (LIKE reading INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (time)"
+        )
+        self.add_constraint(
+            "reading_partitioned",
+            "reading_partitioned_pk",
+            "PRIMARY KEY (id_reading, time)",
+        )
+        self.add_constraint(
+            "reading_partitioned",
+            "reading_partitioned_id_meter_time_uq",
+            "UNIQUE (id_meter, time)",
+        )
+        self.add_constraint(
+            "reading_partitioned",
+            "meter_reading_partitioned",
+            "FOREIGN KEY (id_meter) REFERENCES meter (id_meter)",
+        )
+        self.db_cursor.execute(
+            "SELECT min(time), max(time), COALESCE(min(id_reading) - 1, 0), COALESCE(max(id_reading), 0) FROM reading"
+        )
+        first_time, last_time, last_copied_id, max_id = self.db_cursor.fetchone()
+        # Resuming an interrupted copy after the last reading already copied
+        self.db_cursor.execute("SELECT max(id_reading) FROM reading_partitioned")
+        last_copied_id = max(last_copied_id, self.db_cursor.fetchone()[0] or 0)
+        today: datetime.date = datetime.date.today()
+        self.db_connection.commit()
+        self.create_partitions(
+            (first_time.date() if first_time else today),
+            max(last_time.date() if last_time else today, today),
+            "reading_partitioned",
+        )
+        self.create_future_partitions(parent="reading_partitioned")
+
+        copy_query: str = (
+            "INSERT INTO reading_partitioned SELECT * FROM reading "
+            "WHERE id_reading > %s AND id_reading <= %s "
+            "ON CONFLICT (id_meter, time) DO NOTHING"
+        )
+        moved: int = 0
+        while last_copied_id < max_id:
+            batch_end: int = min(last_copied_id + batch_size, max_id)
+            self.db_cursor.execute(copy_query, (last_copied_id, batch_end))
+            moved += self.db_cursor.rowcount
+            self.db_connection.commit()
+            last_copied_id = batch_end
+            print(f"{moved} readings copied (up to id {last_copied_id} of {max_id})")
+        self.db_cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_reading_partitioned_time_brin "
+            "ON reading_partitioned USING brin (time)"
+        )
+        self.db_connection.commit()
+        # Most late readings are copied before writes are blocked, the rest under the lock
+        moved += self.copy_missing_readings()
+        self.db_connection.commit()
+
+        self.db_cursor.execute("SELECT pg_get_serial_sequence('reading', 'id_reading')")
+        sequence: str = self.db_cursor.fetchone()[0]
+        self.db_cursor.execute("LOCK TABLE reading IN EXCLUSIVE MODE")
+        moved += self.copy_missing_readings()
+        self.db_cursor.execute(
+            "SELECT index_class.relname FROM pg_index "
+            "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+            "LEFT JOIN pg_constraint ON pg_constraint.conindid = pg_index.indexrelid "
+            "WHERE pg_index.indrelid = 'reading'::regclass AND pg_constraint.oid IS NULL"
+        )
+        old_indexes: list[str] = [row[0] for row in self.db_cursor.fetchall()]
+        self.db_cursor.execute("ALTER TABLE reading RENAME TO reading_unpartitioned")
+        self.db_cursor.execute(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = 'reading_unpartitioned'::regclass AND contype IN ('p', 'u')"
+        )
+        for (constraint,) in self.db_cursor.fetchall():
+            self.db_cursor.execute(
+                sql.SQL(
+                    "ALTER TABLE reading_unpartitioned RENAME CONSTRAINT {} TO {}"
+                ).format(
+                    sql.Identifier(constraint),
+                    sql.Identifier(f"{constraint}_unpartitioned"),
+                )
+            )
+        for index in old_indexes:
+            self.db_cursor.execute(
+                sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                    sql.Identifier(index), sql.Identifier(f"{index}_unpartitioned")
+                )
+            )
+        for statement in (
+            "ALTER TABLE reading_partitioned RENAME TO reading",
+            "ALTER TABLE reading RENAME CONSTRAINT reading_partitioned_pk TO reading_pk",
+            "ALTER TABLE reading RENAME CONSTRAINT reading_partitioned_id_meter_time_uq "
+            "TO reading_id_meter_time_uq",
+            "ALTER TABLE reading RENAME CONSTRAINT meter_reading_partitioned TO meter_reading",
+            "ALTER INDEX ix_reading_partitioned_time_brin RENAME TO ix_reading_time_brin",
+        ):
+            self.db_cursor.execute(statement)
+        if sequence:
+            self.db_cursor.execute(
+                sql.SQL("ALTER SEQUENCE {} OWNED BY reading.id_reading").format(
+                    sql.SQL(sequence)
+                )
+            )
+        if drop_old:
+            self.db_cursor.execute("DROP TABLE reading_unpartitioned")
+        self.db_connection.commit()
+        print(f"The reading table is partitioned, {moved} readings moved")
+        return moved
+
+    def copy_missing_readings(self) -> int:
+        """
+        Copies the readings of the old table that are missing from the partitioned one.
+
+        The batches of `copy_to_partitions` copy ranges of IDs, so they miss the readings inserted after the last
+        batch and those of transactions that committed after the batch of their IDs had been copied. They are found
+        by their IDs, and the partitions of their months are created first. The method does not commit.
+
+        Returns:
+            int: The number of readings copied.
+        """
+        missing: str = (
+            "FROM reading source WHERE NOT EXISTS ("
+            "SELECT 1 FROM reading_partitioned copied WHERE copied.id_reading = source.id_reading)"
+        )
+        self.db_cursor.execute(f"SELECT min(time), max(time) {missing}")
+        first_time, last_time = self.db_cursor.fetchone()
+        if first_time is None:
+            return 0
+        self.db_cursor.execute(
+            "SELECT create_reading_partitions(%s, %s, 'reading_partitioned')",
+            (first_time.date(), last_time.date()),
+        )
+        self.db_cursor.execute(
+            f"INSERT INTO reading_partitioned SELECT source.* {missing} "
+            "ON CONFLICT (id_meter, time) DO NOTHING"
+        )
+        copied: int = self.db_cursor.rowcount
+        print(f"{copied} late readings copied")
+        return copied
+
+    def get_partitions(self) -> list[tuple[str, datetime.date]]:
+        """
+        Retrieves the monthly partitions of the reading table.
+
+        Returns:
+            list[tuple[str, date]]: The partition names with the first day of their month, oldest first.
+        """
+        query: str = (
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = 'reading'::regclass "
+            "AND child.relname ~ '^reading_y[0-9]{4}m[0-9]{2}$' "
+            "ORDER BY child.relname"
+        )
+        self.db_cursor.execute(query)
+        return [
+            (name, datetime.datetime.strptime(name, "reading_y%Ym%m").date())
+            for (name,) in self.db_cursor.fetchall()
+        ]
+
+    def get_detached_partitions(self) -> list[tuple[str, datetime.date]]:
+        """
+        Retrieves the month tables detached from the reading table and not dropped.
+
+        Returns:
+            list[tuple[str, date]]: The table names with the first day of their month, oldest first.
+        """
+        query: str = (
+            "SELECT relname FROM pg_class "
+            "WHERE relnamespace = current_schema()::regnamespace "
+            "AND relkind = 'r' AND NOT relispartition "
+            "AND relname ~ '^reading_y[0-9]{4}m[0-9]{2}$' "
+            "ORDER BY relname"
+        )
+        self.db_cursor.execute(query)
+        return [
+            (name, datetime.datetime.strptime(name, "reading_y%Ym%m").date())
+            for (name,) in self.db_cursor.fetchall()
+        ]
+
+    def detach_partition(self, name: str, drop: bool = False) -> None:
+        """
+        Detaches (and optionally drops) one partition of the reading table.
+
+        The partition is detached with `DETACH PARTITION ... CONCURRENTLY`, which does not block queries
+        on the other months. A detach that was interrupted is finalized instead.
+
+        Parameters:
+            name (str): The name of the partition.
+            drop (bool, optional): Whether to drop the detached partition. Default is False.
+        """
+        self.db_cursor.execute(
+            "SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = to_regclass(%s)",
+            (name,),
+        )
+        pending: tuple | None = self.db_cursor.fetchone()
+        self.db_connection.commit()
+        self.db_connection.autocommit = True
+        try:
+            if pending is not None:
+                self.db_cursor.execute(
+                    sql.SQL("ALTER TABLE reading DETACH PARTITION {} {}").format(
+                        sql.Identifier(name),
+                        sql.SQL("FINALIZE" if pending[0] else "CONCURRENTLY"),
+                    )
+                )
+            if drop:
+                self.db_cursor.execute(
+                    sql.SQL("DROP TABLE {}").format(sql.Identifier(name))
+                )
+        finally:
+            self.db_connection.autocommit = False
+        print(f"Partition {name} {'dropped' if drop else 'detached'}")
+
+    def detach_partitions(self, before: datetime.date, drop: bool = False) -> list[str]:
+        """
+        Detaches (and optionally drops) the partitions of months before a date.
+
+        Partitions are detached with `DETACH PARTITION ... CONCURRENTLY`, which does not block queries
+        on the other months. A detached partition is an ordinary table that can be archived or dropped.
+
+        Parameters:
+            before (date): Months starting before this date are detached.
+            drop (bool, optional): Whether to drop the detached partitions. Default is False.
+
+        Returns:
+            list[str]: The names of the detached partitions.
+        """
+        detached: list[str] = []
+        for name, month in self.get_partitions():
+            if month >= before.replace(day=1):
+                break
+            self.detach_partition(name, drop)
+            detached.append(name)
+        return detached
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Manage the monthly partitions of the reading table."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create_future_parser = subparsers.add_parser(
+        "create-future", help="create the partitions of the next months"
+    )
+    create_future_parser.add_argument("--months", type=int, default=3)
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="move an unpartitioned reading table into partitions"
+    )
+    migrate_parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    migrate_parser.add_argument("--drop-old", action="store_true")
+    detach_parser = subparsers.add_parser(
+        "detach", help="detach the partitions of months before a date"
+    )
+    detach_parser.add_argument(
+        "--before",
+        type=lambda value: datetime.datetime.strptime(value, "%Y-%m").date(),
+        required=True,
+        help="the first month to keep as YYYY-MM",
+    )
+    detach_parser.add_argument("--drop", action="store_true")
+    arguments = parser.parse_args()
+
+    partition_manager = PartitionManager()
+    if arguments.command == "create-future":
+        partition_manager.create_future_partitions(arguments.months)
+    elif arguments.command == "migrate":
+        partition_manager.migrate_to_partitions(
+            arguments.batch_size, arguments.drop_old
+        )
+    else:
+        partition_manager.detach_partitions(arguments.before, arguments.drop)
+    partition_manager.close_connection_with_db()
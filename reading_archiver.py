@@ -0,0 +1,285 @@
+"""
+Script for Archiving Old Months of Readings to Memory-Mappable Files
+
+This script defines a `ReadingArchiver` class that moves the readings of closed months older than a retention window
+out of PostgreSQL. Every month is exported from its partition to one NumPy `.npy` file of fixed-width records
+(id_meter, time, used_energy) sorted by meter, then by time, and listed in a manifest. The partition is detached
+before the export, so no reading can be added to the month while it is exported (ingest and the generators refuse
+a month without a partition). The detached table is dropped only once the file holds all its rows, so the month
+no longer takes heap, index or vacuum space. Archived months are listed in the manifest and in the `reading_archive`
+table, which keeps their rollups from being deleted and their partitions from being created again.
+
+The files are not compressed on purpose: an uncompressed `.npy` file can be memory-mapped, and the website
+(website/archive.py) finds the readings of one meter with a binary search over the mapped file, reading only
+the pages it needs. A record takes 20 bytes, about a third of a row of the `reading` table with its indexes.
+The consumption rollups (database_myenergy/rollups.sql) are kept, so multi-day charts and invoices
+of archived months do not need the files at all.
+
+Classes:
+    ReadingArchiver: A class to archive old months of readings.
+
+Functions:
+    __init__: Initializes the ReadingArchiver instance.
+    open_connection_with_db, close_connection_with_db: Inherited from DatabaseConnection (database_connection.py).
+    get_archive_cutoff: Returns the first month kept in the database.
+    load_manifest: Reads the manifest of the archived months.
+    save_manifest: Atomically writes the manifest of the archived months.
+    record_month: Records an archived month in the reading_archive table.
+    export_month: Exports the readings of one detached month partition to a `.npy` file.
+    archive_months: Detaches, exports, records and drops the partitions of the months older than the retention window.
+
+Usage Example:
+    reading_archiver = ReadingArchiver("archive")
+    reading_archiver.archive_months(retention_months=12)
+    reading_archiver.close_connection_with_db()
+
+    python reading_archiver.py --retention-months 12 --archive-dir archive
+
+Requirements:
+    - Python 3.12
+    - psycopg2 library
+    - numpy library
+    - A PostgreSQL database with the monthly partitions from database_myenergy/partitioning.sql
+    - A configuration file named 'appconfig.json' with database connection details
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+from psycopg2 import sql
+
+from database_connection import DatabaseConnection
+from partition_manager import PartitionManager
+
+ARCHIVE_DIR: str = "archive"
+MANIFEST_FILE: str = "manifest.json"
+EXPORT_CHUNK_SIZE: int = 100_000
+# The record layout must match ARCHIVE_DTYPE in website/archive.py.
+ARCHIVE_DTYPE: np.dtype = np.dtype(
+    [("id_meter", "<i4"), ("time", "<M8[s]"), ("used_energy", "<f8")]
+)
+
+
+class ReadingArchiver(DatabaseConnection):
+    def __init__(self, archive_dir: str = ARCHIVE_DIR) -> None:
+        """
+        Initializes the ReadingArchiver instance.
+
+        This method sets up the database connection and cursor by calling `open_connection_with_db`.
+
+        Parameters:
+            archive_dir (str, optional): The directory of the archive files. Default is 'archive'.
+        """
+        self.archive_dir: str = archive_dir
+        super().__init__()
+
+    @staticmethod
+    def get_archive_cutoff(
+        retention_months: int, today: datetime.date | None = None
+    ) -> datetime.date:
+        """
+        Returns the first month kept in the database.
+
+        The current month is never archived, whatever the retention.
+
+        Parameters:
+            retention_months (int): The number of closed months kept in the database.
+            today (date, optional): The reference date. Default is today.
+
+        Returns:
+            date: The first day of the oldest month kept in the database.
+
+        Example usage:
+            ReadingArchiver.get_archive_cutoff(12, datetime.date(2024, 5, 14))  # 2023-05-01
+        """
+        today = today or datetime.date.today()
+        months: int = today.year * 12 + today.month - 1 - max(retention_months, 0)
+        return datetime.date(months // 12, months % 12 + 1, 1)
+
+    def load_manifest(self) -> dict:
+        """
+        Reads the manifest of the archived months.
+
+        Returns:
+            dict: The manifest, with a `months` mapping of 'YYYY-MM' to the file, row count and archive time.
+        """
+        try:
+            with open(os.path.join(self.archive_dir, MANIFEST_FILE), "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"months": {}}
+
+    def save_manifest(self, manifest: dict) -> None:
+        """
+        Atomically writes the manifest of the archived months.
+
+        Parameters:
+            manifest (dict): The manifest to write.
+        """
+        path: str = os.path.join(self.archive_dir, MANIFEST_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    def record_month(self, month: datetime.date, file_name: str, rows: int) -> None:
+        """
+        Records an archived month in the reading_archive table.
+
+        The rollup refreshes (database_myenergy/rollups.sql) keep the buckets of recorded months,
+        whose readings are no longer in the database.
+
+        Parameters:
+            month (date): The first day of the archived month.
+            file_name (str): The name of the file of the month within the archive directory.
+            rows (int): The number of archived readings.
+        """
+        self.db_cursor.execute(
+            "INSERT INTO reading_archive (month, file, readings) VALUES (%s, %s, %s) "
+            "ON CONFLICT (month) DO UPDATE SET file = EXCLUDED.file, readings = EXCLUDED.readings, "
+            "archived_at = now()",
+            (month, file_name, rows),
+        )
+        self.db_connection.commit()
+
+    def export_month(self, partition: str, month: datetime.date) -> tuple[str, int]:
+        """
+        Exports the readings of one detached month partition to a `.npy` file.
+
+        The readings are read with a server-side cursor in chunks of `EXPORT_CHUNK_SIZE` and written
+        into a memory-mapped file, so memory use does not depend on the size of the month. The number of exported
+        readings is checked against the table before the file is renamed from its temporary name,
+        so a complete file always holds every row of the table.
+
+        Parameters:
+            partition (str): The name of the detached partition, e.g. 'reading_y2024m01'.
+            month (date): The first day of the month of the partition.
+
+        Returns:
+            tuple[str, int]: The name of the file within the archive directory and the number of readings.
+
+        Example usage:
+            file_name, rows = self.export_month("reading_y2024m01", datetime.date(2024, 1, 1))
+        """
+        file_name: str = f"{partition}.npy"
+        path: str = os.path.join(self.archive_dir, file_name)
+        # The count and the export read the same snapshot of the partition.
+        self.db_cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        self.db_cursor.execute(
+            sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(partition))
+        )
+        rows: int = self.db_cursor.fetchone()[0]
+        archive: np.memmap = np.lib.format.open_memmap(
+            path + ".tmp", mode="w+", dtype=ARCHIVE_DTYPE, shape=(rows,)
+        )
+        export_cursor = self.db_connection.cursor(name=f"export_{partition}")
+        export_cursor.itersize = EXPORT_CHUNK_SIZE
+        export_cursor.execute(
+            sql.SQL(
+                "SELECT id_meter, EXTRACT(EPOCH FROM time)::bigint, used_energy::float8 "
+                "FROM {} ORDER BY id_meter, time"
+            ).format(sql.Identifier(partition))
+        )
+        position: int = 0
+        while chunk := export_cursor.fetchmany(EXPORT_CHUNK_SIZE):
+            id_meters, seconds, used_energy = zip(*chunk)
+            archive["id_meter"][position : position + len(chunk)] = id_meters
+            archive["time"][position : position + len(chunk)] = np.array(
+                seconds, dtype="<i8"
+            ).view("<M8[s]")
+            archive["used_energy"][position : position + len(chunk)] = np.array(
+                used_energy, dtype="<f8"
+            )
+            position += len(chunk)
+        export_cursor.close()
+        self.db_connection.commit()
+        archive.flush()
+        del archive
+        self.db_cursor.execute(
+            sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(partition))
+        )
+        table_rows: int = self.db_cursor.fetchone()[0]
+        self.db_connection.commit()
+        if position != rows or table_rows != rows:
+            os.remove(path + ".tmp")
+            raise RuntimeError(
+                f"{partition} has {table_rows} readings but {position} were exported"
+            )
+        os.replace(path + ".tmp", path)
+        print(f"{rows} readings of {month:%Y-%m} exported to {path}")
+        return file_name, rows
+
+    def archive_months(self, retention_months: int = 12) -> list[str]:
+        """
+        Detaches, exports, records and drops the partitions of the months older than the retention window.
+
+        Months are archived oldest first, one at a time: the partition is detached, its file is written
+        and checked, the month is added to the manifest and to the reading_archive table, and only then is the detached
+        table dropped.
+        Until the month is in the manifest, its readings are in neither the database view nor the archive.
+        A run that is interrupted can simply be repeated; tables detached by an earlier run are archived first.
+
+        Parameters:
+            retention_months (int, optional): The number of closed months kept in the database. Default is 12.
+
+        Returns:
+            list[str]: The archived months as 'YYYY-MM'.
+
+        Example usage:
+            self.archive_months(retention_months=6)
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        cutoff: datetime.date = self.get_archive_cutoff(retention_months)
+        partition_manager = PartitionManager()
+        archived: list[str] = []
+        try:
+            months: list[tuple[str, datetime.date]] = [
+                (partition, month)
+                for partition, month in partition_manager.get_detached_partitions()
+                + partition_manager.get_partitions()
+                if month < cutoff
+            ]
+            for partition, month in months:
+                partition_manager.detach_partition(partition)
+                file_name, rows = self.export_month(partition, month)
+                manifest: dict = self.load_manifest()
+                manifest["months"][f"{month:%Y-%m}"] = {
+                    "file": file_name,
+                    "rows": rows,
+                    "archived_at": datetime.datetime.now().isoformat(
+                        timespec="seconds"
+                    ),
+                }
+                self.save_manifest(manifest)
+                self.record_month(month, file_name, rows)
+                partition_manager.detach_partition(partition, drop=True)
+                archived.append(f"{month:%Y-%m}")
+        finally:
+            partition_manager.close_connection_with_db()
+        print(f"{len(archived)} months archived to {self.archive_dir}")
+        return archived
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Archive old months of readings to memory-mappable files."
+    )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=12,
+        help="the number of closed months kept in the database (default: 12)",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=ARCHIVE_DIR,
+        help=f"the directory of the archive files (default: {ARCHIVE_DIR})",
+    )
+    arguments = parser.parse_args()
+    reading_archiver = ReadingArchiver(arguments.archive_dir)
+    reading_archiver.archive_months(arguments.retention_months)
+    reading_archiver.close_connection_with_db()
@@ -0,0 +1,49 @@
+"""
+Sharding of Meters for the Parallel Command-Line Scripts
+
+This module splits meter IDs into contiguous ranges, one per worker process. It is shared by the scripts that work
+on the meters in parallel (consumption_generator.py and billing_engine.py), and it depends on the standard library
+only, so importing it does not load numpy or the generator.
+
+Functions:
+    split_into_shards: Splits meter IDs into contiguous ranges, one per worker.
+
+Usage Example:
+    shards = split_into_shards([1, 2, 3, 4, 5], 2)  # [[1, 2, 3], [4, 5]]
+
+Requirements:
+    - Python 3.12
+"""
+
+
+def split_into_shards(meters: list[int], number_of_shards: int) -> list[list[int]]:
+    """
+    Splits meter IDs into contiguous ranges, one per worker.
+
+    The first shards get one meter more than the last ones when the meters cannot be split evenly.
+
+    Parameters:
+        meters (list[int]): The meter IDs to split.
+        number_of_shards (int): The maximum number of shards.
+
+    Returns:
+        list[list[int]]: Non-empty, sorted shards of nearly equal size.
+
+    Raises:
+        ValueError: If `number_of_shards` is less than 1.
+
+    Example usage:
+        shards = split_into_shards([1, 2, 3, 4, 5], 2)  # [[1, 2, 3], [4, 5]]
+    """
+    if number_of_shards < 1:
+        raise ValueError("The number of shards must be at least 1")
+    sorted_meters: list[int] = sorted(meters)
+    size, remainder = divmod(len(sorted_meters), number_of_shards)
+    shards: list[list[int]] = []
+    start: int = 0
+    for shard_number in range(number_of_shards):
+        end: int = start + size + (1 if shard_number < remainder else 0)
+        if end > start:
+            shards.append(sorted_meters[start:end])
+        start = end
+    return shards
@@ -0,0 +1,74 @@
+"""
+Tests of the chart data view (`/chart/data` in website/home.py).
+
+The meter of the client and its usage series are replaced with fakes, so the view is tested without a database.
+"""
+
+import types
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from website import home
+
+# Two readings more than a year apart: the second is 400 days and one second after the first.
+SERIES: pd.DataFrame = pd.DataFrame(
+    {
+        "time": pd.to_datetime([datetime(2023, 1, 1), datetime(2024, 2, 5, 0, 0, 1)]),
+        "used_energy": [0.25, 1.5],
+    }
+)
+
+
+class FakeMeterQuery:
+    def __init__(self, meter: types.SimpleNamespace | None) -> None:
+        self.meter = meter
+
+    def filter_by(self, **kwargs) -> "FakeMeterQuery":
+        return self
+
+    def first(self) -> types.SimpleNamespace | None:
+        return self.meter
+
+
+@pytest.fixture
+def chart_client(app, monkeypatch):
+    """
+    A test client logged in as a client whose meter (if any) is set with `chart_client.meter = ...`.
+    """
+    fake_meter = types.SimpleNamespace(query=FakeMeterQuery(None))
+    monkeypatch.setattr(home, "Meter", fake_meter)
+    monkeypatch.setattr(home, "current_user", types.SimpleNamespace(id_client=1))
+    monkeypatch.setattr(home, "get_usage_series", lambda *args: SERIES)
+    app.config["LOGIN_DISABLED"] = True
+    client = app.test_client()
+    client.meter = fake_meter.query
+    yield client
+    app.config["LOGIN_DISABLED"] = False
+
+
+def test_client_without_a_meter_gets_an_empty_series(chart_client):
+    response = chart_client.get("/chart/data?start_date=2023-01-01&end_date=2024-03-01")
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "kind": "bar",
+        "total": 0,
+        "time": [],
+        "used_energy": [],
+    }
+
+
+def test_binary_series_keeps_whole_seconds_over_a_year(chart_client):
+    chart_client.meter.meter = types.SimpleNamespace(id_meter=7)
+    response = chart_client.get(
+        "/chart/data?start_date=2023-01-01&end_date=2024-03-01&format=binary"
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Start-Time"] == "2023-01-01T00:00:00"
+    assert response.headers["X-Points"] == "2"
+    offsets = np.frombuffer(response.data[:8], dtype="<i4")
+    used_energy = np.frombuffer(response.data[8:], dtype="<f4")
+    assert offsets.tolist() == [0, 400 * 86400 + 1]
+    assert used_energy.tolist() == [0.25, 1.5]
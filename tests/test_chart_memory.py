@@ -0,0 +1,50 @@
+"""
+Tests of the memory used by chart rendering (website/chart_renderer.py).
+
+These are the automated form of benchmarks/chart_memory.py: charts are rendered through the figure pool,
+and the memory allocated by Python after a warm-up must stay flat.
+"""
+
+import gc
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.chart_memory import render_random_chart
+from website.chart_renderer import FigurePool, figure_pool
+
+WARM_UP_RENDERS: int = 10
+RENDERS: int = 50
+MAX_GROWTH_BYTES: int = 2**20
+
+
+def test_rendering_does_not_grow_memory():
+    for number in range(WARM_UP_RENDERS):
+        render_random_chart(number)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for number in range(WARM_UP_RENDERS, WARM_UP_RENDERS + RENDERS):
+            render_random_chart(number)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert current - baseline < MAX_GROWTH_BYTES
+
+
+def test_concurrent_renders_share_the_pool_figures():
+    with ThreadPoolExecutor(max_workers=figure_pool.size * 2) as executor:
+        sizes = list(executor.map(render_random_chart, range(figure_pool.size * 8)))
+    assert all(size > 0 for size in sizes)
+    assert figure_pool.created <= figure_pool.size
+
+
+def test_figure_pool_reuses_released_figures():
+    pool = FigurePool(size=2)
+    with pool.acquire() as first:
+        first.add_subplot()
+    with pool.acquire() as second:
+        assert second is first
+        assert not second.axes
+    assert pool.created == 1
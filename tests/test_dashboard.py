@@ -0,0 +1,70 @@
+"""
+Tests of the cached dashboard summaries (website/dashboard.py).
+
+The meter and invoice tables are created in the in-memory SQLite database of the tests, so paying an invoice
+goes through the same session events as on the website.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from website import db
+from website.dashboard import summary_cache
+from website.models import Invoice, Meter
+
+ID_CLIENT: int = 5
+CACHED_SUMMARY: dict = {"id_meter": 1, "unpaid_invoices": 1}
+
+
+@pytest.fixture
+def invoice(app):
+    """
+    An unpaid invoice of the meter of client `ID_CLIENT`, whose dashboard summary of today is cached.
+    """
+    tables = [Meter.__table__, Invoice.__table__]
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            pytest.skip("creates and drops its tables in the in-memory SQLite database")
+        db.metadata.create_all(db.engine, tables=tables)
+        db.session.add(Meter(id_meter=1, id_client=ID_CLIENT))
+        invoice = Invoice(
+            id_invoice=1,
+            id_meter=1,
+            date_of_issue=date(2024, 5, 1),
+            billing_period=datetime(2024, 4, 1),
+            is_it_paid=False,
+        )
+        db.session.add(invoice)
+        db.session.commit()
+        summary_cache.set((ID_CLIENT, datetime.now().date()), CACHED_SUMMARY)
+        yield invoice
+        db.session.rollback()
+        db.metadata.drop_all(db.engine, tables=tables)
+        summary_cache.clear()
+
+
+def cached_summary():
+    return summary_cache.get((ID_CLIENT, datetime.now().date()))
+
+
+def test_paying_an_invoice_drops_the_cached_summary(invoice):
+    invoice.is_it_paid = True
+    db.session.flush()
+    assert cached_summary() == CACHED_SUMMARY
+    db.session.commit()
+    assert cached_summary() is None
+
+
+def test_a_rolled_back_payment_keeps_the_cached_summary(invoice):
+    invoice.is_it_paid = True
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert cached_summary() == CACHED_SUMMARY
+
+
+def test_other_changes_of_an_invoice_keep_the_cached_summary(invoice):
+    invoice.amount_to_pay = 12.5
+    db.session.commit()
+    assert cached_summary() == CACHED_SUMMARY
@@ -0,0 +1,108 @@
+"""
+Tests of the rankings of the leaderboard (website/leaderboard.py).
+
+The client and leaderboard tables are created in the in-memory SQLite database of the tests, and the scores
+are written with `add_points`, so the counts of `leaderboard_points` the ranks are summed from follow the scores
+as on the website.
+"""
+
+from datetime import date
+
+import pytest
+
+from website import db
+from website.leaderboard import (
+    OVERALL_PERIOD_START,
+    add_points,
+    get_rank_with_neighbours,
+    get_top_scores,
+)
+from website.models import Client, LeaderboardPoints, LeaderboardScore
+
+DAY: date = date(2024, 5, 14)
+# Clients 2 and 3 are tied at the top, clients 5 and 6 further down; client 7 has no points.
+POINTS: dict[int, int] = {1: 10, 2: 20, 3: 20, 4: 8, 5: 5, 6: 5, 7: 0}
+
+
+@pytest.fixture
+def ranking(app):
+    """
+    The overall ranking of `POINTS`.
+    """
+    tables = [Client.__table__, LeaderboardScore.__table__, LeaderboardPoints.__table__]
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            pytest.skip("creates and drops its tables in the in-memory SQLite database")
+        db.metadata.create_all(db.engine, tables=tables)
+        for id_client, points in POINTS.items():
+            db.session.add(Client(id_client=id_client, username=f"client{id_client}"))
+            db.session.flush()
+            add_points(id_client, DAY, points)
+        db.session.commit()
+        yield
+        db.session.rollback()
+        db.metadata.drop_all(db.engine, tables=tables)
+
+
+def places(rows: list) -> list[tuple[int, int, int]]:
+    return [(row.rank, row.id_client, row.points) for row in rows]
+
+
+def test_tied_clients_share_a_rank(ranking):
+    assert places(get_top_scores("overall", OVERALL_PERIOD_START)) == [
+        (1, 3, 20),
+        (1, 2, 20),
+        (3, 1, 10),
+        (4, 4, 8),
+        (5, 6, 5),
+        (5, 5, 5),
+    ]
+
+
+def test_pages_keep_the_ranks_of_the_whole_ranking(ranking):
+    assert places(get_top_scores("overall", OVERALL_PERIOD_START, 2, 2)) == [
+        (3, 1, 10),
+        (4, 4, 8),
+    ]
+    assert places(get_top_scores("overall", OVERALL_PERIOD_START, 3, 2)) == [
+        (5, 6, 5),
+        (5, 5, 5),
+    ]
+
+
+def test_neighbours_at_the_top(ranking):
+    assert places(get_rank_with_neighbours("overall", OVERALL_PERIOD_START, 3)) == [
+        (1, 3, 20),
+        (1, 2, 20),
+        (3, 1, 10),
+    ]
+
+
+def test_neighbours_at_the_bottom(ranking):
+    assert places(get_rank_with_neighbours("overall", OVERALL_PERIOD_START, 5)) == [
+        (4, 4, 8),
+        (5, 6, 5),
+        (5, 5, 5),
+    ]
+
+
+def test_client_without_points_is_not_ranked(ranking):
+    assert get_rank_with_neighbours("overall", OVERALL_PERIOD_START, 7) == []
+
+
+def test_ranks_follow_points_taken_back(ranking):
+    add_points(2, DAY, -15)
+    add_points(4, DAY, 12)
+    db.session.commit()
+    assert places(get_top_scores("overall", OVERALL_PERIOD_START)) == [
+        (1, 4, 20),
+        (1, 3, 20),
+        (3, 1, 10),
+        (4, 6, 5),
+        (4, 5, 5),
+        (4, 2, 5),
+    ]
+    assert places(get_rank_with_neighbours("day", DAY, 2, 1)) == [
+        (4, 5, 5),
+        (4, 2, 5),
+    ]
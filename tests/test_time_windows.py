@@ -0,0 +1,152 @@
+"""
+Tests of the ranking windows (website/time_windows.py) against the previous `extract()` conditions.
+
+The rankings used to select the challenges of a day or a month with `extract(day/month/year from start_date)`
+and those of a week with `start_date BETWEEN monday AND sunday`. The windows must select the same days.
+The `db` tests check the same on a live database, and that the windows are served by an index range scan.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from website.leaderboard import get_closed_periods
+from website.time_windows import TimeWindow, custom_window, get_window, last_days
+
+FIRST_DAY: date = date(2023, 11, 20)
+LAST_DAY: date = date(2025, 3, 10)
+DAYS: list[date] = [
+    FIRST_DAY + timedelta(days=offset)
+    for offset in range((LAST_DAY - FIRST_DAY).days + 1)
+]
+
+
+def in_period_by_extract(period: str, day: date, candidate: date) -> bool:
+    """
+    The previous ranking condition: whether `candidate` is in the period of `day`.
+    """
+    if period == "week":
+        monday = day - timedelta(days=day.weekday())
+        return monday <= candidate <= monday + timedelta(days=6)
+    if period == "month":
+        return (candidate.year, candidate.month) == (day.year, day.month)
+    if period == "day":
+        return (candidate.year, candidate.month, candidate.day) == (
+            day.year,
+            day.month,
+            day.day,
+        )
+    return True
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month", "overall"])
+def test_get_window_selects_the_days_of_the_extract_condition(period):
+    for day in DAYS:
+        window = get_window(period, day)
+        for offset in range(-40, 41):
+            candidate = day + timedelta(days=offset)
+            assert (candidate in window) == in_period_by_extract(
+                period, day, candidate
+            ), (period, day, candidate)
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month"])
+def test_get_window_includes_the_whole_last_day_of_a_timestamp(period):
+    for day in DAYS:
+        window = get_window(period, day)
+        assert datetime.combine(window.last_day, time.max) in window
+        assert datetime.combine(window.end, time.min) not in window
+        assert get_window(period, window.end).start == window.end
+
+
+def test_last_days_ends_today():
+    today = date(2025, 3, 1)
+    for days in (1, 7, 30, 366):
+        window = last_days(days, today)
+        selected = [day for day in DAYS if day in window]
+        assert selected[-1] == today
+        assert len(selected) == days
+
+
+def test_last_days_needs_a_day():
+    with pytest.raises(ValueError):
+        last_days(0, date(2024, 3, 1))
+
+
+def test_custom_window_includes_both_days():
+    for first_day, last_day in [
+        (date(2024, 2, 28), date(2024, 3, 1)),
+        (date(2024, 1, 1), date(2024, 1, 1)),
+    ]:
+        window = custom_window(first_day, last_day)
+        assert [day for day in DAYS if day in window] == [
+            first_day + timedelta(days=offset)
+            for offset in range((last_day - first_day).days + 1)
+        ]
+    with pytest.raises(ValueError):
+        custom_window(date(2024, 1, 2), date(2024, 1, 1))
+
+
+def test_condition_is_a_half_open_range():
+    from website.models import CustomizedChallenge
+
+    condition = TimeWindow(date(2024, 1, 1), date(2024, 2, 1)).condition(
+        CustomizedChallenge.start_date
+    )
+    sql = str(condition.compile(compile_kwargs={"literal_binds": True}))
+    assert "start_date >= '2024-01-01'" in sql
+    assert "start_date < '2024-02-01'" in sql
+    assert "extract" not in sql.lower()
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month"])
+def test_get_closed_periods_lists_the_periods_closed_by_extract(period):
+    def is_first_day(day: date) -> bool:
+        return not in_period_by_extract(period, day, day - timedelta(days=1))
+
+    for since in DAYS[::17]:
+        for today in DAYS[::23]:
+            expected = [
+                day
+                for day in DAYS
+                if since <= day < today
+                and is_first_day(day)
+                and not in_period_by_extract(period, day, today)
+            ]
+            assert get_closed_periods(period, since, today) == expected, (
+                period,
+                since,
+                today,
+            )
+
+
+def test_window_ranking_rejects_windows_outside_the_calendar(app):
+    app.config["LOGIN_DISABLED"] = True
+    try:
+        client = app.test_client()
+        for query in (
+            "last_days=1000000",
+            "last_days=0",
+            "start_date=9999-12-31&end_date=9999-12-31",
+            "start_date=2024-01-02&end_date=2024-01-01",
+            "start_date=2024-13-01&end_date=2024-01-01",
+        ):
+            assert client.get(f"/challenge/ranking?{query}").status_code == 400
+    finally:
+        app.config["LOGIN_DISABLED"] = False
+
+
+@pytest.mark.db
+def test_window_rankings_match_the_extract_rankings(app):
+    from benchmarks.ranking_windows import compare_rankings
+
+    with app.app_context():
+        assert compare_rankings(days=60) == 0
+
+
+@pytest.mark.db
+def test_window_conditions_use_an_index_range_scan(app):
+    from benchmarks.ranking_windows import check_plans
+
+    with app.app_context():
+        assert check_plans() == 0
@@ -0,0 +1,168 @@
+"""
+Tests of the weather cache (website/weather.py).
+
+The cache is given a fake fetch function that counts its calls and can be held until a test releases it,
+and a fake clock, so the fresh, stale and error periods are crossed without waiting.
+"""
+
+import logging
+import threading
+import time
+import types
+
+import pytest
+
+from website import weather
+from website.weather import WeatherCache
+
+SUNNY: dict = {"temp_c": 21.0, "humidity": 40, "wind_kph": 5.0}
+RAINY: dict = {"temp_c": 12.0, "humidity": 90, "wind_kph": 20.0}
+
+
+class FakeFetch:
+    """
+    A fetch function returning the given results in turn; a result that is an exception is raised.
+    While `hold` is set, every call waits until it is released.
+    """
+
+    def __init__(self, *results) -> None:
+        self.results = list(results)
+        self.calls = []
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.released.set()
+
+    def hold(self) -> None:
+        self.started.clear()
+        self.released.clear()
+
+    def release(self) -> None:
+        self.released.set()
+
+    def __call__(self, city: str) -> dict | None:
+        self.calls.append(city)
+        self.started.set()
+        self.released.wait(5)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A fake monotonic clock of the weather module, moved forward with `clock.now += seconds`.
+    """
+    fake_clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        weather, "time", types.SimpleNamespace(monotonic=lambda: fake_clock.now)
+    )
+    return fake_clock
+
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_fresh_weather_is_served_without_fetching(clock):
+    fetch = FakeFetch(SUNNY)
+    cache = WeatherCache(fetch, ttl=600)
+    assert cache.get("Paris") == SUNNY
+    clock.now += 599
+    assert cache.get(" paris ") == SUNNY
+    assert fetch.calls == ["Paris"]
+    assert cache.stats()["fresh"] == 1
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    fetch = FakeFetch(SUNNY)
+    fetch.hold()
+    cache = WeatherCache(fetch)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("Paris")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.stats()["coalesced"] == 7)
+    fetch.release()
+    for thread in threads:
+        thread.join(5)
+    assert results == [SUNNY] * 8
+    assert fetch.calls == ["Paris"]
+    assert cache.stats()["misses"] == 8
+
+
+def test_stale_weather_is_served_while_one_refresh_runs(clock):
+    fetch = FakeFetch(SUNNY, RAINY)
+    cache = WeatherCache(fetch, ttl=600, stale_ttl=3600)
+    cache.get("Paris")
+    clock.now += 700
+    fetch.hold()
+    assert cache.get("Paris") == SUNNY
+    assert fetch.started.wait(5)
+    assert cache.get("Paris") == SUNNY
+    fetch.release()
+    wait_until(lambda: cache.stats()["fetches"] == 2)
+    assert cache.get("Paris") == RAINY
+    assert fetch.calls == ["Paris", "Paris"]
+    assert cache.stats()["stale"] == 2
+
+
+def test_expired_stale_weather_is_fetched_again(clock):
+    fetch = FakeFetch(SUNNY, RAINY)
+    cache = WeatherCache(fetch, ttl=600, stale_ttl=3600)
+    cache.get("Paris")
+    clock.now += 600 + 3600
+    assert cache.get("Paris") == RAINY
+    assert cache.stats()["stale"] == 0
+
+
+def test_failed_fetch_is_remembered_for_the_error_ttl(clock, caplog):
+    fetch = FakeFetch(ConnectionError("API down"), SUNNY)
+    cache = WeatherCache(fetch, error_ttl=60)
+    with caplog.at_level(logging.WARNING, logger="website.weather"):
+        assert cache.get("Paris") is None
+    assert "API down" in caplog.text
+    clock.now += 59
+    assert cache.get("Paris") is None
+    assert len(fetch.calls) == 1
+    clock.now += 1
+    assert cache.get("Paris") == SUNNY
+    assert cache.stats()["errors"] == 1
+
+
+def test_failed_refresh_keeps_the_last_known_weather(clock):
+    fetch = FakeFetch(SUNNY, None, RAINY)
+    cache = WeatherCache(fetch, ttl=600, stale_ttl=3600, error_ttl=60)
+    cache.get("Paris")
+    clock.now += 700
+    assert cache.get("Paris") == SUNNY
+    wait_until(lambda: cache.stats()["fetches"] == 2)
+    assert cache.get("Paris") == SUNNY
+    assert len(fetch.calls) == 2
+    clock.now += 60
+    assert cache.get("Paris") == SUNNY
+    wait_until(lambda: cache.stats()["fetches"] == 3)
+    assert cache.get("Paris") == RAINY
+
+
+def test_waiting_for_a_slow_fetch_gives_up_after_the_wait_timeout(clock):
+    fetch = FakeFetch(SUNNY)
+    fetch.hold()
+    cache = WeatherCache(fetch, wait_timeout=0.05)
+    first = threading.Thread(target=cache.get, args=("Paris",))
+    first.start()
+    assert fetch.started.wait(5)
+    start = time.monotonic()
+    assert cache.get("Paris") is None
+    assert 0.05 <= time.monotonic() - start < 1
+    fetch.release()
+    first.join(5)
+    assert cache.get("Paris") == SUNNY
+    assert fetch.calls == ["Paris"]
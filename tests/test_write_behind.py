@@ -0,0 +1,118 @@
+"""
+Tests of the write-behind queue of readings (website/write_behind.py).
+
+The queue is given a fake database connection that plays the part of PostgreSQL: it knows a set of meters,
+refuses readings with a negative used energy and reports row counts like psycopg2 does.
+"""
+
+from datetime import datetime
+
+import psycopg2
+import pytest
+
+from website import write_behind
+from website.write_behind import ReadingWriteBehindQueue
+
+KNOWN_METERS: set[int] = {1, 2}
+
+
+class FakeCursor:
+    def __init__(self, database: "FakeDatabase") -> None:
+        self.database = database
+        self.rowcount = -1
+        self.staged = []
+
+    def execute(self, query: str, parameters: tuple | None = None) -> None:
+        database = self.database
+        if query == write_behind.REJECT_UNKNOWN_METERS_QUERY:
+            unknown = [row for row in self.staged if row[2] not in KNOWN_METERS]
+            database.pending_rejected.extend(
+                row + ("unknown meter",) for row in unknown
+            )
+            self.rowcount = len(unknown)
+        elif query == write_behind.MERGE_QUERY:
+            merged = {
+                (row[2], row[0]): row[1]
+                for row in self.staged
+                if row[2] in KNOWN_METERS
+            }
+            if any(used_energy < 0 for used_energy in merged.values()):
+                raise psycopg2.DataError("used_energy must not be negative")
+            database.pending_readings.update(merged)
+            self.rowcount = len(merged)
+        elif query == write_behind.REJECT_QUERY:
+            database.pending_rejected.append(parameters)
+            self.rowcount = 1
+
+    def copy_expert(self, query: str, buffer) -> None:
+        for line in buffer.read().splitlines():
+            time, used_energy, id_meter = line.split(",")
+            self.staged.append(
+                (datetime.fromisoformat(time), float(used_energy), int(id_meter))
+            )
+
+    def close(self) -> None:
+        pass
+
+
+class FakeDatabase:
+    def __init__(self) -> None:
+        self.readings = {}
+        self.rejected = []
+        self.rollback()
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.readings.update(self.pending_readings)
+        self.rejected.extend(self.pending_rejected)
+        self.rollback()
+
+    def rollback(self) -> None:
+        self.pending_readings = {}
+        self.pending_rejected = []
+
+    def close(self) -> None:
+        self.rollback()
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(ReadingWriteBehindQueue, "_connect", lambda self: database)
+    queue = ReadingWriteBehindQueue(app=None, flush_size=100, flush_interval=60)
+    queue.database = database
+    yield queue
+    queue.stop()
+
+
+def reading(hour: int, used_energy: float, id_meter: int) -> tuple:
+    return datetime(2024, 5, 1, hour), used_energy, id_meter
+
+
+def test_flush_counts_the_written_readings(queue):
+    batch = [reading(0, 0.5, 1), reading(0, 0.75, 1), reading(1, 0.25, 2)]
+    assert queue._write(batch)
+    assert queue.flushed == 2
+    assert queue.database.readings == {
+        (1, datetime(2024, 5, 1, 0)): 0.75,
+        (2, datetime(2024, 5, 1, 1)): 0.25,
+    }
+
+
+def test_readings_of_unknown_meters_are_rejected(queue):
+    assert queue._write([reading(0, 0.5, 1), reading(0, 0.5, 99)])
+    assert queue.flushed == 1
+    assert queue.rejected == 1
+    assert queue.database.rejected == [reading(0, 0.5, 99) + ("unknown meter",)]
+
+
+def test_refused_readings_are_isolated_and_rejected(queue):
+    batch = [reading(hour, 0.5, 1) for hour in range(8)]
+    batch[5] = reading(5, -1.0, 1)
+    assert queue._write(batch)
+    assert queue.flushed == 7
+    assert queue.rejected == 1
+    assert [row[:3] for row in queue.database.rejected] == [reading(5, -1.0, 1)]
+    assert (1, datetime(2024, 5, 1, 5)) not in queue.database.readings
@@ -10,9 +10,17 @@ Attributes:
     app (Flask): The Flask application instance.
     db (SQLAlchemy): The SQLAlchemy database instance.
 
-This module sets up the Flask application, including secret key configuration, database connection, and registration of blueprints for various parts of the website, such as home, authentication, forum, and challenge functionalities.
+This module sets up the Flask application, including secret key configuration, database connection, and registration of blueprints for various parts of the website, such as home, authentication, forum, challenge and meter reading ingestion functionalities.
 
-The `create_app` function initializes the Flask app, registers blueprints, creates necessary database tables, configures login manager, and loads user information.
+The `create_app` function initializes the Flask app, registers blueprints, creates necessary database tables, registers maintenance commands (e.g. `flask index-report`, `flask rebuild-leaderboard`), configures login manager, and loads user information.
+
+Start-up can be tuned with environment variables:
+    - MYENERGY_DATABASE_URI: the database URI, used instead of reading `appconfig.json`.
+    - MYENERGY_SCHEMA_CHECK: when to create missing tables - 'startup' (default), 'first-request' or 'skip'
+      (for deployments whose schema is created by the scripts in database_myenergy).
+    - MYENERGY_JINJA_CACHE_DIR: the directory of compiled templates shared by the workers. It must be owned by
+      the user of the app and not be accessible to other users (mode 0700); it is created so if it does not exist.
+      By default, Jinja's private per-user directory in the temp directory is used.
 
 It also provides access to the `app` and `db` objects, representing the Flask application instance and the SQLAlchemy database instance respectively, which can be used throughout the website.
 """
@@ -20,16 +28,39 @@ It also provides access to the `app` and `db` objects, representing the Flask ap
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from jinja2 import FileSystemBytecodeCache
 import json
+import os
+import stat
+import threading
 from website.secret import FLASK_KEY
 
 app = Flask(__name__)
 app.secret_key = FLASK_KEY
-with open("./appconfig.json", "r") as file:
-    json_data: dict = json.load(file)
-app.config["SQLALCHEMY_DATABASE_URI"] = (
-    f"postgresql://{json_data['user']}:{json_data['password']}@{json_data['host']}/{json_data['database']}"
-)
+if os.environ.get("MYENERGY_DATABASE_URI"):
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["MYENERGY_DATABASE_URI"]
+else:
+    with open("./appconfig.json", "r") as file:
+        json_data: dict = json.load(file)
+    app.config["SQLALCHEMY_DATABASE_URI"] = (
+        f"postgresql://{json_data['user']}:{json_data['password']}@{json_data['host']}/{json_data['database']}"
+    )
+# Compiled templates are kept on disk, so a new worker does not compile them again.
+# They are loaded as code, so only the user of the app may be able to write them.
+jinja_cache_dir = os.environ.get("MYENERGY_JINJA_CACHE_DIR")
+if jinja_cache_dir:
+    os.makedirs(jinja_cache_dir, mode=0o700, exist_ok=True)
+    jinja_cache_stat = os.stat(jinja_cache_dir)
+    if jinja_cache_stat.st_uid != os.getuid() or stat.S_IMODE(
+        jinja_cache_stat.st_mode
+    ) & (stat.S_IRWXG | stat.S_IRWXO):
+        raise RuntimeError(
+            f"MYENERGY_JINJA_CACHE_DIR {jinja_cache_dir} must be owned by the user of the app with mode 0700"
+        )
+    jinja_bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+else:
+    jinja_bytecode_cache = FileSystemBytecodeCache()
+app.jinja_options = {**app.jinja_options, "bytecode_cache": jinja_bytecode_cache}
 db = SQLAlchemy(app)
 
 
@@ -38,14 +69,36 @@ def create_app():
     from .auth import auth
     from .forum import forum
     from .challenge import challenge
+    from .ingest import ingest
 
     app.register_blueprint(home, url_prefix="/")
     app.register_blueprint(auth, url_prefix="/user")
     app.register_blueprint(forum, url_prefix="/forum")
     app.register_blueprint(challenge, url_prefix="/challenge")
-
-    with app.app_context():
-        db.create_all()
+    app.register_blueprint(ingest, url_prefix="/ingest")
+
+    schema_check = os.environ.get("MYENERGY_SCHEMA_CHECK", "startup")
+    if schema_check == "startup":
+        with app.app_context():
+            db.create_all()
+    elif schema_check == "first-request":
+        schema_checked = threading.Event()
+        schema_lock = threading.Lock()
+
+        @app.before_request
+        def check_schema():
+            if not schema_checked.is_set():
+                with schema_lock:
+                    if not schema_checked.is_set():
+                        db.create_all()
+                        schema_checked.set()
+
+    from .indexes import index_report_command
+    from .leaderboard import rebuild_leaderboard_command, snapshot_rankings_command
+
+    app.cli.add_command(index_report_command)
+    app.cli.add_command(rebuild_leaderboard_command)
+    app.cli.add_command(snapshot_rankings_command)
 
     login_manager = LoginManager()
     login_manager.login_view = "auth.login"
@@ -0,0 +1,151 @@
+"""
+Reading archive module.
+
+This module reads the months of readings moved out of PostgreSQL by reading_archiver.py. Every archived month
+is a `.npy` file of records sorted by meter, then by time, listed in the archive manifest. Files are opened
+with memory mapping, and the readings of one meter are found with a binary search, so a chart reads only
+the pages holding that meter's readings. The archive directory is set by the `READING_ARCHIVE_DIR`
+configuration key (default: 'archive').
+
+Functions:
+    - get_archived_months() -> dict[date, str]:
+        Retrieves the archived months with the paths of their files.
+
+    - split_range_by_archive(start: datetime, end: datetime) -> tuple[list, list]:
+        Splits a time range into the parts read from the archive and the parts read from the database.
+
+    - read_archived_readings(id_meter: int, start: datetime, end: datetime) -> tuple[np.ndarray, np.ndarray]:
+        Retrieves the archived readings of a meter in a time range.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+from flask import current_app
+
+MANIFEST_FILE = "manifest.json"
+# The record layout must match ARCHIVE_DTYPE in reading_archiver.py.
+ARCHIVE_DTYPE = np.dtype(
+    [("id_meter", "<i4"), ("time", "<M8[s]"), ("used_energy", "<f8")]
+)
+
+
+@lru_cache(maxsize=8)
+def _load_manifest(path: str, modified: float) -> dict[date, str]:
+    """
+    Read a manifest file; the modification time is part of the cache key, so a new manifest is read again.
+    """
+    with open(path, "r") as file:
+        manifest = json.load(file)
+    archive_dir = os.path.dirname(path)
+    return {
+        datetime.strptime(month, "%Y-%m").date(): os.path.join(
+            archive_dir, entry["file"]
+        )
+        for month, entry in manifest["months"].items()
+    }
+
+
+@lru_cache(maxsize=64)
+def _open_archive(path: str, modified: float) -> np.ndarray:
+    """
+    Memory-map an archive file; the mapping is shared by all requests of the process.
+    """
+    archive = np.load(path, mmap_mode="r")
+    if archive.dtype != ARCHIVE_DTYPE:
+        raise ValueError(f"{path} does not hold archived readings")
+    return archive
+
+
+def get_archived_months() -> dict[date, str]:
+    """
+    Retrieve the archived months with the paths of their files.
+
+    Returns:
+        dict[date, str]: A mapping of the first day of every archived month to its file.
+    """
+    path = os.path.join(
+        current_app.config.get("READING_ARCHIVE_DIR", "archive"), MANIFEST_FILE
+    )
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        return {}
+    return _load_manifest(path, modified)
+
+
+def _next_month(month: date) -> date:
+    """
+    Return the first day of the month after a month.
+    """
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def split_range_by_archive(
+    start: datetime, end: datetime
+) -> tuple[list[tuple[datetime, datetime]], list[tuple[datetime, datetime]]]:
+    """
+    Split a time range into the parts read from the archive and the parts read from the database.
+
+    Args:
+        start (datetime): The start of the range (inclusive).
+        end (datetime): The end of the range (exclusive).
+
+    Returns:
+        tuple[list, list]: The archived and the live parts of the range as (start, end) pairs,
+        with adjacent months of the same kind merged.
+    """
+    archived_months = get_archived_months()
+    archived, live = [], []
+    month = date(start.year, start.month, 1)
+    while datetime.combine(month, datetime.min.time()) < end:
+        month_end = _next_month(month)
+        part = (
+            max(start, datetime.combine(month, datetime.min.time())),
+            min(end, datetime.combine(month_end, datetime.min.time())),
+        )
+        parts = archived if month in archived_months else live
+        if parts and parts[-1][1] == part[0]:
+            parts[-1] = (parts[-1][0], part[1])
+        else:
+            parts.append(part)
+        month = month_end
+    return archived, live
+
+
+def read_archived_readings(
+    id_meter: int, start: datetime, end: datetime
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Retrieve the archived readings of a meter in a time range.
+
+    Args:
+        id_meter (int): The ID of the meter.
+        start (datetime): The start of the range (inclusive).
+        end (datetime): The end of the range (exclusive).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The times (datetime64[s]) and the used energy of the readings, ordered by time.
+    """
+    times, used_energy = [], []
+    first, last = np.datetime64(start, "s"), np.datetime64(end, "s")
+    for month, path in sorted(get_archived_months().items()):
+        if datetime.combine(_next_month(month), datetime.min.time()) <= start:
+            continue
+        if datetime.combine(month, datetime.min.time()) >= end:
+            break
+        archive = _open_archive(path, os.path.getmtime(path))
+        meters = archive["id_meter"]
+        meter_start = np.searchsorted(meters, id_meter, side="left")
+        meter_end = np.searchsorted(meters, id_meter, side="right")
+        readings = archive[meter_start:meter_end]
+        time_start = np.searchsorted(readings["time"], first, side="left")
+        time_end = np.searchsorted(readings["time"], last, side="left")
+        times.append(readings["time"][time_start:time_end])
+        used_energy.append(readings["used_energy"][time_start:time_end])
+    if not times:
+        return np.array([], dtype="<M8[s]"), np.array([], dtype="<f8")
+    return np.concatenate(times), np.concatenate(used_energy)
@@ -0,0 +1,137 @@
+"""
+Cache module.
+
+This module provides a small in-process cache used by the views to keep the results of expensive work,
+such as rendered charts. The cache is bounded in size with least-recently-used eviction, its entries expire
+after a time to live, and it counts hits, misses and evictions. It is thread-safe, and every worker process
+of the server has its own instance.
+
+Classes:
+    - LRUCache: A thread-safe, size-bounded cache with LRU eviction and a time to live.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded cache with LRU eviction and a time to live.
+
+    Attributes:
+        max_size (int): The maximum number of entries; the least recently used entry is evicted first.
+        ttl (float | None): The number of seconds an entry stays valid, or None for no expiry.
+        hits (int): The number of lookups that found a valid entry.
+        misses (int): The number of lookups that found no entry or an expired one.
+        evictions (int): The number of entries evicted to make room for new ones.
+    """
+
+    def __init__(self, max_size: int = 128, ttl: float | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value stored under a key and mark it as recently used.
+
+        Args:
+            key (Hashable): The key of the entry.
+            default (Any, optional): The value returned on a miss. Default is None.
+
+        Returns:
+            Any: The cached value, or `default` if there is no valid entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = _MISSING) -> None:
+        """
+        Store a value under a key, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): The key of the entry.
+            value (Any): The value to store.
+            ttl (float | None, optional): The time to live of this entry. Default is the TTL of the cache.
+        """
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the value stored under a key, computing and storing it on a miss.
+
+        The value is computed outside the lock, so a slow computation does not block other lookups.
+
+        Args:
+            key (Hashable): The key of the entry.
+            compute (Callable[[], Any]): The function computing the value on a miss.
+
+        Returns:
+            Any: The cached or the computed value.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove the entry stored under a key, if any.
+
+        Args:
+            key (Hashable): The key of the entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries; the counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Describe the state of the cache.
+
+        Returns:
+            dict: The size, limits and counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else None,
+        }
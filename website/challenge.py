@@ -3,17 +3,23 @@ Challenge view module.
 User's challenges.
 """
 
-from datetime import datetime, timedelta
 import random
-from flask import Blueprint, flash, render_template, request, redirect, url_for
+from flask import Blueprint, abort, flash, render_template, request, redirect, url_for
 from flask_login import login_required, current_user
 
-from website.customized_tasks import (
-    get_task_dry_laundry_outside,
-    get_task_replace_bulbs,
-    get_task_sleep_mode,
-)
+from website.customized_tasks import customize_task
 from website.game.badges import all_badges
+from website.leaderboard import (
+    SNAPSHOT_PERIODS,
+    add_points,
+    get_period_start,
+    get_rank_with_neighbours,
+    get_snapshot,
+    get_snapshot_periods,
+    get_top_scores,
+    get_window_ranking,
+)
+from website.time_windows import custom_window, get_window, last_days
 
 from .models import (
     Client,
@@ -21,13 +27,19 @@ from .models import (
     Challenge,
 )
 from . import db
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from sqlalchemy import or_
-from sqlalchemy import func, extract
 
 
 challenge = Blueprint("challenge", __name__)
 RANKING: str = "ranking.html"
+RANKING_PAGE_SIZE: int = 20
+RANKING_TITLES: dict[str, str] = {
+    "day": "Daily ranking of Energy Wizards 🪄",
+    "week": "Weekly ranking of Energy Wizards 🧙‍♂️",
+    "month": "Monthly ranking of Energy Wizards 🧙",
+    "overall": "Overall ranking of Energy Wizards ✨",
+}
 
 
 def _get_unlocked_challenges(id_client: int) -> list[Challenge]:
@@ -142,19 +154,20 @@ def _customize_task_desciptions(
 
     This function takes a list of Challenge objects and customizes their descriptions based
     on the user's current state or profile. It iterates through each challenge and applies
-    a customizing function to modify the description. The customized descriptions, along
+    its customizer from the registry in website/customized_tasks.py, which caches the results
+    according to the customizer's policy. The customized descriptions, along
     with their corresponding Challenge objects, are stored in tuples and returned as a list.
     """
     challenges_customized = []
     if isinstance(challenges, list):
         for challenge in challenges:
-            custom_description = globals()[challenge.customizing_function](
-                challenge.description, current_user
+            custom_description = customize_task(
+                challenge.customizing_function, challenge.description, current_user
             )
             challenges_customized.append((challenge, custom_description))
     else:
-        custom_description = globals()[challenges.customizing_function](
-            challenges.description, current_user
+        custom_description = customize_task(
+            challenges.customizing_function, challenges.description, current_user
         )
         challenges_customized.append((challenges, custom_description))
     return challenges_customized
@@ -311,8 +324,8 @@ def finish_challenge(id_challenge):
     associated with the specified challenge and the current user to True,
     indicating that the user has completed the challenge. It also assigns
     a random badge to the user based on the type of challenge completed,
-    updates the user's total points accordingly, and redirects to the
-    congratulations page.
+    updates the user's total points and leaderboard scores accordingly,
+    and redirects to the congratulations page.
 
     Args:
         id_challenge (int): The ID of the challenge to mark as finished.
@@ -335,6 +348,11 @@ def finish_challenge(id_challenge):
         customized_challenge.is_done = True
         ch_type: str = get_challenge_type(customized_challenge.id_challenge)
         random_badge = get_random_badge(ch_type)
+        add_points(
+            current_user.id_client,
+            customized_challenge.start_date,
+            random_badge.points - (customized_challenge.points_scored or 0),
+        )
         customized_challenge.points_scored = random_badge.points
         client.points = client.points + random_badge.points
         db.session.commit()
@@ -390,6 +408,7 @@ def resign_challenge(id_challenge):
     This function deletes the CustomizedChallenge entry associated
     with the specified challenge and the current user from the database,
     indicating that the user has chosen to resign from the challenge.
+    Points scored in the challenge are taken back from the leaderboard.
     Upon successful resignation, a success flash message is displayed,
     and the user is redirected back to the challenges page.
 
@@ -410,6 +429,11 @@ def resign_challenge(id_challenge):
         id_client=current_user.id_client, id_challenge=id_challenge
     ).first()
     if customized_challenge:
+        add_points(
+            current_user.id_client,
+            customized_challenge.start_date,
+            -(customized_challenge.points_scored or 0),
+        )
         db.session.delete(customized_challenge)
         db.session.commit()
         flash("Resigned from challenge successfully.", "success")
@@ -466,23 +490,53 @@ def get_challenge_type(id_challenge: int) -> str:
     return challenge.type_small_big
 
 
+def _render_ranking(period: str, title: str):
+    """
+    Render a page of a ranking of the current period with the position of the logged-in user.
+
+    The page number is read from the `page` query parameter.
+
+    Args:
+        period (str): 'day', 'week', 'month' or 'overall'.
+        title (str): The title of the page.
+
+    Returns:
+        rendered_template: HTML template displaying the ranking.
+    """
+    page = max(request.args.get("page", 1, type=int), 1)
+    period_start = get_period_start(period, date.today())
+    return render_template(
+        RANKING,
+        ranking=get_top_scores(period, period_start, page, RANKING_PAGE_SIZE),
+        user_position=get_rank_with_neighbours(
+            period, period_start, current_user.id_client
+        ),
+        id_client=current_user.id_client,
+        page=page,
+        page_size=RANKING_PAGE_SIZE,
+        title=title,
+        history_url=(
+            url_for("challenge.ranking_history", period=period)
+            if period in SNAPSHOT_PERIODS
+            else None
+        ),
+    )
+
+
 @challenge.route("/daily-ranking")
 @login_required
 def daily_ranking():
     """
     Display the daily ranking of users based on points scored.
 
-    This route retrieves the daily ranking of users by summing the points scored
-    on the current day. It then renders the ranking template with the title
+    This route reads the daily ranking of users from the leaderboard (points scored
+    in the challenges started on the current day). It then renders the ranking template with the title
     'Daily ranking of Energy Wizards 🪄' and the ranking data.
 
     Returns:
         rendered_template: HTML template displaying the daily ranking.
     """
-    ranking = daily_points_ranking()
-    return render_template(
-        RANKING, ranking=ranking, title="Daily ranking of Energy Wizards 🪄"
-    )
+    return _render_ranking("day", RANKING_TITLES["day"])
 
 
 @challenge.route("/weekly-ranking")
@@ -491,17 +545,14 @@ def weekly_ranking():
     """
     Display the weekly ranking of users based on points scored.
 
-    This route retrieves the weekly ranking of users by summing the points scored
-    in the current week. It then renders the ranking template with the title
+    This route reads the weekly ranking of users from the leaderboard (points scored
+    in the challenges started in the current week). It then renders the ranking template with the title
     'Weekly ranking of Energy Wizards 🧙‍♂️' and the ranking data.
 
     Returns:
         rendered_template: HTML template displaying the weekly ranking.
     """
-    ranking = weekly_points_ranking()
-    return render_template(
-        RANKING, ranking=ranking, title="Weekly ranking of Energy Wizards 🧙‍♂️"
-    )
+    return _render_ranking("week", RANKING_TITLES["week"])
 
 
 @challenge.route("/monthly-ranking")
@@ -510,17 +561,14 @@ def monthly_ranking():
     """
     Display the monthly ranking of users based on points scored.
 
-    This route retrieves the monthly ranking of users by summing the points scored
-    in the current month. It then renders the ranking template with the title
+    This route reads the monthly ranking of users from the leaderboard (points scored
+    in the challenges started in the current month). It then renders the ranking template with the title
     'Monthly ranking of Energy Wizards 🧙' and the ranking data.
 
     Returns:
         rendered_template: HTML template displaying the monthly ranking.
     """
-    ranking = monthly_points_ranking()
-    return render_template(
-        RANKING, ranking=ranking, title="Monthly ranking of Energy Wizards 🧙"
-    )
+    return _render_ranking("month", RANKING_TITLES["month"])
 
 
 @challenge.route("/overall-ranking")
@@ -529,126 +577,103 @@ def overall_ranking():
     """
     Display the overall ranking of users based on points scored.
 
-    This route retrieves the overall ranking of users by summing the points scored
-    across all time. It then renders the ranking template with the title
+    This route reads the overall ranking of users from the leaderboard (points scored
+    across all time). It then renders the ranking template with the title
     'Overall ranking of Energy Wizards ✨' and the ranking data.
 
     Returns:
         rendered_template: HTML template displaying the overall ranking.
     """
-    ranking = overall_points_ranking()
-    return render_template(
-        RANKING, ranking=ranking, title="Overall ranking of Energy Wizards ✨"
-    )
-
-
-def monthly_points_ranking() -> list[tuple]:
-    """
-    Retrieve the monthly ranking of users based on points scored.
-
-    This function calculates the total points scored by each user in the current month
-    and returns a list of tuples containing the username and their total points,
-    ordered by the total points in descending order.
-
-    Returns:
-        list: A list of tuples with usernames and their total points for the current month.
-    """
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    monthly_ranking = (
-        db.session.query(
-            Client.username,
-            func.sum(CustomizedChallenge.points_scored).label("total_points"),
-        )
-        .join(CustomizedChallenge)
-        .filter(
-            extract("month", CustomizedChallenge.start_date) == current_month,
-            extract("year", CustomizedChallenge.start_date) == current_year,
-        )
-        .group_by(Client.username)
-        .order_by(func.sum(CustomizedChallenge.points_scored).desc())
-        .all()
-    )
-    return monthly_ranking
+    return _render_ranking("overall", RANKING_TITLES["overall"])
 
 
-def overall_points_ranking() -> list[tuple]:
+@challenge.route("/ranking")
+@login_required
+def window_ranking():
     """
-    Retrieve the overall ranking of users based on points scored.
+    Display the ranking of users based on points scored in any window of days.
 
-    This function calculates the total points scored by each user across all time
-    and returns a list of tuples containing the username and their total points,
-    ordered by the total points in descending order.
+    The window is given either as `last_days` (e.g. 7 for the last 7 days, today included)
+    or as `start_date` and `end_date` (YYYY-MM-DD, both included); it defaults to the last 7 days.
+    The points are summed up from the challenges started in the window.
+    A window reaching outside the calendar (e.g. `last_days=1000000`) is invalid.
 
     Returns:
-        list: A list of tuples with usernames and their total points for all time.
+        rendered_template: HTML template displaying the ranking, or 400 for an invalid window.
     """
-    overall_ranking = (
-        db.session.query(
-            Client.username,
-            func.sum(CustomizedChallenge.points_scored).label("total_points"),
-        )
-        .join(CustomizedChallenge)
-        .group_by(Client.username)
-        .order_by(func.sum(CustomizedChallenge.points_scored).desc())
-        .all()
+    try:
+        if request.args.get("start_date") and request.args.get("end_date"):
+            window = custom_window(
+                datetime.strptime(request.args["start_date"], "%Y-%m-%d").date(),
+                datetime.strptime(request.args["end_date"], "%Y-%m-%d").date(),
+            )
+            title = f"Ranking of Energy Wizards {window.start} - {window.last_day} 🔮"
+        else:
+            days = request.args.get("last_days", 7, type=int)
+            window = last_days(days)
+            title = f"Ranking of Energy Wizards of the last {days} days 🔮"
+    except (ValueError, OverflowError):
+        return "Invalid ranking window.", 400
+    return render_template(
+        RANKING,
+        ranking=get_window_ranking(window),
+        user_position=[],
+        id_client=current_user.id_client,
+        page=1,
+        page_size=None,
+        title=title,
     )
-    return overall_ranking
 
 
-def daily_points_ranking() -> list[tuple]:
+@challenge.route("/ranking-history/<period>")
+@login_required
+def ranking_history(period: str):
     """
-    Retrieve the daily ranking of users based on points scored.
+    Display the list of the closed periods with a frozen ranking, from the latest.
 
-    This function calculates the total points scored by each user on the current day
-    and returns a list of tuples containing the username and their total points,
-    ordered by the total points in descending order.
+    Args:
+        period (str): 'day', 'week' or 'month'.
 
     Returns:
-        list: A list of tuples with usernames and their total points for the current day.
+        rendered_template: HTML template displaying the links to the past rankings, or 404 for an unknown period.
     """
-    current_date = datetime.now().date()
-    daily_ranking = (
-        db.session.query(
-            Client.username,
-            func.sum(CustomizedChallenge.points_scored).label("total_points"),
-        )
-        .join(CustomizedChallenge)
-        .filter(
-            extract("day", CustomizedChallenge.start_date) == current_date.day,
-            extract("month", CustomizedChallenge.start_date) == current_date.month,
-            extract("year", CustomizedChallenge.start_date) == current_date.year,
-        )
-        .group_by(Client.username)
-        .order_by(func.sum(CustomizedChallenge.points_scored).desc())
-        .all()
+    if period not in SNAPSHOT_PERIODS:
+        abort(404)
+    return render_template(
+        "ranking_history.html",
+        period=period,
+        period_starts=get_snapshot_periods(period),
+        title=f"{RANKING_TITLES[period]} - history 📜",
     )
-    return daily_ranking
 
 
-def weekly_points_ranking() -> list[tuple]:
+@challenge.route("/ranking-history/<period>/<period_start>")
+@login_required
+def past_ranking(period: str, period_start: str):
     """
-    Retrieve the weekly ranking of users based on points scored.
+    Display the frozen ranking of a closed period.
 
-    This function calculates the total points scored by each user in the current week
-    (from Monday to Sunday) and returns a list of tuples containing the username and
-    their total points, ordered by the total points in descending order.
+    Args:
+        period (str): 'day', 'week' or 'month'.
+        period_start (str): The first day of the period (YYYY-MM-DD).
 
     Returns:
-        list: A list of tuples with usernames and their total points for the current week.
-    """
-    current_date = datetime.now().date()
-    start_of_week = current_date - timedelta(days=current_date.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    weekly_ranking = (
-        db.session.query(
-            Client.username,
-            func.sum(CustomizedChallenge.points_scored).label("total_points"),
-        )
-        .join(CustomizedChallenge)
-        .filter(CustomizedChallenge.start_date.between(start_of_week, end_of_week))
-        .group_by(Client.username)
-        .order_by(func.sum(CustomizedChallenge.points_scored).desc())
-        .all()
+        rendered_template: HTML template displaying the ranking, or 404 for an unknown period.
+    """
+    try:
+        period_start = datetime.strptime(period_start, "%Y-%m-%d").date()
+    except ValueError:
+        abort(404)
+    if period not in SNAPSHOT_PERIODS:
+        abort(404)
+    window = get_window(period, period_start)
+    return render_template(
+        RANKING,
+        ranking=get_snapshot(period, window.start),
+        user_position=[],
+        id_client=current_user.id_client,
+        page=1,
+        page_size=None,
+        title=f"{RANKING_TITLES[period]} {window.start} - {window.last_day}",
+        history_url=url_for("challenge.ranking_history", period=period),
     )
-    return weekly_ranking
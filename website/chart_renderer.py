@@ -0,0 +1,260 @@
+"""
+Chart renderer module.
+
+This module renders the energy usage charts to PNG images with matplotlib's object-oriented API:
+every chart is drawn on a `Figure` with its own Agg canvas, without pyplot and its global figure registry.
+Figures are taken from a small pool and cleared after every render, so the number of figures alive in a process
+is bounded by the pool size, however many charts it renders. A figure is used by one thread at a time,
+which makes rendering safe in threaded servers.
+
+Rendering holds the GIL for hundreds of milliseconds, so the website renders charts in a pool of worker processes
+(`render_chart_in_pool`) and never in the web worker. The workers are started once per web worker, and each of them
+imports matplotlib and pandas and warms up their caches with a first render before it takes a task; renders
+requested meanwhile wait in the queue of the pool. Every render has a deadline. A render that misses it returns None,
+and the page shows that the chart is unavailable instead of holding the request; if the render was already running,
+the pool is retired: new renders go to a new pool, while the workers of the old one finish the renders they were
+given and then exit.
+
+Classes:
+    - FigurePool: A bounded pool of reusable figures.
+
+Functions:
+    - render_chart(times: np.ndarray, used_energy: np.ndarray, start_date: date, end_date: date) -> str:
+        Renders an energy usage chart (line or bar) to a base64-encoded PNG image.
+
+    - get_render_pool(workers: int) -> ProcessPoolExecutor:
+        Returns the warm pool of rendering processes of the current process.
+
+    - render_chart_in_pool(times, used_energy, start_date, end_date, workers, timeout) -> str | None:
+        Renders a chart in the pool of rendering processes within a deadline.
+"""
+
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import date
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+CHART_COLOR = "#018079"
+
+logger = logging.getLogger(__name__)
+
+_render_pool = None
+_render_pool_pid = None
+_retired_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+class FigurePool:
+    """
+    A bounded pool of reusable figures.
+
+    Figures are created on demand up to `size`; when all of them are in use, `acquire` waits for one to be released.
+
+    Attributes:
+        size (int): The maximum number of figures.
+        created (int): The number of figures created so far.
+    """
+
+    def __init__(self, size: int = 4) -> None:
+        self.size = size
+        self.created = 0
+        self._figures = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """
+        Lend a cleared figure with an Agg canvas for the duration of a `with` block.
+
+        Yields:
+            Figure: A figure used by the calling thread only; it is cleared and returned to the pool afterwards.
+        """
+        try:
+            figure = self._figures.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            if create:
+                figure = Figure()
+                FigureCanvasAgg(figure)
+            else:
+                figure = self._figures.get()
+        try:
+            yield figure
+        finally:
+            figure.clear()
+            self._figures.put(figure)
+
+
+figure_pool = FigurePool()
+
+
+def render_chart(
+    times: np.ndarray, used_energy: np.ndarray, start_date: date, end_date: date
+) -> str:
+    """
+    Render an energy usage chart (line or bar) to a base64-encoded PNG image.
+
+    A single day is drawn as a line chart by hour, a range of days as a bar chart with one bar per day.
+
+    Args:
+        times (np.ndarray): The times of the readings (one per day for a range of days).
+        used_energy (np.ndarray): The used energy of the readings.
+        start_date (date): The start date of the range.
+        end_date (date): The end date of the range.
+
+    Returns:
+        str: A base64-encoded PNG image of the chart.
+    """
+    times = np.asarray(times, dtype="datetime64[s]")
+    used_energy = np.asarray(used_energy, dtype=np.float64)
+    with figure_pool.acquire() as figure:
+        ax = figure.add_subplot()
+        if (end_date - start_date).days == 0:  # only one day - line chart
+            ax.plot(times, used_energy, color=CHART_COLOR, label="used_energy")
+            ax.set_title(f"Daily energy consumption on {start_date}")
+            ax.set_xlabel("time")
+            ax.xaxis.set_major_formatter(mdates.DateFormatter("%H"))
+        else:  # more days - bar chart
+            positions = np.arange(len(times))
+            ax.bar(positions, used_energy, color=CHART_COLOR, label="used_energy")
+            ax.set_xticks(
+                positions,
+                pd.to_datetime(times).strftime("%Y-%m-%d"),
+                rotation=90,
+            )
+            ax.set_title(f"Energy consumption in the period {start_date} - {end_date}")
+            ax.set_xlabel("date")
+        ax.set_ylabel("usage (kWh)")
+        ax.legend()
+        png_image = io.BytesIO()
+        figure.savefig(png_image, format="png")
+    return base64.b64encode(png_image.getvalue()).decode("ascii")
+
+
+def _warm_up_worker() -> None:
+    """
+    Render a small chart once, so that the first real render of a worker finds matplotlib's caches loaded.
+    """
+    day = date(2024, 1, 1)
+    times = np.array(["2024-01-01T00:00", "2024-01-01T01:00"], dtype="datetime64[s]")
+    render_chart(times, np.zeros(2), day, day)
+
+
+def get_render_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the warm pool of rendering processes of the current process.
+
+    The pool is created on first use and its workers are started right away; each worker renders a first chart
+    in its initializer before it takes a task. Workers are spawned rather than forked, so they do not inherit
+    the threads and database connections of the web worker. The renders submitted to the pool and not finished yet
+    are kept in its `pending` attribute.
+
+    Args:
+        workers (int): The number of rendering processes.
+
+    Returns:
+        ProcessPoolExecutor: The pool of rendering processes.
+    """
+    global _render_pool, _render_pool_pid
+    with _render_pool_lock:
+        if _render_pool is None or _render_pool_pid != os.getpid():
+            _render_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+            _render_pool_pid = os.getpid()
+            _render_pool.pending = set()
+            # Workers are spawned on demand, one per task submitted while none is idle
+            for _ in range(workers):
+                _render_pool.submit(int)
+        return _render_pool
+
+
+def _retire_render_pool(pool: ProcessPoolExecutor) -> bool:
+    """
+    Replace a broken or stuck pool with a new one for the next renders.
+
+    The retired pool is shut down without cancelling anything: its workers finish the renders they were given,
+    then exit. While a retired pool still has renders in flight, no other pool is retired,
+    so slow renders cannot pile up pools of processes.
+
+    Returns:
+        bool: Whether the pool was retired.
+    """
+    global _render_pool, _retired_render_pool
+    with _render_pool_lock:
+        if _render_pool is not pool:
+            return False
+        if _retired_render_pool is not None and _retired_render_pool.pending:
+            return False
+        _render_pool = None
+        _retired_render_pool = pool
+    pool.shutdown(wait=False)
+    return True
+
+
+def render_chart_in_pool(
+    times: np.ndarray,
+    used_energy: np.ndarray,
+    start_date: date,
+    end_date: date,
+    workers: int = 2,
+    timeout: float = 5.0,
+) -> str | None:
+    """
+    Render a chart in the pool of rendering processes within a deadline.
+
+    Renders requested while the workers of a new pool start wait for them, within the same deadline.
+    A render that misses its deadline while running cannot be cancelled, so the pool is retired (see
+    `_retire_render_pool`) and the renders running in it still finish.
+
+    Args:
+        times (np.ndarray): The times of the readings (one per day for a range of days).
+        used_energy (np.ndarray): The used energy of the readings.
+        start_date (date): The start date of the range.
+        end_date (date): The end date of the range.
+        workers (int, optional): The number of rendering processes; 0 renders in the calling thread. Default is 2.
+        timeout (float, optional): The deadline of the render in seconds, waiting in the queue included.
+                                   Default is 5 seconds.
+
+    Returns:
+        str | None: A base64-encoded PNG image of the chart, or None if it could not be rendered in time.
+    """
+    if workers <= 0:
+        return render_chart(times, used_energy, start_date, end_date)
+    pool = get_render_pool(workers)
+    try:
+        future = pool.submit(render_chart, times, used_energy, start_date, end_date)
+        pool.pending.add(future)
+        future.add_done_callback(pool.pending.discard)
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        if not future.cancel() and _retire_render_pool(pool):
+            logger.warning("Chart rendering pool retired after a stuck render")
+        logger.warning("Chart rendering did not finish within %s s", timeout)
+    except BrokenProcessPool as error:
+        _retire_render_pool(pool)
+        logger.warning("Chart rendering pool is broken: %s", error)
+    except RuntimeError:
+        # Another request retired the pool between get_render_pool and submit
+        return render_chart_in_pool(
+            times, used_energy, start_date, end_date, workers, timeout
+        )
+    return None
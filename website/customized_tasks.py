@@ -3,7 +3,26 @@ This module contains functions that customize the content of challenges for user
 on their location, household details, and current weather conditions. The primary goal
 is to provide personalized task descriptions that are relevant and useful for the users.
 
+The customizers are registered with the `customizer` decorator under their function names, which are stored
+in `Challenge.customizing_function`. Each customizer declares what its result depends on, and the result is cached
+accordingly, so a view of the challenges does not compute every task description again:
+    - 'static': the result depends on the description only and is computed once per worker.
+    - 'user': the result depends on the user (and the listed user fields) and is computed once per user.
+    - 'city': the result depends on the city of the user and is recomputed after a time to live.
+
+Classes:
+    Customizer: A registered task customizer with its cache.
+
 Functions:
+    customizer(policy: str, ttl: float | None, user_fields: tuple[str, ...]) -> Callable:
+        Register a task customizer with its cache policy.
+
+    customize_task(name: str, description_template: str, user) -> str:
+        Customize a task description with a registered customizer.
+
+    _get_city(user) -> str:
+        Retrieve the city of the user's mailing address.
+
     _check_weather(city: str) -> str:
         Check the current weather conditions for drying laundry outside.
         
@@ -20,19 +39,140 @@ Functions:
         Generate a task description for configuring sleep mode on devices.
 """
 
-import requests
+from typing import Callable
+
+from website.cache import LRUCache
 from website.models import Address
-from website.secret import WEATHER_API_KEY
+from website.weather import get_current_weather
 
 from website.configuration_guide import MAC, WINDOWS
 
+CACHE_POLICIES = ("static", "user", "city")
+# The weather itself is cached and refreshed by website/weather.py; this only keeps the formatted description
+WEATHER_DESCRIPTION_TTL = 60
+CITY_TTL = 60 * 60
+CUSTOMIZERS: dict = {}
+city_cache = LRUCache(max_size=4096, ttl=CITY_TTL)
+
+
+class Customizer:
+    """
+    A registered task customizer with its cache.
+
+    Attributes:
+        function (Callable[[str, Client], str]): The function customizing a description template for a user.
+        policy (str): What the result depends on - 'static', 'user' or 'city'.
+        user_fields (tuple[str, ...]): The attributes of the user the result depends on (for the 'user' policy),
+                                       so that changing them is never served a stale result.
+        cache (LRUCache): The cached results.
+    """
+
+    def __init__(
+        self,
+        function: Callable,
+        policy: str,
+        ttl: float | None = None,
+        user_fields: tuple[str, ...] = (),
+    ) -> None:
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy {policy!r}")
+        self.function = function
+        self.policy = policy
+        self.user_fields = user_fields
+        self.cache = LRUCache(max_size=64 if policy == "static" else 4096, ttl=ttl)
+
+    def get_key(self, description_template: str, user) -> tuple:
+        """
+        Build the cache key of a result.
+
+        Args:
+            description_template (str): The template for the task description.
+            user (Client): The user.
+
+        Returns:
+            tuple: The key, made of the template and what the result depends on.
+        """
+        if self.policy == "user":
+            fields = tuple(getattr(user, field) for field in self.user_fields)
+            return description_template, user.id_client, fields
+        if self.policy == "city":
+            return description_template, _get_city(user)
+        return (description_template,)
+
+    def __call__(self, description_template: str, user) -> str:
+        return self.cache.get_or_set(
+            self.get_key(description_template, user),
+            lambda: self.function(description_template, user),
+        )
+
+
+def customizer(
+    policy: str, ttl: float | None = None, user_fields: tuple[str, ...] = ()
+) -> Callable:
+    """
+    Register a task customizer with its cache policy.
+
+    Args:
+        policy (str): What the result depends on - 'static', 'user' or 'city'.
+        ttl (float | None, optional): The number of seconds a result stays valid, or None for no expiry.
+        user_fields (tuple[str, ...], optional): The attributes of the user the result depends on.
+
+    Returns:
+        Callable: A decorator registering the function under its name; the function itself is returned unchanged.
+    """
+
+    def register(function: Callable) -> Callable:
+        CUSTOMIZERS[function.__name__] = Customizer(function, policy, ttl, user_fields)
+        return function
+
+    return register
+
+
+def customize_task(name: str, description_template: str, user) -> str:
+    """
+    Customize a task description with a registered customizer, from its cache when possible.
+
+    Args:
+        name (str): The name of the customizer (`Challenge.customizing_function`).
+        description_template (str): The template for the task description.
+        user (Client): The user.
+
+    Returns:
+        str: The customized task description.
+
+    Raises:
+        LookupError: If no customizer is registered under the name.
+    """
+    if name not in CUSTOMIZERS:
+        raise LookupError(f"Unknown task customizer {name!r}")
+    return CUSTOMIZERS[name](description_template, user)
+
+
+def _get_city(user) -> str:
+    """
+    Retrieve the city of the user's mailing address, cached per address.
+
+    Args:
+        user (Client): The user.
+
+    Returns:
+        str: The name of the city.
+    """
+    return city_cache.get_or_set(
+        user.id_clients_mailing_address,
+        lambda: Address.query.filter_by(id_address=user.id_clients_mailing_address)
+        .with_entities(Address.city)
+        .first()[0],
+    )
+
 
 def _check_weather(city: str) -> str:
     """
     Check the current weather conditions for drying laundry outside.
 
-    This function fetches the current weather data for a specified city using the
-    WeatherAPI. It checks the wind speed, humidity, and temperature to determine
+    This function reads the current weather data for a specified city from the
+    weather cache (see website/weather.py), which calls the WeatherAPI once for all
+    users of a city. It checks the wind speed, humidity, and temperature to determine
     if the conditions are suitable for drying laundry outside.
 
     Args:
@@ -44,14 +184,11 @@ def _check_weather(city: str) -> str:
              and temperature. If the weather conditions are not suitable, the message
              provides the reason why.
     """
-    base_url: str = "http://api.weatherapi.com/v1/current.json?"
-    complete_url: str = f"{base_url}key={WEATHER_API_KEY}&q={city}"
-    response = requests.get(complete_url)
-    response_json = response.json()
-    if "error" not in response_json:
-        wind = response_json["current"]["wind_kph"]
-        humidity = response_json["current"]["humidity"]
-        temperature = response_json["current"]["temp_c"]
+    weather = get_current_weather(city)
+    if weather is not None:
+        wind = weather["wind_kph"]
+        humidity = weather["humidity"]
+        temperature = weather["temp_c"]
         if humidity > 60:
             return (
                 f"The weather conditions in {city} aren't good to dry your washing, it's too wet ({humidity}%). "
@@ -76,6 +213,7 @@ def _check_weather(city: str) -> str:
         return f"You have to check the weather conditions in {city} on your own because there is a problem with app."
 
 
+@customizer("city", ttl=WEATHER_DESCRIPTION_TTL)
 def get_task_dry_laundry_outside(description_template: str, user: str) -> str:
     """
     Generate a task description for drying laundry outside with weather information.
@@ -91,12 +229,7 @@ def get_task_dry_laundry_outside(description_template: str, user: str) -> str:
     Returns:
         str: A formatted task description with weather information.
     """
-    address = (
-        Address.query.filter_by(id_address=user.id_clients_mailing_address)
-        .with_entities(Address.city)
-        .first()
-    )[0]
-    return description_template.format(weather_today=(_check_weather(address)))
+    return description_template.format(weather_today=(_check_weather(_get_city(user))))
 
 
 def _get_savings_on_bulbs(number_of_rooms: int) -> dict:
@@ -137,6 +270,7 @@ def _get_savings_on_bulbs(number_of_rooms: int) -> dict:
     }
 
 
+@customizer("user", user_fields=("number_of_rooms",))
 def get_task_replace_bulbs(description_template: str, user: str) -> str:
     """
     Generate a task description for replacing bulbs with calculated savings.
@@ -155,6 +289,7 @@ def get_task_replace_bulbs(description_template: str, user: str) -> str:
     return description_template.format(**_get_savings_on_bulbs(user.number_of_rooms))
 
 
+@customizer("static")
 def get_task_sleep_mode(description_template: str, user: str) -> str:
     """
     Generate a task description for configuring sleep mode on devices.
@@ -0,0 +1,167 @@
+"""
+Dashboard module.
+
+This module gathers everything the dashboard shows about a client - the meter, the name of its offer,
+the number of unpaid invoices and today's readings - in a single query, so the dashboard costs one round trip
+to the database plus the rendering of the chart. Summaries are kept for a short time per client in `summary_cache`,
+so reloading the dashboard does not query the database at all. The summary of a client is dropped from the cache
+as soon as one of its invoices is marked as paid through the website's session.
+
+Functions:
+    - get_dashboard_summary(id_client: int, day: date) -> dict | None:
+        Retrieves the dashboard summary of a client for a day, from the cache when it is fresh.
+
+    - query_dashboard_summary(id_client: int, day: date) -> dict | None:
+        Queries the dashboard summary of a client for a day in one round trip.
+
+    - invalidate_dashboard_summary(id_client: int) -> None:
+        Drops today's cached dashboard summary of a client.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from website import db
+from website.cache import LRUCache
+from website.invoices import unpaid_invoices_count
+from website.models import Invoice, Meter, Offer, Reading
+
+DEFAULT_SUMMARY_TTL = 60
+summary_cache = LRUCache(max_size=1024, ttl=DEFAULT_SUMMARY_TTL)
+
+
+def get_dashboard_summary(id_client: int, day: date) -> dict | None:
+    """
+    Retrieve the dashboard summary of a client for a day, from the cache when it is fresh.
+
+    Summaries are cached for `DASHBOARD_SUMMARY_TTL` seconds (default 60), so a new invoice or reading
+    shows up on the dashboard within that time; a paid invoice shows up at once (see `invalidate_dashboard_summary`).
+
+    Args:
+        id_client (int): The ID of the client.
+        day (date): The day of the readings.
+
+    Returns:
+        dict | None: The summary (see `query_dashboard_summary`), or None if the client has no meter.
+    """
+    key = (id_client, day)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = query_dashboard_summary(id_client, day)
+        if summary is not None:
+            summary_cache.set(
+                key,
+                summary,
+                ttl=current_app.config.get(
+                    "DASHBOARD_SUMMARY_TTL", DEFAULT_SUMMARY_TTL
+                ),
+            )
+    return summary
+
+
+def query_dashboard_summary(id_client: int, day: date) -> dict | None:
+    """
+    Query the dashboard summary of a client for a day in one round trip.
+
+    The meter is joined with its offer, while the unpaid invoices are counted and today's readings are aggregated
+    into arrays by correlated subqueries of the same statement (see website/invoices.py for the count).
+    The readings of a day are never archived, so they are all in the reading table.
+
+    Args:
+        id_client (int): The ID of the client.
+        day (date): The day of the readings.
+
+    Returns:
+        dict | None: The summary with `id_meter`, `offer_name`, `unpaid_invoices`, `times` (datetime64[s] array)
+                     and `used_energy` (float64 array), or None if the client has no meter.
+    """
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    unpaid_invoices = unpaid_invoices_count(Meter.id_meter)
+    readings = select(Reading).where(
+        Reading.id_meter == Meter.id_meter,
+        Reading.time >= start,
+        Reading.time < end,
+    )
+    times = readings.with_only_columns(
+        func.array_agg(aggregate_order_by(Reading.time, Reading.time))
+    ).scalar_subquery()
+    used_energy = readings.with_only_columns(
+        func.array_agg(aggregate_order_by(Reading.used_energy, Reading.time))
+    ).scalar_subquery()
+    row = db.session.execute(
+        select(
+            Meter.id_meter,
+            Offer.name,
+            unpaid_invoices.label("unpaid_invoices"),
+            times.label("times"),
+            used_energy.label("used_energy"),
+        )
+        .outerjoin(Offer, Offer.id_offer == Meter.id_offer)
+        .where(Meter.id_client == id_client)
+        .order_by(Meter.id_meter)
+        .limit(1)
+    ).first()
+    if row is None:
+        return None
+    return {
+        "id_meter": row.id_meter,
+        "offer_name": row.name,
+        "unpaid_invoices": row.unpaid_invoices,
+        "times": np.array(row.times or [], dtype="datetime64[s]"),
+        "used_energy": np.array(row.used_energy or [], dtype=np.float64),
+    }
+
+
+def invalidate_dashboard_summary(id_client: int) -> None:
+    """
+    Drop today's cached dashboard summary of a client, so its next dashboard is queried again.
+
+    Args:
+        id_client (int): The ID of the client.
+    """
+    summary_cache.delete((id_client, datetime.now().date()))
+
+
+@event.listens_for(Session, "after_flush")
+def collect_paid_invoice_clients(session, flush_context):
+    """
+    Remember the clients of the invoices marked as paid by a flush, until the transaction ends.
+
+    The clients are looked up in the flushing transaction; their summaries are only dropped once it is committed,
+    so a summary cached meanwhile from the previous state does not outlive the payment.
+    """
+    paid_meters = {
+        invoice.id_meter
+        for invoice in session.dirty
+        if isinstance(invoice, Invoice)
+        and invoice.is_it_paid
+        and inspect(invoice).attrs.is_it_paid.history.has_changes()
+    }
+    if paid_meters:
+        clients = session.connection().execute(
+            select(Meter.id_client).where(Meter.id_meter.in_(paid_meters))
+        )
+        session.info.setdefault("paid_invoice_clients", set()).update(clients.scalars())
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_paid_invoice_summaries(session):
+    """
+    Drop the cached summaries of the clients whose invoices were paid in the committed transaction.
+    """
+    for id_client in session.info.pop("paid_invoice_clients", ()):
+        invalidate_dashboard_summary(id_client)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_paid_invoice_clients(session):
+    """
+    Forget the clients of the invoices paid in a transaction that was rolled back.
+    """
+    session.info.pop("paid_invoice_clients", None)
@@ -0,0 +1,116 @@
+"""
+Downsampling module.
+
+This module reduces a time series to a target number of points before it is sent to the browser,
+so a chart of a long range stays small on the wire and quick to draw while keeping its shape.
+
+Functions:
+    - lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+        Selects the points kept by the Largest-Triangle-Three-Buckets algorithm.
+
+    - minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+        Selects the minimum and the maximum of every bucket.
+
+    - downsample(x: np.ndarray, y: np.ndarray, threshold: int, method: str) -> tuple[np.ndarray, np.ndarray]:
+        Reduces a series to at most `threshold` points with the given method.
+"""
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Select the points kept by the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and the last points are always kept. The points in between are split into `threshold - 2` buckets,
+    and from every bucket the point forming the largest triangle with the point kept from the previous bucket
+    and the average of the next bucket is kept. Peaks and troughs survive, unlike with plain averaging.
+
+    Args:
+        x (np.ndarray): The x values, in ascending order.
+        y (np.ndarray): The y values.
+        threshold (int): The number of points to keep; at least 3.
+
+    Returns:
+        np.ndarray: The indices of the kept points, in ascending order.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Select the minimum and the maximum of every bucket.
+
+    The series is split into `threshold // 2` buckets of consecutive points, and the lowest and the highest
+    point of every bucket are kept in their original order. It is cheaper than LTTB and keeps every extreme value.
+
+    Args:
+        x (np.ndarray): The x values, in ascending order.
+        y (np.ndarray): The y values.
+        threshold (int): The maximum number of points to keep; at least 2.
+
+    Returns:
+        np.ndarray: The indices of the kept points, in ascending order.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 2:
+        return np.arange(size)
+    buckets = threshold // 2
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    y = np.asarray(y)
+    lows = np.minimum.reduceat(y, edges[:-1])
+    highs = np.maximum.reduceat(y, edges[:-1])
+    selected = []
+    for bucket in range(buckets):
+        start, end = edges[bucket], edges[bucket + 1]
+        values = y[start:end]
+        selected.append(start + int(np.argmax(values == lows[bucket])))
+        selected.append(start + int(np.argmax(values == highs[bucket])))
+    return np.unique(selected)
+
+
+DOWNSAMPLING_METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(
+    x: np.ndarray, y: np.ndarray, threshold: int, method: str = "lttb"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a series to at most `threshold` points with the given method.
+
+    Args:
+        x (np.ndarray): The x values, in ascending order.
+        y (np.ndarray): The y values.
+        threshold (int): The maximum number of points to keep.
+        method (str, optional): 'lttb' or 'minmax'. Default is 'lttb'.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The kept x and y values.
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}")
+    selected = DOWNSAMPLING_METHODS[method](x, y, threshold)
+    return x[selected], y[selected]
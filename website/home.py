@@ -9,35 +9,67 @@ Routes:
     - display_home: Home page for logged-in users with energy usage chart and offer details.
     - client_logged_in: Dashboard page for logged-in users.
     - display_chart_of_energy_usage: Displays an energy usage chart for a specified date range.
-    - display_invoices: Displays the list of invoices for the logged-in user.
+    - display_chart_data: Returns the energy usage for a date range as JSON or float32, downsampled.
+    - display_invoices: Displays the invoices of the logged-in user, page by page.
 
 Functions:
-    - get_readings(id_meter: int, start_date: datetime, end_date: datetime) -> pd.DataFrame:
-        Retrieves energy readings for a given meter and date range.
-        
-    - create_chart(df: pd.DataFrame, start_date: datetime, end_date: datetime) -> bytes:
-        Creates an energy usage chart (line or bar) based on the data and date range.
-        
-    - get_invoices(id_client: int):
-        Retrieves a list of invoices for a given client.
+    - get_daily_chart(id_meter: int, day: datetime, times: np.ndarray, used_energy: np.ndarray) -> str | None:
+        Retrieves the energy usage chart of one day from readings that are already loaded.
+
+    - render_and_cache_chart(key: tuple, times, used_energy, start_date, end_date) -> str | None:
+        Renders an energy usage chart in the pool of rendering processes and keeps it in the chart cache.
+
+    - parse_date_range() -> tuple[datetime, datetime]:
+        Reads the date range of a chart from the query parameters.
+
+    - get_usage_series(id_meter: int, start_date: datetime, end_date: datetime, resolution: str) -> pd.DataFrame:
+        Retrieves the energy usage of a meter in a date range at a given resolution.
+
+    - get_raw_readings(id_meter: int, start: datetime, end: datetime) -> pd.DataFrame:
+        Retrieves the raw readings of a meter in a time range, streamed without ORM objects.
 """
 
-from datetime import datetime, timedelta
-from matplotlib.font_manager import FontProperties
+from __future__ import annotations
 
-from flask import Blueprint, render_template, request
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    render_template,
+    request,
+)
 from flask_login import login_required, current_user
-
-from website.models import Invoice, Meter, Offer, Reading
-import pandas as pd
-import matplotlib
-import matplotlib.pyplot as plt
-import io
-import base64
-import matplotlib.dates as mdates
+from sqlalchemy import select
+
+from website.archive import read_archived_readings, split_range_by_archive
+from website.cache import LRUCache
+from website.dashboard import get_dashboard_summary
+from website import db
+from website.downsampling import DOWNSAMPLING_METHODS, downsample
+from website.invoices import DEFAULT_INVOICE_PAGE_SIZE, get_invoice_page
+from website.models import (
+    Meter,
+    Reading,
+    ReadingDaily,
+    ReadingHourly,
+)
+import numpy as np
+
+# pandas and matplotlib are imported by the chart functions on first use, which keeps worker start fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 home = Blueprint("home", __name__)
-matplotlib.use("Agg")
+READING_COLUMNS = ("time", "used_energy")
+READINGS_CHUNK_SIZE = 10_000
+DEFAULT_CHART_POINTS = 1000
+MAX_CHART_POINTS = 10_000
+chart_cache = LRUCache(max_size=512, ttl=15 * 60)
 
 
 @home.route("/")
@@ -45,28 +77,32 @@ matplotlib.use("Agg")
 def display_home():
     """
     This view displays the user's energy usage chart, current offer, and the number of unpaid invoices.
-    If the user is not authenticated, it shows the home page.
+    If the user is not authenticated, it shows the home page. The data comes from the dashboard summary
+    (see website/dashboard.py), which is read in one query and cached briefly per user.
+    A client without a meter gets the dashboard without an offer, invoices or chart.
 
     Returns:
         A rendered template for the dashboard or home page.
     """
     if current_user.is_authenticated:
-        id_meter = (
-            Meter.query.filter_by(id_client=current_user.id_client).first().id_meter
+        today = datetime.now().date()
+        summary = get_dashboard_summary(current_user.id_client, today)
+        if summary is None:
+            return render_template(
+                "dashboard.html",
+                username=current_user.name,
+                current_offer=None,
+                num_unpaid_invoices=0,
+                chart_data=None,
+            )
+        chart = get_daily_chart(
+            summary["id_meter"], today, summary["times"], summary["used_energy"]
         )
-        df = get_readings(id_meter, datetime.now().date(), datetime.now().date())
-        chart = create_chart(df, datetime.now().date(), datetime.now().date())
-        id_offer = Meter.query.filter_by(id_meter=id_meter).first().id_offer
-        offer_name = Offer.query.filter_by(id_offer=id_offer).first().name
-        number_of_unpaid_invoices = 0
-        for invoice in get_invoices(current_user.id_client):
-            if invoice.query.filter_by(is_it_paid=False):
-                number_of_unpaid_invoices += 1
         return render_template(
             "dashboard.html",
             username=current_user.name,
-            current_offer=offer_name,
-            num_unpaid_invoices=number_of_unpaid_invoices,
+            current_offer=summary["offer_name"],
+            num_unpaid_invoices=summary["unpaid_invoices"],
             chart_data=chart,
         )
     return render_template("home.html")
@@ -94,127 +130,298 @@ def display_chart_of_energy_usage():
     Energy usage chart view.
 
     This view displays an energy usage chart for the specified date range. If no date range is provided,
-    it defaults to the current date.
+    it defaults to the current date. The chart is drawn in the browser from `/chart/data`.
 
     Returns:
         A rendered template for the usage chart page.
     """
-    id_meter = Meter.query.filter_by(id_client=current_user.id_client).first().id_meter
+    start_date, end_date = parse_date_range()
+    return render_template("usage_chart.html", start_date=start_date, end_date=end_date)
+
+
+@home.route("/chart/data")
+@login_required
+def display_chart_data():
+    """
+    Energy usage data view.
+
+    This view returns the energy usage of the logged-in user for the specified date range, for drawing
+    the chart in the browser. The range is read from the raw readings for one day and from the daily
+    rollup otherwise, or at the resolution given by `resolution` ('raw', 'hourly' or 'daily').
+    Series longer than `points` (default 1000) are downsampled with `method` ('lttb' or 'minmax').
+
+    With `format=json` (the default) the response is
+    `{"kind": ..., "total": ..., "time": [epoch seconds], "used_energy": [kWh]}`.
+    With `format=binary` it is `application/octet-stream` holding two little-endian arrays of `X-Points`
+    values: the whole seconds since `X-Start-Time` as int32 (exact over decades), then the used energy as float32.
+    A client without a meter gets an empty series.
+
+    Returns:
+        The usage data as JSON or binary, or 400 for invalid parameters.
+    """
+    start_date, end_date = parse_date_range()
+    resolution = request.args.get("resolution", "auto")
+    method = request.args.get("method", "lttb")
+    output_format = request.args.get("format", "json")
+    points = request.args.get("points", DEFAULT_CHART_POINTS, type=int)
+    if (
+        resolution not in ("auto", "raw", "hourly", "daily")
+        or method not in DOWNSAMPLING_METHODS
+        or output_format not in ("json", "binary")
+        or not 3 <= points <= MAX_CHART_POINTS
+    ):
+        return jsonify({"error": "Invalid chart data parameters."}), 400
+    if resolution == "auto":
+        resolution = "raw" if (end_date - start_date).days == 0 else "daily"
+    meter = Meter.query.filter_by(id_client=current_user.id_client).first()
+    seconds = np.array([], dtype=np.int64)
+    used_energy = np.array([], dtype=np.float64)
+    if meter is not None:
+        df = get_usage_series(meter.id_meter, start_date, end_date, resolution)
+        if not df.empty:
+            seconds = df["time"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+            used_energy = df["used_energy"].to_numpy(dtype=np.float64)
+    total = len(seconds)
+    seconds, used_energy = downsample(seconds, used_energy, points, method)
+    kind = "bar" if resolution == "daily" else "line"
+    if output_format == "binary":
+        start = int(seconds[0]) if len(seconds) else 0
+        offsets = (seconds - start).astype("<i4")
+        payload = offsets.tobytes() + used_energy.astype("<f4").tobytes()
+        response = Response(payload, mimetype="application/octet-stream")
+        response.headers["X-Start-Time"] = (
+            datetime(1970, 1, 1) + timedelta(seconds=start)
+        ).isoformat()
+        response.headers["X-Points"] = str(len(seconds))
+        response.headers["X-Total-Points"] = str(total)
+        response.headers["X-Chart-Kind"] = kind
+        return response
+    return jsonify(
+        {
+            "kind": kind,
+            "total": total,
+            "time": seconds.tolist(),
+            "used_energy": np.round(used_energy, 5).tolist(),
+        }
+    )
+
+
+def parse_date_range() -> tuple[datetime, datetime]:
+    """
+    Read the date range of a chart from the `start_date` and `end_date` query parameters.
+
+    If no date range is provided, it defaults to the current date. Reversed dates are swapped,
+    and a date that is not formatted as YYYY-MM-DD aborts the request with `400`.
+
+    Returns:
+        tuple[datetime, datetime]: The start and the end date of the range.
+    """
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
     if start_date and end_date:
-        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        try:
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            abort(
+                400,
+                description="start_date and end_date must be formatted as YYYY-MM-DD",
+            )
     else:
         start_date = datetime.now().date()
         end_date = start_date
     if end_date < start_date:
         start_date, end_date = end_date, start_date
-    df = get_readings(id_meter, start_date, end_date)
-    chart = create_chart(df, start_date, end_date)
-    return render_template("usage_chart.html", chart_data=chart)
+    return start_date, end_date
 
 
-def get_readings(
-    id_meter: int, start_date: datetime, end_date: datetime
+def get_usage_series(
+    id_meter: int, start_date: datetime, end_date: datetime, resolution: str
 ) -> pd.DataFrame:
     """
-    Retrieve energy readings for a given meter and date range.
-
-    This function queries the database to get the energy readings for a specified meter
-    within a given date range.
+    Retrieve the energy usage of a meter in a date range at a given resolution.
 
     Args:
-        id_meter (int): The ID of the meter to retrieve readings for.
+        id_meter (int): The ID of the meter.
         start_date (datetime): The start date of the range.
         end_date (datetime): The end date of the range.
+        resolution (str): 'raw' for the readings, 'hourly' or 'daily' for the rollups.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the energy readings.
+        pd.DataFrame: A DataFrame with `time` and `used_energy` columns, ordered by time.
     """
-    readings = Reading.query.filter(
-        Reading.id_meter == id_meter,
-        Reading.time >= start_date,
-        Reading.time < end_date + timedelta(days=1),
+    if resolution == "raw":
+        return get_raw_readings(
+            id_meter,
+            datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+        )
+    import pandas as pd
+
+    rollup = ReadingHourly if resolution == "hourly" else ReadingDaily
+    rows = db.session.execute(
+        select(rollup.bucket, rollup.used_energy)
+        .where(
+            rollup.id_meter == id_meter,
+            rollup.bucket >= start_date,
+            rollup.bucket < end_date + timedelta(days=1),
+        )
+        .order_by(rollup.bucket)
     ).all()
-    data = {
-        "time": [reading.time for reading in readings],
-        "used_energy": [reading.used_energy for reading in readings],
-    }
-    return pd.DataFrame(data)
+    df = pd.DataFrame.from_records(rows, columns=READING_COLUMNS)
+    df["time"] = pd.to_datetime(df["time"])
+    return df
 
 
-def create_chart(df: pd.DataFrame, start_date: datetime, end_date: datetime) -> bytes:
+def get_daily_chart(
+    id_meter: int, day: datetime, times: np.ndarray, used_energy: np.ndarray
+) -> str | None:
     """
-    Create an energy usage chart.
+    Retrieve the energy usage chart of a meter for one day from readings that are already loaded.
 
-    This function creates a chart (line or bar) to visualize the energy usage data
-    for the specified date range. The chart is then converted to a base64-encoded
-    PNG image.
+    The chart is kept in `chart_cache` under (meter, day, day, chart kind, latest reading time), with the latest
+    reading time taken from `times`, so it costs no query and a new reading of the day changes the key.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing the energy usage data.
-        start_date (datetime): The start date of the range.
-        end_date (datetime): The end date of the range.
+        id_meter (int): The ID of the meter.
+        day (datetime): The day of the readings.
+        times (np.ndarray): The times of the readings of the day, in ascending order.
+        used_energy (np.ndarray): The used energy of the readings.
 
     Returns:
-        bytes: A base64-encoded PNG image of the chart.
-    """
-    _, ax = plt.subplots()
-    if (end_date - start_date).days == 0:  # only one day - line chart
-        df.plot(x="time", y="used_energy", ax=ax, kind="line", color="#018079")
-        ax.set_title(f"Daily energy consumption on {start_date}")
-        ax.set_xlabel("time")
-        ax.xaxis.set_major_formatter(mdates.DateFormatter("%H"))
-        ax.set_ylabel("usage (kWh)")
-    else:  # more days - bar chart
-        df["date"] = pd.to_datetime(df["time"]).dt.date
-        df_grouped = df.groupby("date").agg({"used_energy": "sum"}).reset_index()
-        df_grouped.plot(x="date", y="used_energy", ax=ax, kind="bar", color="#018079")
-        ax.set_title(f"Energy consumption in the period {start_date} - {end_date}")
-        ax.set_xlabel("date")
-        ax.set_ylabel("usage (kWh)")
-    png_image = io.BytesIO()
-    plt.savefig(png_image, format="png")
-    png_image.seek(0)
-    png_base64 = base64.b64encode(png_image.getvalue()).decode("ascii")
-    return png_base64
+        str | None: A base64-encoded PNG image of the chart, or None if it could not be rendered in time.
+    """
+    latest_time = times[-1].astype(datetime) if len(times) else None
+    key = (id_meter, day, day, "line", latest_time)
+    chart = chart_cache.get(key)
+    if chart is None:
+        chart = render_and_cache_chart(key, times, used_energy, day, day)
+    return chart
+
+
+def render_and_cache_chart(
+    key: tuple,
+    times: np.ndarray,
+    used_energy: np.ndarray,
+    start_date: datetime,
+    end_date: datetime,
+) -> str | None:
+    """
+    Render an energy usage chart in the pool of rendering processes and keep it in `chart_cache`.
 
+    Charts are rendered (see website/chart_renderer.py) with the `CHART_RENDER_WORKERS`
+    and `CHART_RENDER_TIMEOUT` settings; a chart that was not rendered in time is not cached.
 
-@home.route("/invoice")
-@login_required
-def display_invoices():
+    Args:
+        key (tuple): The key of the chart in the cache.
+        times (np.ndarray): The times of the readings (one per day for a range of days).
+        used_energy (np.ndarray): The used energy of the readings.
+        start_date (datetime): The start date of the range.
+        end_date (datetime): The end date of the range.
+
+    Returns:
+        str | None: A base64-encoded PNG image of the chart, or None if it could not be rendered in time.
     """
-    Invoices view.
+    from website.chart_renderer import render_chart_in_pool
+
+    chart = render_chart_in_pool(
+        times,
+        used_energy,
+        start_date,
+        end_date,
+        workers=current_app.config.get("CHART_RENDER_WORKERS", 2),
+        timeout=current_app.config.get("CHART_RENDER_TIMEOUT", 5.0),
+    )
+    if chart is not None:
+        chart_cache.set(key, chart)
+    return chart
+
+
+def get_raw_readings(id_meter: int, start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    Retrieve the raw readings of a meter in a time range.
+
+    Only the `time` and `used_energy` columns are selected, without building ORM objects.
+    The rows are streamed through a server-side cursor and turned into DataFrame chunks
+    of `READINGS_CHUNK_SIZE` rows, so a long range never holds all rows as Python objects at once.
+    Readings of archived months are read from the memory-mapped archive files (see website/archive.py).
 
-    This view displays the list of invoices for the logged-in user.
+    Args:
+        id_meter (int): The ID of the meter to retrieve readings for.
+        start (datetime): The start of the range (inclusive).
+        end (datetime): The end of the range (exclusive).
 
     Returns:
-        A rendered template for the invoices page.
+        pd.DataFrame: A DataFrame with `time` and `used_energy` columns, ordered by time.
     """
-    invoices = get_invoices(current_user.id_client)
-    return render_template("invoice.html", invoices=invoices)
+    import pandas as pd
+
+    archived_parts, live_parts = split_range_by_archive(start, end)
+    frames = [
+        pd.DataFrame(
+            dict(
+                zip(
+                    READING_COLUMNS,
+                    read_archived_readings(id_meter, part_start, part_end),
+                )
+            )
+        )
+        for part_start, part_end in archived_parts
+    ]
+    for part_start, part_end in live_parts:
+        result = db.session.execute(
+            select(Reading.time, Reading.used_energy)
+            .where(
+                Reading.id_meter == id_meter,
+                Reading.time >= part_start,
+                Reading.time < part_end,
+            )
+            .order_by(Reading.time)
+            .execution_options(stream_results=True, yield_per=READINGS_CHUNK_SIZE)
+        )
+        frames.extend(
+            pd.DataFrame.from_records(rows, columns=READING_COLUMNS)
+            for rows in result.partitions()
+        )
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(
+            {
+                "time": pd.Series(dtype="datetime64[ns]"),
+                "used_energy": pd.Series(dtype="float64"),
+            }
+        )
+    return pd.concat(frames, ignore_index=True).sort_values("time", ignore_index=True)
 
 
-def get_invoices(id_client: int) -> list:
+@home.route("/invoice")
+@login_required
+def display_invoices():
     """
-    Retrieve a list of invoices for a given client.
-
-    This function queries the database to get the invoices for a specified client.
-    It formats the amount to pay, billing period, and date of issue for display.
+    Invoices view.
 
-    Args:
-        id_client (int): The ID of the client to retrieve invoices for.
+    This view displays the invoices of the logged-in user, newest first, in pages of `INVOICE_PAGE_SIZE`
+    invoices (default 24). The next page starts before the billing period given in `before` (YYYY-MM-DD),
+    see website/invoices.py.
 
     Returns:
-        list: A list of Invoice objects with formatted details.
+        A rendered template for the invoices page, or 400 for an invalid `before` date.
     """
-    id_meter = Meter.query.filter_by(id_client=id_client).first().id_meter
-    invoices = Invoice.query.filter(
-        Invoice.id_meter == id_meter, Invoice.used_energy > 0
-    ).all()
-    for invoice in invoices:
-        invoice.amount_to_pay = round(invoice.amount_to_pay, 2)
-        invoice.billing_period = invoice.billing_period.strftime("%B %Y")
-        invoice.date_of_issue = invoice.date_of_issue.strftime("%Y-%m-%d %H:%M")
-    return invoices
+    before = request.args.get("before")
+    if before:
+        try:
+            before = datetime.strptime(before, "%Y-%m-%d").date()
+        except ValueError:
+            return "Invalid date.", 400
+    invoices, number_of_unpaid_invoices, next_before = get_invoice_page(
+        current_user.id_client,
+        before or None,
+        current_app.config.get("INVOICE_PAGE_SIZE", DEFAULT_INVOICE_PAGE_SIZE),
+    )
+    return render_template(
+        "invoice.html",
+        invoices=invoices,
+        num_unpaid_invoices=number_of_unpaid_invoices,
+        next_before=next_before,
+        is_first_page=not before,
+    )
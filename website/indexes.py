@@ -0,0 +1,113 @@
+"""
+Index report module.
+
+This module compares the secondary indexes declared on the SQLAlchemy models with a live database.
+It is exposed as the `index-report` Flask command:
+
+    flask --app website:create_app index-report
+
+Functions:
+    - get_declared_indexes() -> dict[str, str]:
+        Retrieves the names of the indexes declared on the models with their tables.
+
+    - get_missing_indexes() -> list[tuple[str, str]]:
+        Retrieves the declared indexes that do not exist in the database.
+
+    - get_unused_indexes() -> list[tuple[str, str, int]]:
+        Retrieves the secondary indexes that have never been scanned since the statistics were reset.
+
+    - index_report_command():
+        Prints the missing and unused indexes.
+"""
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+
+from . import db
+from . import models  # noqa: F401 (registers the tables on db.metadata)
+
+EXISTING_INDEXES_QUERY = text(
+    """
+    SELECT indexname
+    FROM pg_indexes
+    WHERE schemaname = current_schema()
+    """
+)
+
+# Scans of partition indexes are added up under the index of the partitioned table.
+UNUSED_INDEXES_QUERY = text(
+    """
+    WITH index_scans AS (
+        SELECT COALESCE(pg_inherits.inhparent, stat.indexrelid) AS indexrelid, stat.idx_scan
+        FROM pg_stat_user_indexes stat
+        LEFT JOIN pg_inherits ON pg_inherits.inhrelid = stat.indexrelid
+    )
+    SELECT index_class.relname, table_class.relname, SUM(index_scans.idx_scan)
+    FROM index_scans
+    JOIN pg_index ON pg_index.indexrelid = index_scans.indexrelid
+    JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+    JOIN pg_class table_class ON table_class.oid = pg_index.indrelid
+    WHERE NOT pg_index.indisprimary
+    AND NOT pg_index.indisunique
+    AND NOT table_class.relispartition
+    GROUP BY index_class.relname, table_class.relname
+    HAVING SUM(index_scans.idx_scan) = 0
+    ORDER BY table_class.relname, index_class.relname
+    """
+)
+
+
+def get_declared_indexes() -> dict[str, str]:
+    """
+    Retrieve the names of the indexes declared on the models with their tables.
+
+    Returns:
+        dict[str, str]: A mapping of index names to table names.
+    """
+    return {
+        index.name: table.name
+        for table in db.metadata.tables.values()
+        for index in table.indexes
+    }
+
+
+def get_missing_indexes() -> list[tuple[str, str]]:
+    """
+    Retrieve the declared indexes that do not exist in the database.
+
+    Returns:
+        list[tuple[str, str]]: The names of the missing indexes with their tables.
+    """
+    existing = {row[0] for row in db.session.execute(EXISTING_INDEXES_QUERY)}
+    return sorted(
+        (name, table)
+        for name, table in get_declared_indexes().items()
+        if name not in existing
+    )
+
+
+def get_unused_indexes() -> list[tuple[str, str, int]]:
+    """
+    Retrieve the secondary indexes that have never been scanned since the statistics were reset.
+
+    Primary keys and unique indexes are left out, as they also enforce constraints.
+
+    Returns:
+        list[tuple[str, str, int]]: The names of the unused indexes with their tables and scan counts.
+    """
+    return [tuple(row) for row in db.session.execute(UNUSED_INDEXES_QUERY)]
+
+
+@click.command("index-report")
+@with_appcontext
+def index_report_command():
+    """Report missing and unused indexes against the live database."""
+    missing = get_missing_indexes()
+    unused = get_unused_indexes()
+    click.echo(f"Missing indexes ({len(missing)}):")
+    for name, table in missing:
+        click.echo(f"  {table}.{name} (see database_myenergy/indexes.sql)")
+    click.echo(f"Unused indexes ({len(unused)}):")
+    for name, table, _ in unused:
+        click.echo(f"  {table}.{name} has not been scanned since the last stats reset")
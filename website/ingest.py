@@ -0,0 +1,224 @@
+"""
+Ingestion View Module
+
+This module lets smart meters push their readings over HTTP. A request carries a batch of readings
+as JSON or CSV, the batch is validated as a whole and handed to the write-behind queue
+(see website/write_behind.py), which writes the readings to the `reading` table in bulk.
+Meters authenticate with the `X-Api-Key` header, which has to match `INGEST_API_KEY` from website/secret.py.
+
+JSON body:
+    {"readings": [{"id_meter": 1, "time": "2024-05-01T12:00:00", "used_energy": 0.25}, ...]}
+
+CSV body (Content-Type: text/csv, the header row is optional):
+    time,used_energy,id_meter
+    2024-05-01T12:00:00,0.25,1
+
+A reading is accepted only for a month that has a partition of the `reading` table and is not archived,
+so the database does not refuse it later, when it is flushed.
+
+Routes:
+    - ingest_readings: Accepts a batch of readings and queues it for writing.
+    - display_queue_status: Returns the depth and counters of the write-behind queue.
+"""
+
+import csv
+import io
+import math
+from datetime import date, datetime
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import text
+
+from . import db, secret
+from .archive import get_archived_months
+from .cache import LRUCache
+from .write_behind import get_write_behind_queue
+
+ingest = Blueprint("ingest", __name__)
+
+CSV_COLUMNS = ("time", "used_energy", "id_meter")
+MAX_REPORTED_ERRORS = 20
+# Partitions are created months ahead (partition_manager.py create-future), so a short TTL is enough.
+PARTITIONS_TTL = 60
+
+PARTITIONS_QUERY = text(
+    """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = to_regclass('reading')
+    AND child.relname ~ '^reading_y[0-9]{4}m[0-9]{2}$'
+    """
+)
+IS_PARTITIONED_QUERY = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('reading'))"
+)
+
+partitions_cache = LRUCache(max_size=1, ttl=PARTITIONS_TTL)
+
+
+def is_authorized() -> bool:
+    """
+    Checks the API key sent by the meter.
+
+    Returns:
+        bool: True if `INGEST_API_KEY` is configured and matches the `X-Api-Key` header.
+    """
+    api_key = getattr(secret, "INGEST_API_KEY", None)
+    return bool(api_key) and request.headers.get("X-Api-Key") == api_key
+
+
+def parse_readings() -> list[dict]:
+    """
+    Reads the raw readings from a JSON or CSV request body.
+
+    Returns:
+        list[dict]: The readings as dictionaries with `time`, `used_energy` and `id_meter` keys.
+
+    Raises:
+        ValueError: If the body is neither a JSON list of readings nor CSV.
+    """
+    if request.mimetype == "text/csv":
+        rows = list(csv.reader(io.StringIO(request.get_data(as_text=True))))
+        if rows and tuple(column.strip() for column in rows[0]) == CSV_COLUMNS:
+            rows = rows[1:]
+        return [dict(zip(CSV_COLUMNS, row)) for row in rows if row]
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get("readings")
+    if not isinstance(body, list):
+        raise ValueError("Expected a JSON list of readings or a text/csv body.")
+    return body
+
+
+def query_partition_months() -> set[date] | None:
+    """
+    Retrieves the months that have a partition of the `reading` table.
+
+    Returns:
+        set[date] | None: The first days of the months with a partition,
+                          or None if the `reading` table is not partitioned.
+    """
+    if not db.session.execute(IS_PARTITIONED_QUERY).scalar():
+        return None
+    return {
+        datetime.strptime(row[0], "reading_y%Ym%m").date()
+        for row in db.session.execute(PARTITIONS_QUERY)
+    }
+
+
+def get_partition_months() -> set[date] | None:
+    """
+    Retrieves the months that have a partition of the `reading` table, cached for a minute.
+
+    Returns:
+        set[date] | None: The first days of the months with a partition,
+                          or None if the `reading` table is not partitioned.
+    """
+    return partitions_cache.get_or_set("months", query_partition_months)
+
+
+def validate_reading(
+    reading: dict, partition_months: set[date] | None = None
+) -> tuple[datetime, float, int]:
+    """
+    Converts a raw reading to the row written to the `reading` table.
+
+    Args:
+        reading (dict): A reading with `time`, `used_energy` and `id_meter` keys.
+        partition_months (set[date] | None, optional): The months that have a partition of the `reading` table;
+                                                       readings of other months are refused. Default is None
+                                                       (the months are not checked).
+
+    Returns:
+        tuple[datetime, float, int]: The reading as (time, used_energy, id_meter).
+
+    Raises:
+        ValueError: If a field is missing or has an invalid value, or the month of the reading has no partition.
+    """
+    if not isinstance(reading, dict):
+        raise ValueError("a reading must be an object")
+    try:
+        time = datetime.fromisoformat(str(reading["time"]))
+        used_energy = float(reading["used_energy"])
+        id_meter = int(reading["id_meter"])
+    except KeyError as error:
+        raise ValueError(f"missing field {error}") from None
+    except (TypeError, ValueError) as error:
+        raise ValueError(str(error)) from None
+    if time.tzinfo is not None:
+        raise ValueError("time must be a local timestamp without a time zone")
+    if not math.isfinite(used_energy) or not 0 <= used_energy < 100_000:
+        raise ValueError("used_energy must be between 0 and 100000")
+    if id_meter <= 0:
+        raise ValueError("id_meter must be positive")
+    if (
+        partition_months is not None
+        and time.date().replace(day=1) not in partition_months
+    ):
+        raise ValueError(
+            f"the month {time:%Y-%m} has no partition of the reading table"
+        )
+    return time, used_energy, id_meter
+
+
+@ingest.route("/readings", methods=["POST"])
+def ingest_readings():
+    """
+    Accepts a batch of readings and queues it for writing.
+
+    The batch is accepted only if every reading is valid and belongs to a month that has a partition
+    and is not archived.
+    When the write-behind queue is full, the batch is refused with 503 and a `Retry-After` header,
+    so that meters back off instead of piling up.
+
+    Returns:
+        JSON response with the number of accepted readings (202), the validation errors (400),
+        or the reason of the refusal (401, 413, 503).
+    """
+    if not is_authorized():
+        return jsonify({"error": "Invalid API key."}), 401
+    try:
+        raw_readings = parse_readings()
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    max_batch_size = current_app.config.get("INGEST_MAX_BATCH_SIZE", 10_000)
+    if len(raw_readings) > max_batch_size:
+        return (
+            jsonify({"error": f"A batch can hold at most {max_batch_size} readings."}),
+            413,
+        )
+    archived_months = get_archived_months()
+    partition_months = get_partition_months()
+    readings, errors = [], []
+    for position, raw_reading in enumerate(raw_readings):
+        try:
+            reading = validate_reading(raw_reading, partition_months)
+        except ValueError as error:
+            errors.append({"position": position, "error": str(error)})
+            continue
+        if reading[0].date().replace(day=1) in archived_months:
+            errors.append({"position": position, "error": "the month is archived"})
+            continue
+        readings.append(reading)
+    if errors:
+        return jsonify({"errors": errors[:MAX_REPORTED_ERRORS]}), 400
+    queue = get_write_behind_queue()
+    if not queue.put(readings):
+        response = jsonify({"error": "The ingestion queue is full, retry later."})
+        response.headers["Retry-After"] = str(math.ceil(queue.flush_interval))
+        return response, 503
+    return jsonify({"accepted": len(readings), "queue_depth": queue.depth}), 202
+
+
+@ingest.route("/status")
+def display_queue_status():
+    """
+    Returns the depth and counters of the write-behind queue.
+
+    Returns:
+        JSON response with the queue statistics, or 401 for an invalid API key.
+    """
+    if not is_authorized():
+        return jsonify({"error": "Invalid API key."}), 401
+    return jsonify(get_write_behind_queue().stats())
@@ -0,0 +1,128 @@
+"""
+Invoices module.
+
+This module reads the invoices of a client for display. The filtering, rounding and formatting are done by the database,
+and the rows are returned as read-only named tuples instead of ORM objects, so nothing is loaded into the session
+that could be modified and flushed by accident. Invoices are listed newest first in pages with keyset pagination
+on the billing period: a page starts right after the last billing period of the previous one, so every page is
+a short scan of the (id_meter, billing_period) index however many years of invoices a client has.
+
+Functions:
+    - client_meter(id_client: int) -> ScalarSelect:
+        Builds a subquery selecting the meter of a client.
+
+    - unpaid_invoices_count(id_meter) -> ScalarSelect:
+        Builds a subquery counting the unpaid invoices of a meter.
+
+    - get_invoice_page(id_client: int, before: date | None, page_size: int) -> tuple[list[Row], int, date | None]:
+        Retrieves a page of the invoices of a client with the number of unpaid invoices.
+"""
+
+from datetime import date
+
+from sqlalchemy import Numeric, cast, func, select
+
+from website import db
+from website.models import Invoice, Meter
+
+DEFAULT_INVOICE_PAGE_SIZE = 24
+
+
+def client_meter(id_client: int):
+    """
+    Build a subquery selecting the meter of a client (the first one, if there are several).
+
+    Args:
+        id_client (int): The ID of the client.
+
+    Returns:
+        ScalarSelect: The subquery, to be compared with an `id_meter` column.
+    """
+    return (
+        select(Meter.id_meter)
+        .where(Meter.id_client == id_client)
+        .order_by(Meter.id_meter)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def unpaid_invoices_count(id_meter):
+    """
+    Build a subquery counting the unpaid invoices of a meter.
+
+    Only invoices with used energy are counted, like on the invoices page. The condition matches
+    the partial index `ix_invoice_unpaid` (database_myenergy/indexes.sql).
+
+    Args:
+        id_meter: The ID of the meter, or a column or subquery holding it.
+
+    Returns:
+        ScalarSelect: The subquery.
+    """
+    return (
+        select(func.count())
+        .where(
+            Invoice.id_meter == id_meter,
+            ~Invoice.is_it_paid,
+            Invoice.used_energy > 0,
+        )
+        .correlate_except(Invoice)
+        .scalar_subquery()
+    )
+
+
+def get_invoice_page(
+    id_client: int,
+    before: date | None = None,
+    page_size: int = DEFAULT_INVOICE_PAGE_SIZE,
+) -> tuple[list, int, date | None]:
+    """
+    Retrieve a page of the invoices of a client, newest first, with the number of unpaid invoices.
+
+    The amount to pay is rounded to 2 decimal places, the billing period is formatted as "April 2024" and the date
+    of issue as "2024-05-01 00:00". One row more than the page size is fetched to know if there is a next page.
+    The unpaid invoices are counted by an uncorrelated subquery of the same statement, which the database runs once.
+
+    Args:
+        id_client (int): The ID of the client.
+        before (date | None, optional): The billing period of the last invoice of the previous page,
+                                        or None for the first page.
+        page_size (int, optional): The number of invoices on a page. Default is 24.
+
+    Returns:
+        tuple[list[Row], int, date | None]: The invoices (rows with `id_invoice`, `date_of_issue`, `amount_to_pay`,
+                                            `used_energy`, `billing_period` and `is_it_paid`), the number
+                                            of unpaid invoices and the cursor of the next page (None on the last page).
+    """
+    id_meter = client_meter(id_client)
+    query = (
+        select(
+            Invoice.id_invoice,
+            func.to_char(Invoice.date_of_issue, "YYYY-MM-DD HH24:MI").label(
+                "date_of_issue"
+            ),
+            func.round(cast(Invoice.amount_to_pay, Numeric), 2).label("amount_to_pay"),
+            Invoice.used_energy,
+            func.to_char(Invoice.billing_period, "FMMonth YYYY").label(
+                "billing_period"
+            ),
+            Invoice.is_it_paid,
+            Invoice.billing_period.label("cursor"),
+            unpaid_invoices_count(id_meter).label("unpaid_invoices"),
+        )
+        .where(Invoice.id_meter == id_meter, Invoice.used_energy > 0)
+        .order_by(Invoice.billing_period.desc())
+        .limit(page_size + 1)
+    )
+    if before is not None:
+        query = query.where(Invoice.billing_period < before)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return (
+            [],
+            db.session.execute(select(unpaid_invoices_count(id_meter))).scalar(),
+            None,
+        )
+    next_cursor = rows[page_size - 1].cursor.date() if len(rows) > page_size else None
+    return rows[:page_size], rows[0].unpaid_invoices, next_cursor
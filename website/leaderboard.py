@@ -0,0 +1,579 @@
+"""
+Leaderboard module.
+
+This module maintains the rankings of the Energy Wizards game incrementally. Every client has one score per period
+(the day, the week, the month of the start date of a challenge, and overall) in the `leaderboard_score` table.
+Points are added to the four scores in the transaction that awards them and taken back when a client resigns,
+so ranking pages read a single period from the (period, period_start, points, id_client) index: the top
+of a ranking is the end of the index range. The `leaderboard_points` table counts the clients of every score
+of a period and is updated with the scores, so the rank of a client is one plus the clients of the higher scores,
+summed over the distinct scores above it rather than over every client ranked above. Ties share a rank.
+
+The table can be rebuilt from the customized challenges with the `rebuild-leaderboard` Flask command:
+
+    flask --app website:create_app rebuild-leaderboard
+
+When a day, a week or a month closes, the top of its ranking is frozen into the `ranking_snapshot` table,
+so past rankings are plain reads of its primary key. Run the `snapshot-rankings` Flask command daily, e.g. from cron:
+
+    flask --app website:create_app snapshot-rankings
+
+Functions:
+    - get_period_start(period: str, day: date | None) -> date | None:
+        Returns the first day of the period containing a day.
+
+    - add_points(id_client: int, start_date: date | None, points: int) -> None:
+        Adds points to the scores of a client in every period of a start date.
+
+    - get_top_scores(period: str, period_start: date, page: int, page_size: int) -> list[Row]:
+        Retrieves a page of the top of a ranking.
+
+    - get_rank_with_neighbours(period: str, period_start: date, id_client: int, neighbours: int) -> list[Row]:
+        Retrieves the rank of a client with the clients right above and below.
+
+    - get_window_ranking(window: TimeWindow, limit: int) -> list[Row]:
+        Retrieves the top of a ranking of any window, such as the last 7 days.
+
+    - get_closed_periods(period: str, since: date, today: date) -> list[date]:
+        Returns the first days of the periods closed since a day.
+
+    - snapshot_ranking(period: str, period_start: date, size: int) -> int:
+        Freezes the top of the ranking of a period into the ranking history.
+
+    - snapshot_rankings(today: date | None, since: date | None, size: int) -> int:
+        Freezes the top of the daily, weekly and monthly rankings of the periods that have closed.
+
+    - get_snapshot(period: str, period_start: date) -> list[Row]:
+        Retrieves the frozen ranking of a closed period.
+
+    - get_snapshot_periods(period: str, limit: int) -> list[date]:
+        Retrieves the first days of the latest periods with a frozen ranking.
+
+    - rebuild_leaderboard() -> int:
+        Recomputes all scores from the customized challenges.
+
+    - rebuild_leaderboard_command():
+        Rebuilds the leaderboard from the command line.
+
+    - snapshot_rankings_command():
+        Freezes the rankings of closed periods from the command line.
+"""
+
+from datetime import date, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import desc, exists, func, literal, select, text, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert
+
+from . import db
+from .models import (
+    Client,
+    CustomizedChallenge,
+    LeaderboardPoints,
+    LeaderboardScore,
+    RankingSnapshot,
+)
+from .time_windows import PERIODS, TimeWindow, get_window
+
+OVERALL_PERIOD_START = date(1970, 1, 1)
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_WINDOW_RANKING_SIZE = 100
+SNAPSHOT_PERIODS = ("day", "week", "month")
+DEFAULT_SNAPSHOT_SIZE = 100
+
+REBUILD_QUERY = text(
+    """
+    INSERT INTO leaderboard_score (period, period_start, id_client, points)
+    SELECT periods.period, periods.period_start, customizedchallenge.id_client,
+           SUM(customizedchallenge.points_scored)
+    FROM customizedchallenge
+    CROSS JOIN LATERAL (VALUES
+        ('day', customizedchallenge.start_date::date),
+        ('week', date_trunc('week', customizedchallenge.start_date)::date),
+        ('month', date_trunc('month', customizedchallenge.start_date)::date),
+        ('overall', DATE '1970-01-01')
+    ) AS periods (period, period_start)
+    WHERE customizedchallenge.points_scored > 0
+    AND periods.period_start IS NOT NULL
+    GROUP BY periods.period, periods.period_start, customizedchallenge.id_client
+    """
+)
+REBUILD_POINTS_QUERY = text(
+    """
+    INSERT INTO leaderboard_points (period, period_start, points, clients)
+    SELECT period, period_start, points, COUNT(*)
+    FROM leaderboard_score
+    WHERE points > 0
+    GROUP BY period, period_start, points
+    """
+)
+
+
+def get_period_start(period: str, day: date | None) -> date | None:
+    """
+    Return the first day of the period containing a day (see website/time_windows.py).
+
+    Args:
+        period (str): 'day', 'week', 'month' or 'overall'.
+        day (date | None): The day.
+
+    Returns:
+        date | None: The first day of the period, or None if the day is missing (except for 'overall').
+
+    Raises:
+        ValueError: If the period is unknown.
+    """
+    if period == "overall":
+        return OVERALL_PERIOD_START
+    if day is None:
+        if period not in PERIODS:
+            raise ValueError(f"Unknown ranking period {period!r}")
+        return None
+    return get_window(period, day).start
+
+
+def add_points(id_client: int, start_date: date | None, points: int) -> None:
+    """
+    Add points (or take them back, if negative) to the scores of a client in every period of a start date.
+
+    The scores are upserted atomically in the current transaction, which the caller commits together
+    with the change of the customized challenge. The counts of `leaderboard_points` move from the previous
+    to the new scores in the same transaction, in the order of the primary key, so concurrent updates
+    of the same counts wait for each other without deadlocking.
+
+    Args:
+        id_client (int): The ID of the client.
+        start_date (date | None): The start date of the challenge the points were scored in.
+        points (int): The number of points to add.
+    """
+    if not points:
+        return
+    scores = [
+        {
+            "period": period,
+            "period_start": get_period_start(period, start_date),
+            "id_client": id_client,
+            "points": points,
+        }
+        for period in PERIODS
+        if get_period_start(period, start_date) is not None
+    ]
+    statement = insert(LeaderboardScore).values(scores)
+    updated = db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                LeaderboardScore.period,
+                LeaderboardScore.period_start,
+                LeaderboardScore.id_client,
+            ],
+            set_={"points": LeaderboardScore.points + statement.excluded.points},
+        ).returning(
+            LeaderboardScore.period,
+            LeaderboardScore.period_start,
+            LeaderboardScore.points,
+        )
+    ).all()
+    counts = sorted(
+        (score.period, score.period_start, score_points, clients)
+        for score in updated
+        for score_points, clients in ((score.points - points, -1), (score.points, 1))
+        if score_points > 0
+    )
+    if not counts:
+        return
+    statement = insert(LeaderboardPoints).values(
+        [
+            {
+                "period": period,
+                "period_start": period_start,
+                "points": score_points,
+                "clients": clients,
+            }
+            for period, period_start, score_points, clients in counts
+        ]
+    )
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                LeaderboardPoints.period,
+                LeaderboardPoints.period_start,
+                LeaderboardPoints.points,
+            ],
+            set_={"clients": LeaderboardPoints.clients + statement.excluded.clients},
+        )
+    )
+
+
+def _ranking_order() -> tuple:
+    """
+    Return the order of a ranking, which is the reverse order of the index.
+    """
+    return desc(LeaderboardScore.points), desc(LeaderboardScore.id_client)
+
+
+def _rank():
+    """
+    Return the rank of the score of each row: one plus the clients of the higher scores of its period,
+    summed up from `leaderboard_points`.
+    """
+    return (
+        select(func.coalesce(func.sum(LeaderboardPoints.clients), 0) + 1)
+        .where(
+            LeaderboardPoints.period == LeaderboardScore.period,
+            LeaderboardPoints.period_start == LeaderboardScore.period_start,
+            LeaderboardPoints.points > LeaderboardScore.points,
+        )
+        .scalar_subquery()
+        .label("rank")
+    )
+
+
+def get_top_scores(
+    period: str, period_start: date, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE
+) -> list:
+    """
+    Retrieve a page of the top of a ranking.
+
+    The rows are read backwards from the end of the index range of the period, so a page costs
+    as many rows as it skips and shows, whatever the number of clients. Only the rows of the page are ranked.
+
+    Args:
+        period (str): 'day', 'week', 'month' or 'overall'.
+        period_start (date): The first day of the period.
+        page (int, optional): The number of the page, from 1. Default is 1.
+        page_size (int, optional): The number of clients on a page. Default is 20.
+
+    Returns:
+        list[Row]: Rows with `rank`, `id_client`, `username` and `points`, from the best.
+    """
+    return db.session.execute(
+        select(
+            _rank(),
+            LeaderboardScore.id_client,
+            Client.username,
+            LeaderboardScore.points,
+        )
+        .join(Client, Client.id_client == LeaderboardScore.id_client)
+        .where(
+            LeaderboardScore.period == period,
+            LeaderboardScore.period_start == period_start,
+            LeaderboardScore.points > 0,
+        )
+        .order_by(*_ranking_order())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).all()
+
+
+def get_rank_with_neighbours(
+    period: str, period_start: date, id_client: int, neighbours: int = 2
+) -> list:
+    """
+    Retrieve the rank of a client with the clients right above and below in a ranking.
+
+    The neighbours are read from the index on both sides of the score of the client. Every rank is summed up
+    from the counts of the higher scores in `leaderboard_points`, so it costs one row per distinct score above it.
+
+    Args:
+        period (str): 'day', 'week', 'month' or 'overall'.
+        period_start (date): The first day of the period.
+        id_client (int): The ID of the client.
+        neighbours (int, optional): The number of clients shown on each side. Default is 2.
+
+    Returns:
+        list[Row]: Rows with `rank`, `id_client`, `username` and `points`, from the best,
+                   or an empty list if the client has no points in the period.
+    """
+    in_period = (
+        LeaderboardScore.period == period,
+        LeaderboardScore.period_start == period_start,
+    )
+    points = db.session.execute(
+        select(LeaderboardScore.points).where(
+            *in_period, LeaderboardScore.id_client == id_client
+        )
+    ).scalar()
+    if not points or points <= 0:
+        return []
+    position = tuple_(LeaderboardScore.points, LeaderboardScore.id_client)
+    key = tuple_(points, id_client)
+    columns = (
+        _rank(),
+        LeaderboardScore.id_client,
+        Client.username,
+        LeaderboardScore.points,
+    )
+    ranked = select(*columns).join(
+        Client, Client.id_client == LeaderboardScore.id_client
+    )
+    above = (
+        ranked.where(*in_period, position > key)
+        .order_by(LeaderboardScore.points, LeaderboardScore.id_client)
+        .limit(neighbours)
+        .subquery()
+    )
+    below = (
+        ranked.where(*in_period, position < key, LeaderboardScore.points > 0)
+        .order_by(*_ranking_order())
+        .limit(neighbours)
+        .subquery()
+    )
+    window = union_all(
+        select(above),
+        ranked.where(*in_period, LeaderboardScore.id_client == id_client),
+        select(below),
+    ).subquery()
+    return db.session.execute(
+        select(window).order_by(desc(window.c.points), desc(window.c.id_client))
+    ).all()
+
+
+def get_window_ranking(
+    window: TimeWindow, limit: int = DEFAULT_WINDOW_RANKING_SIZE
+) -> list:
+    """
+    Retrieve the top of a ranking of any window, such as the last 7 days, from the customized challenges.
+
+    Windows other than the periods of the leaderboard have no stored scores, so the points are summed up
+    from the challenges started in the window, which are read with a range scan of
+    `ix_customizedchallenge_start_date`.
+
+    Args:
+        window (TimeWindow): The window of the start dates of the challenges.
+        limit (int, optional): The number of clients. Default is 100.
+
+    Returns:
+        list[Row]: Rows with `rank`, `id_client`, `username` and `points`, from the best.
+    """
+    points = func.sum(CustomizedChallenge.points_scored)
+    return db.session.execute(
+        select(
+            func.rank().over(order_by=desc(points)).label("rank"),
+            Client.id_client,
+            Client.username,
+            points.label("points"),
+        )
+        .join(CustomizedChallenge, CustomizedChallenge.id_client == Client.id_client)
+        .where(window.condition(CustomizedChallenge.start_date))
+        .group_by(Client.id_client, Client.username)
+        .having(points > 0)
+        .order_by(desc(points), desc(Client.id_client))
+        .limit(limit)
+    ).all()
+
+
+def rebuild_leaderboard() -> int:
+    """
+    Recompute all scores from the customized challenges.
+
+    The table is locked against concurrent score updates for the duration of the rebuild; updates made while
+    it runs wait and are applied on top of the rebuilt scores. The counts of the scores are rebuilt from them.
+
+    Returns:
+        int: The number of scores written.
+    """
+    db.session.execute(
+        text("LOCK TABLE leaderboard_score, leaderboard_points IN EXCLUSIVE MODE")
+    )
+    db.session.execute(text("DELETE FROM leaderboard_score"))
+    written = db.session.execute(REBUILD_QUERY).rowcount
+    db.session.execute(text("DELETE FROM leaderboard_points"))
+    db.session.execute(REBUILD_POINTS_QUERY)
+    db.session.commit()
+    return written
+
+
+def get_closed_periods(period: str, since: date, today: date) -> list[date]:
+    """
+    Return the first days of the periods that started on or after a day and closed before today.
+
+    Args:
+        period (str): 'day', 'week' or 'month'.
+        since (date): The earliest first day of a period.
+        today (date): The current day; its period is still open.
+
+    Returns:
+        list[date]: The first days of the closed periods, from the oldest.
+    """
+    period_starts = []
+    window = get_window(period, since)
+    if window.start < since:
+        window = get_window(period, window.end)
+    while window.end <= today:
+        period_starts.append(window.start)
+        window = get_window(period, window.end)
+    return period_starts
+
+
+def snapshot_ranking(
+    period: str, period_start: date, size: int = DEFAULT_SNAPSHOT_SIZE
+) -> int:
+    """
+    Freeze the top of the ranking of a period into the ranking history.
+
+    A period that already has a snapshot is left unchanged.
+
+    Args:
+        period (str): 'day', 'week' or 'month'.
+        period_start (date): The first day of the period.
+        size (int, optional): The number of clients kept. Default is 100.
+
+    Returns:
+        int: The number of places written.
+    """
+    in_period = (
+        RankingSnapshot.period == period,
+        RankingSnapshot.period_start == period_start,
+    )
+    if db.session.execute(select(exists().where(*in_period))).scalar():
+        return 0
+    top = (
+        select(
+            literal(period),
+            literal(period_start),
+            _rank(),
+            LeaderboardScore.id_client,
+            Client.username,
+            LeaderboardScore.points,
+        )
+        .join(Client, Client.id_client == LeaderboardScore.id_client)
+        .where(
+            LeaderboardScore.period == period,
+            LeaderboardScore.period_start == period_start,
+            LeaderboardScore.points > 0,
+        )
+        .order_by(*_ranking_order())
+        .limit(size)
+    )
+    return db.session.execute(
+        insert(RankingSnapshot)
+        .from_select(
+            [
+                RankingSnapshot.period,
+                RankingSnapshot.period_start,
+                RankingSnapshot.rank,
+                RankingSnapshot.id_client,
+                RankingSnapshot.username,
+                RankingSnapshot.points,
+            ],
+            top,
+        )
+        .on_conflict_do_nothing()
+    ).rowcount
+
+
+def snapshot_rankings(
+    today: date | None = None,
+    since: date | None = None,
+    size: int = DEFAULT_SNAPSHOT_SIZE,
+) -> int:
+    """
+    Freeze the top of the daily, weekly and monthly rankings of the periods that have closed.
+
+    By default only the last closed period of every kind is frozen (yesterday, last week and last month), which is
+    meant to be run daily, e.g. from cron. With `since`, all periods closed since that day are frozen,
+    which fills in the history after missed runs. Points scored later in the challenges started in a frozen period
+    change the leaderboard, but not the snapshot.
+
+    Args:
+        today (date | None, optional): The current day. Default is today.
+        since (date | None, optional): The day from which closed periods are frozen. Default is the start
+                                       of the last closed period of every kind.
+        size (int, optional): The number of clients kept per period. Default is 100.
+
+    Returns:
+        int: The number of places written.
+    """
+    today = today or date.today()
+    written = 0
+    for period in SNAPSHOT_PERIODS:
+        period_since = (
+            since
+            or get_window(
+                period, get_window(period, today).start - timedelta(days=1)
+            ).start
+        )
+        for period_start in get_closed_periods(period, period_since, today):
+            written += snapshot_ranking(period, period_start, size)
+    db.session.commit()
+    return written
+
+
+def get_snapshot(period: str, period_start: date) -> list:
+    """
+    Retrieve the frozen ranking of a closed period.
+
+    Args:
+        period (str): 'day', 'week' or 'month'.
+        period_start (date): The first day of the period.
+
+    Returns:
+        list[Row]: Rows with `rank`, `id_client`, `username` and `points`, from the best.
+    """
+    return db.session.execute(
+        select(
+            RankingSnapshot.rank,
+            RankingSnapshot.id_client,
+            RankingSnapshot.username,
+            RankingSnapshot.points,
+        )
+        .where(
+            RankingSnapshot.period == period,
+            RankingSnapshot.period_start == period_start,
+        )
+        .order_by(RankingSnapshot.rank, RankingSnapshot.id_client)
+    ).all()
+
+
+def get_snapshot_periods(period: str, limit: int = 60) -> list[date]:
+    """
+    Retrieve the first days of the latest periods with a frozen ranking.
+
+    The primary key is read backwards from the latest period and only the places with rank 1 are kept,
+    so the scan stops after `limit` periods.
+
+    Args:
+        period (str): 'day', 'week' or 'month'.
+        limit (int, optional): The number of periods. Default is 60.
+
+    Returns:
+        list[date]: The first days of the periods, from the latest.
+    """
+    return list(
+        db.session.execute(
+            select(RankingSnapshot.period_start)
+            .where(RankingSnapshot.period == period, RankingSnapshot.rank == 1)
+            .group_by(RankingSnapshot.period_start)
+            .order_by(desc(RankingSnapshot.period_start))
+            .limit(limit)
+        ).scalars()
+    )
+
+
+@click.command("rebuild-leaderboard")
+@with_appcontext
+def rebuild_leaderboard_command():
+    """Recompute the leaderboard scores from the customized challenges."""
+    click.echo(f"{rebuild_leaderboard()} leaderboard scores written")
+
+
+@click.command("snapshot-rankings")
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Freeze all periods closed since this day (default: the last closed periods).",
+)
+@click.option(
+    "--size",
+    type=int,
+    default=DEFAULT_SNAPSHOT_SIZE,
+    show_default=True,
+    help="Number of places kept per period.",
+)
+@with_appcontext
+def snapshot_rankings_command(since, size):
+    """Freeze the top of the daily, weekly and monthly rankings of closed periods."""
+    written = snapshot_rankings(since=since.date() if since else None, size=size)
+    click.echo(f"{written} ranking places frozen")
@@ -14,15 +14,33 @@ The module contains the following classes:
 9. Challenge: Represents a challenge.
 10. CustomizedChallenge: Represents a customized challenge for a client.
 11. Invoice: Represents an invoice.
+12. ReadingHourly: Represents the energy used by a meter in an hour.
+13. ReadingDaily: Represents the energy used by a meter in a day.
+14. ReadingMonthly: Represents the energy used by a meter in a month.
+15. LeaderboardScore: Represents the points of a client in a ranking period.
+16. RankingSnapshot: Represents a place in the frozen ranking of a closed period.
+17. RejectedReading: Represents an ingested reading refused by the database.
+18. ReadingArchive: Represents a month of readings moved to the archive.
+19. LeaderboardPoints: Represents the number of clients with a score in a ranking period.
+
+The `reading` table is partitioned by month. When `db.create_all()` creates it (instead of the scripts in
+database_myenergy), `create_reading_partitions` adds the partitions of the current and the next months,
+so readings can be inserted right away.
 
 Each class is defined as a SQLAlchemy model with various attributes and relationships to other models.
 These models are used to create, read, update, and delete records in the corresponding database tables.
 Flask-Login is used to manage user sessions and authentication.
 """
 
+import datetime
+
 from . import db
 from flask_login import UserMixin
-from sqlalchemy.sql import func
+from sqlalchemy import event
+from sqlalchemy.sql import func, text
+
+# The number of months after the current one whose reading partitions are created with the table
+READING_PARTITION_MONTHS_AHEAD = 3
 
 
 class Post(db.Model):
@@ -74,6 +92,7 @@ class Comment(db.Model):
     """
 
     __tablename__ = "comment"
+    __table_args__ = (db.Index("ix_comment_id_post", "id_post"),)
     id_comment = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.String(200), nullable=False)
     date_created = db.Column(db.DateTime(timezone=True), default=func.now())
@@ -103,6 +122,9 @@ class Favourite(db.Model):
     """
 
     __tablename__ = "favourite"
+    __table_args__ = (
+        db.Index("ix_favourite_id_post_id_author", "id_post", "id_author"),
+    )
     id_like = db.Column(db.Integer, primary_key=True)
     date_created = db.Column(db.DateTime(timezone=True), default=func.now())
     id_author = db.Column(
@@ -146,6 +168,7 @@ class Client(db.Model, UserMixin):
     """
 
     __tablename__ = "client"
+    __table_args__ = (db.Index("ix_client_username", "username"),)
     id_client = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), nullable=True)
     name = db.Column(db.String(50))
@@ -234,6 +257,7 @@ class Meter(db.Model, UserMixin):
     """
 
     __tablename__ = "meter"
+    __table_args__ = (db.Index("ix_meter_id_client", "id_client"),)
     id_meter = db.Column(db.Integer, primary_key=True)
     id_client = db.Column(db.Integer, db.ForeignKey("client.id_client"))
     ppe = db.Column(db.String(18))
@@ -252,16 +276,24 @@ class Reading(db.Model, UserMixin):
     """
     Represents a reading from a meter.
 
+    The table is partitioned by month on `time`, so the partition key is part of the primary key.
+    A meter has at most one reading at a given time.
+
     Attributes:
-        id_reading (int): Primary key for the reading.
+        id_reading (int): Primary key for the reading, together with its time.
         time (datetime): Timestamp of when the reading was taken.
         used_energy (float): Amount of energy used.
         id_meter (int): Foreign key referencing the meter the reading belongs to.
     """
 
     __tablename__ = "reading"
-    id_reading = db.Column(db.Integer, primary_key=True)
-    time = db.Column(db.DateTime)
+    __table_args__ = (
+        db.UniqueConstraint("id_meter", "time", name="reading_id_meter_time_uq"),
+        db.Index("ix_reading_time_brin", "time", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (time)"},
+    )
+    id_reading = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    time = db.Column(db.DateTime, primary_key=True)
     used_energy = db.Column(db.Float)
     id_meter = db.Column(db.Integer, db.ForeignKey("meter.id_meter"))
 
@@ -272,6 +304,91 @@ class Reading(db.Model, UserMixin):
         return self.id_reading
 
 
+@event.listens_for(Reading.__table__, "after_create")
+def create_reading_partitions(target, connection, **kw):
+    """
+    Create the partitions of the current and the next months right after the reading table is created.
+
+    A partitioned table without partitions rejects every insert. The partitions are named like the ones
+    of database_myenergy/partitioning.sql (`reading_yYYYYmMM`), which keeps later months coming.
+
+    Args:
+        target (Table): The reading table.
+        connection (Connection): The connection that created the table.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    month = datetime.date.today().replace(day=1)
+    for _ in range(READING_PARTITION_MONTHS_AHEAD + 1):
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS reading_y{month:%Y}m{month:%m} "
+                f"PARTITION OF {target.name} "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month}')"
+            )
+        )
+        month = next_month
+
+
+class ReadingHourly(db.Model):
+    """
+    Represents the energy used by a meter in an hour.
+
+    The rollup tables are kept up to date by the `refresh_reading_rollups` and `refresh_reading_rollup_buckets`
+    SQL functions (database_myenergy/rollups.sql), which recompute only the buckets touched by new readings
+    and delete the ones left without readings.
+
+    Attributes:
+        id_meter (int): Foreign key referencing the meter, part of the primary key.
+        bucket (datetime): The start of the hour, part of the primary key.
+        used_energy (float): Amount of energy used in the hour.
+        readings (int): Number of readings summed up in the bucket.
+    """
+
+    __tablename__ = "reading_hourly"
+    id_meter = db.Column(db.Integer, db.ForeignKey("meter.id_meter"), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    used_energy = db.Column(db.Float)
+    readings = db.Column(db.Integer)
+
+
+class ReadingDaily(db.Model):
+    """
+    Represents the energy used by a meter in a day.
+
+    Attributes:
+        id_meter (int): Foreign key referencing the meter, part of the primary key.
+        bucket (date): The day, part of the primary key.
+        used_energy (float): Amount of energy used in the day.
+        readings (int): Number of readings summed up in the bucket.
+    """
+
+    __tablename__ = "reading_daily"
+    id_meter = db.Column(db.Integer, db.ForeignKey("meter.id_meter"), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    used_energy = db.Column(db.Float)
+    readings = db.Column(db.Integer)
+
+
+class ReadingMonthly(db.Model):
+    """
+    Represents the energy used by a meter in a month.
+
+    Attributes:
+        id_meter (int): Foreign key referencing the meter, part of the primary key.
+        bucket (date): The first day of the month, part of the primary key.
+        used_energy (float): Amount of energy used in the month.
+        readings (int): Number of readings summed up in the bucket.
+    """
+
+    __tablename__ = "reading_monthly"
+    id_meter = db.Column(db.Integer, db.ForeignKey("meter.id_meter"), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    used_energy = db.Column(db.Float)
+    readings = db.Column(db.Integer)
+
+
 class Offer(db.Model, UserMixin):
     """
     Represents an offer.
@@ -338,6 +455,12 @@ class CustomizedChallenge(db.Model, UserMixin):
     """
 
     __tablename__ = "customizedchallenge"
+    __table_args__ = (
+        db.Index(
+            "ix_customizedchallenge_id_client_id_challenge", "id_client", "id_challenge"
+        ),
+        db.Index("ix_customizedchallenge_start_date", "start_date"),
+    )
     id_customized_challenge = db.Column(db.Integer, primary_key=True)
     id_client = db.Column(db.Integer, db.ForeignKey("client.id_client"))
     id_challenge = db.Column(db.Integer, db.ForeignKey("challenge.id_challenge"))
@@ -368,6 +491,14 @@ class Invoice(db.Model, UserMixin):
     """
 
     __tablename__ = "invoice"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "id_meter", "billing_period", name="invoice_id_meter_billing_period_uq"
+        ),
+        db.Index(
+            "ix_invoice_unpaid", "id_meter", postgresql_where=text("NOT is_it_paid")
+        ),
+    )
     id_invoice = db.Column(db.Integer, primary_key=True)
     id_meter = db.Column(db.Integer, db.ForeignKey("meter.id_meter"))
     date_of_issue = db.Column(db.Date)
@@ -375,3 +506,125 @@ class Invoice(db.Model, UserMixin):
     used_energy = db.Column(db.Float)
     billing_period = db.Column(db.DateTime)
     is_it_paid = db.Column(db.Boolean)
+
+
+class LeaderboardScore(db.Model):
+    """
+    Represents the points of a client in a ranking period.
+
+    The scores are kept up to date by website/leaderboard.py whenever points are awarded or taken back,
+    so the rankings read one period of this table instead of summing up all customized challenges.
+
+    Attributes:
+        period (str): The kind of the period - 'day', 'week', 'month' or 'overall', part of the primary key.
+        period_start (date): The first day of the period, part of the primary key.
+        id_client (int): Foreign key referencing the client, part of the primary key.
+        points (int): Points scored by the client in the challenges started in the period.
+    """
+
+    __tablename__ = "leaderboard_score"
+    __table_args__ = (
+        db.Index(
+            "ix_leaderboard_score_rank", "period", "period_start", "points", "id_client"
+        ),
+    )
+    period = db.Column(db.String(7), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    id_client = db.Column(
+        db.Integer, db.ForeignKey("client.id_client"), primary_key=True
+    )
+    points = db.Column(db.Integer, nullable=False)
+
+
+class LeaderboardPoints(db.Model):
+    """
+    Represents the number of clients with a score in a ranking period.
+
+    The counts change together with the scores of `LeaderboardScore` (see website/leaderboard.py),
+    and the rank of a score is one plus the number of clients of the higher scores.
+
+    Attributes:
+        period (str): The kind of the period - 'day', 'week', 'month' or 'overall', part of the primary key.
+        period_start (date): The first day of the period, part of the primary key.
+        points (int): A positive score, part of the primary key.
+        clients (int): Number of clients with that score in the period.
+    """
+
+    __tablename__ = "leaderboard_points"
+    period = db.Column(db.String(7), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    points = db.Column(db.Integer, primary_key=True)
+    clients = db.Column(db.Integer, nullable=False)
+
+
+class RankingSnapshot(db.Model):
+    """
+    Represents a place in the frozen ranking of a closed period.
+
+    The top of the daily, weekly and monthly rankings is copied from the leaderboard when the period closes
+    (see `snapshot_rankings` in website/leaderboard.py), so past rankings are read in rank order from the primary key.
+
+    Attributes:
+        period (str): The kind of the period - 'day', 'week' or 'month', part of the primary key.
+        period_start (date): The first day of the period, part of the primary key.
+        rank (int): The rank of the client in the period, part of the primary key.
+        id_client (int): Foreign key referencing the client, part of the primary key.
+        username (str): The username of the client when the ranking was frozen.
+        points (int): Points scored by the client in the period.
+    """
+
+    __tablename__ = "ranking_snapshot"
+    period = db.Column(db.String(7), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    id_client = db.Column(
+        db.Integer, db.ForeignKey("client.id_client"), primary_key=True
+    )
+    username = db.Column(db.String(50))
+    points = db.Column(db.Integer, nullable=False)
+
+
+class RejectedReading(db.Model):
+    """
+    Represents an ingested reading refused by the database.
+
+    The write-behind queue of website/write_behind.py moves the readings of a failing flush here
+    (see database_myenergy/rejected_readings.sql), so they can be inspected and replayed.
+
+    Attributes:
+        id_rejected (int): Primary key for the rejected reading.
+        time (datetime): Timestamp of the reading.
+        used_energy (float): Amount of energy used.
+        id_meter (int): The meter the reading was sent for; it may not exist.
+        error (str): The error raised by the database.
+        rejected_at (datetime): Timestamp of when the reading was rejected.
+    """
+
+    __tablename__ = "reading_rejected"
+    id_rejected = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    time = db.Column(db.DateTime, nullable=False)
+    used_energy = db.Column(db.Float, nullable=False)
+    id_meter = db.Column(db.Integer, nullable=False)
+    error = db.Column(db.Text, nullable=False)
+    rejected_at = db.Column(db.DateTime, nullable=False, server_default=func.now())
+
+
+class ReadingArchive(db.Model):
+    """
+    Represents a month of readings moved to the archive.
+
+    reading_archiver.py adds a month here (see database_myenergy/partitioning.sql) when it drops its partition.
+    The rollups of listed months are kept, as their readings are only in the archive files.
+
+    Attributes:
+        month (date): The first day of the archived month, primary key.
+        file (str): The name of the archive file of the month.
+        readings (int): Number of archived readings.
+        archived_at (datetime): Timestamp of when the month was archived.
+    """
+
+    __tablename__ = "reading_archive"
+    month = db.Column(db.Date, primary_key=True)
+    file = db.Column(db.Text, nullable=False)
+    readings = db.Column(db.BigInteger, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=func.now())
@@ -0,0 +1,149 @@
+"""
+Time windows module.
+
+This module describes the periods of the rankings as half-open ranges of days, [start, end). A window is turned
+into the condition `start <= column AND column < end`, which a B-tree index on the column serves with a range scan,
+unlike conditions on `extract(day/month/year from column)`, which have to be computed for every row.
+Half-open ranges also include the whole last day of a timestamp column, and consecutive windows never overlap.
+
+Classes:
+    - TimeWindow: A half-open range of days.
+
+Functions:
+    - get_window(period: str, day: date) -> TimeWindow:
+        Returns the day, week, month or overall window containing a day.
+
+    - last_days(days: int, today: date | None) -> TimeWindow:
+        Returns the window of the last days, today included.
+
+    - custom_window(first_day: date, last_day: date) -> TimeWindow:
+        Returns the window from the first to the last day, both included.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, true
+
+PERIODS = ("day", "week", "month", "overall")
+
+
+class TimeWindow:
+    """
+    A half-open range of days, [start, end).
+
+    Attributes:
+        start (date | None): The first day of the window, or None for no lower bound.
+        end (date | None): The first day after the window, or None for no upper bound.
+    """
+
+    def __init__(self, start: date | None, end: date | None) -> None:
+        if start is not None and end is not None and start >= end:
+            raise ValueError(f"The window must end after it starts ({start} - {end})")
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"<TimeWindow [{self.start}, {self.end})>"
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, TimeWindow)
+            and self.start == other.start
+            and self.end == other.end
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.start, self.end))
+
+    def __contains__(self, day: date) -> bool:
+        if isinstance(day, datetime):
+            day = day.date()
+        return (self.start is None or self.start <= day) and (
+            self.end is None or day < self.end
+        )
+
+    @property
+    def last_day(self) -> date | None:
+        """
+        The last day of the window, or None if it has no upper bound.
+        """
+        return None if self.end is None else self.end - timedelta(days=1)
+
+    def condition(self, column):
+        """
+        Build the condition selecting the values of a date or timestamp column in the window.
+
+        Args:
+            column: The column, e.g. `CustomizedChallenge.start_date`.
+
+        Returns:
+            ColumnElement: `start <= column AND column < end`, without the missing bounds.
+        """
+        bounds = []
+        if self.start is not None:
+            bounds.append(column >= self.start)
+        if self.end is not None:
+            bounds.append(column < self.end)
+        return and_(*bounds) if bounds else true()
+
+
+def get_window(period: str, day: date) -> TimeWindow:
+    """
+    Return the day, week, month or overall window containing a day.
+
+    Weeks start on Monday.
+
+    Args:
+        period (str): 'day', 'week', 'month' or 'overall'.
+        day (date): The day.
+
+    Returns:
+        TimeWindow: The window.
+
+    Raises:
+        ValueError: If the period is unknown.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown ranking period {period!r}")
+    if isinstance(day, datetime):
+        day = day.date()
+    if period == "day":
+        return TimeWindow(day, day + timedelta(days=1))
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return TimeWindow(start, start + timedelta(days=7))
+    if period == "month":
+        start = day.replace(day=1)
+        return TimeWindow(start, (start + timedelta(days=32)).replace(day=1))
+    return TimeWindow(None, None)
+
+
+def last_days(days: int, today: date | None = None) -> TimeWindow:
+    """
+    Return the window of the last days, today included.
+
+    Args:
+        days (int): The number of days, at least 1.
+        today (date | None, optional): The last day of the window. Default is today.
+
+    Returns:
+        TimeWindow: The window.
+    """
+    if days < 1:
+        raise ValueError("The window must have at least one day")
+    end = (today or date.today()) + timedelta(days=1)
+    return TimeWindow(end - timedelta(days=days), end)
+
+
+def custom_window(first_day: date, last_day: date) -> TimeWindow:
+    """
+    Return the window from the first to the last day, both included.
+
+    Args:
+        first_day (date): The first day of the window.
+        last_day (date): The last day of the window.
+
+    Returns:
+        TimeWindow: The window.
+    """
+    return TimeWindow(first_day, last_day + timedelta(days=1))
@@ -0,0 +1,260 @@
+"""
+Weather module.
+
+This module provides the current weather of a city from the WeatherAPI (https://www.weatherapi.com/) through
+an in-process cache shared by all users of a city:
+    - A result is fresh for `ttl` seconds, during which the API is not called at all.
+    - After that, it is served stale for up to `stale_ttl` seconds more while a background thread refreshes it
+      (stale-while-revalidate), so a slow API never holds a page that has a value to show.
+    - Concurrent misses for one city are coalesced: one request fetches the weather and the others wait for it
+      (single-flight), instead of sending one API call each.
+    - Every API call has a timeout, and failures are remembered for `error_ttl` seconds, so a broken API
+      is not called on every view. A failed refresh keeps serving the last known weather.
+
+The API address is configurable (`WEATHER_API_URL` or the `MYENERGY_WEATHER_API_URL` environment variable),
+so the website can be pointed at the stub server in benchmarks/weather_stub_server.py.
+
+Classes:
+    - WeatherCache: A per-city cache of the current weather with single-flight fetches and stale-while-revalidate.
+
+Functions:
+    - fetch_current_weather(city: str, base_url: str, api_key: str, timeout: float) -> dict | None:
+        Fetches the current weather of a city from the API.
+
+    - get_weather_cache() -> WeatherCache:
+        Returns the weather cache of the current process.
+
+    - get_current_weather(city: str) -> dict | None:
+        Returns the current weather of a city, from the cache when possible.
+"""
+
+import logging
+import os
+import threading
+import time
+from functools import partial
+from typing import Callable
+
+import requests
+from flask import current_app
+
+DEFAULT_WEATHER_API_URL = "http://api.weatherapi.com/v1"
+
+logger = logging.getLogger(__name__)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class WeatherCache:
+    """
+    A per-city cache of the current weather with single-flight fetches and stale-while-revalidate.
+
+    Attributes:
+        ttl (float): The number of seconds a fetched weather is fresh.
+        stale_ttl (float): The number of seconds a weather is served stale after it stops being fresh.
+        error_ttl (float): The number of seconds a failed fetch is remembered before the API is called again.
+        wait_timeout (float): The maximum number of seconds a request waits for a fetch started by another one.
+        pid (int): The ID of the process that created the cache.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], dict | None],
+        ttl: float = 600,
+        stale_ttl: float = 3600,
+        error_ttl: float = 60,
+        wait_timeout: float = 5.0,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.wait_timeout = wait_timeout
+        self.pid = os.getpid()
+        self._fetch = fetch
+        self._entries = {}  # city -> (weather, fresh until, stale until)
+        self._in_flight = {}  # city -> event set when its fetch is over
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("fresh", "stale", "misses", "coalesced", "fetches", "errors"), 0
+        )
+
+    def get(self, city: str) -> dict | None:
+        """
+        Return the current weather of a city.
+
+        A fresh value is returned right away. A stale one is returned right away too, and a refresh is started
+        in the background unless one is running. On a miss, the first request fetches the weather and
+        the concurrent ones wait for its result.
+
+        Args:
+            city (str): The name of the city.
+
+        Returns:
+            dict | None: The `current` object of the API response, or None if the weather is unknown.
+        """
+        key = city.strip().lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                self._counters["fresh"] += 1
+                return entry[0]
+            if entry is not None and entry[0] is not None and now < entry[2]:
+                self._counters["stale"] += 1
+                if key not in self._in_flight:
+                    self._in_flight[key] = threading.Event()
+                    threading.Thread(
+                        target=self._refresh, args=(key, city), daemon=True
+                    ).start()
+                return entry[0]
+            self._counters["misses"] += 1
+            event = self._in_flight.get(key)
+            if event is None:
+                self._in_flight[key] = threading.Event()
+            else:
+                self._counters["coalesced"] += 1
+        if event is None:
+            return self._refresh(key, city)
+        event.wait(self.wait_timeout)
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def _refresh(self, key: str, city: str) -> dict | None:
+        """
+        Fetch the weather of a city, store it and wake up the requests waiting for it.
+
+        Args:
+            key (str): The key of the city in the cache.
+            city (str): The name of the city.
+
+        Returns:
+            dict | None: The weather now stored for the city.
+        """
+        try:
+            weather = self._fetch(city)
+        except Exception as error:
+            logger.warning("Weather of %s could not be fetched: %s", city, error)
+            weather = None
+        now = time.monotonic()
+        with self._lock:
+            self._counters["fetches"] += 1
+            previous = self._entries.get(key)
+            if weather is not None:
+                self._entries[key] = (
+                    weather,
+                    now + self.ttl,
+                    now + self.ttl + self.stale_ttl,
+                )
+            elif previous is not None and previous[0] is not None and now < previous[2]:
+                # Keep serving the last known weather, and retry after error_ttl
+                self._counters["errors"] += 1
+                self._entries[key] = (previous[0], now + self.error_ttl, previous[2])
+            else:
+                self._counters["errors"] += 1
+                self._entries[key] = (None, now + self.error_ttl, now + self.error_ttl)
+            stored = self._entries[key][0]
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+        return stored
+
+    def clear(self) -> None:
+        """
+        Remove all cached weather; fetches in progress are not interrupted.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Describe the state of the cache.
+
+        Returns:
+            dict: The number of cities and the counters of fresh and stale hits, misses, coalesced misses,
+                  API fetches and failed fetches.
+        """
+        with self._lock:
+            return {"cities": len(self._entries), **self._counters}
+
+
+def fetch_current_weather(
+    city: str, base_url: str, api_key: str, timeout: float = 2.0
+) -> dict | None:
+    """
+    Fetch the current weather of a city from the API.
+
+    Args:
+        city (str): The name of the city.
+        base_url (str): The address of the API, e.g. 'http://api.weatherapi.com/v1'.
+        api_key (str): The API key.
+        timeout (float, optional): The connect and read timeout in seconds. Default is 2 seconds.
+
+    Returns:
+        dict | None: The `current` object of the response (`temp_c`, `humidity`, `wind_kph`, ...),
+                     or None if the API reported an error.
+
+    Raises:
+        requests.RequestException: If the API could not be reached in time.
+    """
+    response = requests.get(
+        f"{base_url.rstrip('/')}/current.json",
+        params={"key": api_key, "q": city},
+        timeout=timeout,
+    )
+    response_json = response.json()
+    if "error" in response_json:
+        logger.warning("Weather API error for %s: %s", city, response_json["error"])
+        return None
+    return response_json["current"]
+
+
+def get_weather_cache() -> WeatherCache:
+    """
+    Return the weather cache of the current process, creating it on first use.
+
+    Its settings come from the `WEATHER_API_URL`, `WEATHER_API_TIMEOUT`, `WEATHER_TTL`, `WEATHER_STALE_TTL`
+    and `WEATHER_ERROR_TTL` configuration keys.
+
+    Returns:
+        WeatherCache: The weather cache of the current process.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None or _cache.pid != os.getpid():
+            from website.secret import WEATHER_API_KEY
+
+            config = current_app.config
+            timeout = config.get("WEATHER_API_TIMEOUT", 2.0)
+            _cache = WeatherCache(
+                partial(
+                    fetch_current_weather,
+                    base_url=config.get(
+                        "WEATHER_API_URL",
+                        os.environ.get(
+                            "MYENERGY_WEATHER_API_URL", DEFAULT_WEATHER_API_URL
+                        ),
+                    ),
+                    api_key=WEATHER_API_KEY,
+                    timeout=timeout,
+                ),
+                ttl=config.get("WEATHER_TTL", 600),
+                stale_ttl=config.get("WEATHER_STALE_TTL", 3600),
+                error_ttl=config.get("WEATHER_ERROR_TTL", 60),
+                wait_timeout=timeout * 2,
+            )
+        return _cache
+
+
+def get_current_weather(city: str) -> dict | None:
+    """
+    Return the current weather of a city, from the cache when possible.
+
+    Args:
+        city (str): The name of the city.
+
+    Returns:
+        dict | None: The `current` object of the API response, or None if the weather is unknown.
+    """
+    return get_weather_cache().get(city)
@@ -0,0 +1,346 @@
+"""
+Write-behind queue module.
+
+This module buffers meter readings accepted by the ingestion endpoint in memory and writes them to
+the `reading` table in large bulk writes from a background thread. The queue is flushed when it holds
+`flush_size` readings or when `flush_interval` seconds have passed, whichever comes first. Every flush stages
+the readings with COPY and merges them with `ON CONFLICT (id_meter, time)`, so a reading sent twice is stored once,
+then refreshes the consumption rollups of the (meter, hour) buckets it touched.
+
+A flush refused by the database because of its data (e.g. a reading for a month without a partition) is split
+in halves until the refused readings are isolated; they are moved to the `reading_rejected` table
+(see database_myenergy/rejected_readings.sql) and the rest is written, so one bad reading cannot block the queue.
+Readings of meters that do not exist are moved to `reading_rejected` by the flush itself.
+A flush that fails for any other reason, e.g. an unreachable database, is retried unchanged.
+
+The queue is bounded: when it is full, `put` refuses the batch and the endpoint answers with
+503 Service Unavailable, which tells the meters to back off and retry.
+
+Classes:
+    - ReadingWriteBehindQueue: An in-process, bounded write-behind queue of readings.
+
+Functions:
+    - get_write_behind_queue() -> ReadingWriteBehindQueue:
+        Returns the queue of the current process, starting it on first use.
+"""
+
+import atexit
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psycopg2
+from flask import Flask, current_app
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE_QUERY = (
+    "CREATE TEMPORARY TABLE IF NOT EXISTS reading_staging ("
+    "position BIGSERIAL, time timestamp NOT NULL, used_energy decimal(10,5) NOT NULL, "
+    "id_meter int NOT NULL) ON COMMIT DELETE ROWS"
+)
+COPY_QUERY = (
+    "COPY reading_staging (time, used_energy, id_meter) FROM STDIN WITH (FORMAT csv)"
+)
+# Readings of unknown meters are moved to reading_rejected before the merge, which skips them,
+# instead of failing the whole flush on the foreign key.
+REJECT_UNKNOWN_METERS_QUERY = (
+    "INSERT INTO reading_rejected (time, used_energy, id_meter, error) "
+    "SELECT time, used_energy, id_meter, 'unknown meter' FROM reading_staging "
+    "WHERE NOT EXISTS (SELECT 1 FROM meter WHERE meter.id_meter = reading_staging.id_meter)"
+)
+MERGE_QUERY = (
+    "INSERT INTO reading (time, used_energy, id_meter) "
+    "SELECT DISTINCT ON (reading_staging.id_meter, reading_staging.time) "
+    "reading_staging.time, reading_staging.used_energy, reading_staging.id_meter "
+    "FROM reading_staging JOIN meter ON meter.id_meter = reading_staging.id_meter "
+    "ORDER BY reading_staging.id_meter, reading_staging.time, reading_staging.position DESC "
+    "ON CONFLICT (id_meter, time) DO UPDATE SET used_energy = EXCLUDED.used_energy"
+)
+# The consumption rollups of the flushed (meter, hour) buckets are refreshed in the same transaction;
+# only those buckets are recomputed, however far apart the readings of a flush are.
+REFRESH_ROLLUPS_QUERY = (
+    "SELECT refresh_reading_rollup_buckets(array_agg(id_meter), array_agg(hour)) "
+    "FROM (SELECT DISTINCT id_meter, date_trunc('hour', time) AS hour FROM reading_staging) AS touched"
+)
+REJECT_QUERY = (
+    "INSERT INTO reading_rejected (time, used_energy, id_meter, error) "
+    "VALUES (%s, %s, %s, %s)"
+)
+# Errors caused by the data of a flush; the batch is split to find the refused readings.
+DATA_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError)
+# Errors of the connection; the batch is retried unchanged.
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class ReadingWriteBehindQueue:
+    """
+    An in-process, bounded write-behind queue of readings.
+
+    Attributes:
+        capacity (int): The maximum number of readings waiting to be written.
+        flush_size (int): The number of readings that triggers a flush.
+        flush_interval (float): The maximum time in seconds a reading waits before a flush.
+        flushed (int): The number of readings inserted or updated in the reading table so far.
+        failed_flushes (int): The number of flushes that failed (and were retried or split).
+        rejected (int): The number of readings of unknown meters or refused by the database,
+            moved to `reading_rejected`.
+        last_flush (datetime | None): The time of the last successful flush.
+        pid (int): The process that owns the queue and its flushing thread.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        capacity: int = 200_000,
+        flush_size: int = 10_000,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.app = app
+        self.pid = os.getpid()
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.rejected = 0
+        self.last_flush = None
+        self._readings = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name="reading-write-behind", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        """The number of readings waiting to be written."""
+        return len(self._readings)
+
+    def put(self, readings: list[tuple[datetime, float, int]]) -> bool:
+        """
+        Add a batch of readings to the queue without blocking.
+
+        Args:
+            readings (list[tuple[datetime, float, int]]): Readings as (time, used_energy, id_meter).
+
+        Returns:
+            bool: True if the batch was queued, False if the queue has no room for it (backpressure).
+        """
+        with self._condition:
+            if self._stopped or len(self._readings) + len(readings) > self.capacity:
+                return False
+            self._readings.extend(readings)
+            if len(self._readings) >= self.flush_size:
+                self._condition.notify()
+        return True
+
+    def stats(self) -> dict:
+        """
+        Describe the state of the queue.
+
+        Returns:
+            dict: The depth, capacity, flush settings and counters of the queue.
+        """
+        return {
+            "depth": self.depth,
+            "capacity": self.capacity,
+            "flush_size": self.flush_size,
+            "flush_interval": self.flush_interval,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "rejected": self.rejected,
+            "last_flush": self.last_flush.isoformat() if self.last_flush else None,
+        }
+
+    def stop(self) -> None:
+        """
+        Stop accepting readings and write the ones still waiting.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout=30)
+
+    def _run(self) -> None:
+        """
+        Flush the queue by size or time until it is stopped and empty.
+        """
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval
+                while (
+                    not self._stopped
+                    and len(self._readings) < self.flush_size
+                    and time.monotonic() < deadline
+                ):
+                    self._condition.wait(timeout=deadline - time.monotonic())
+                batch = [
+                    self._readings[position]
+                    for position in range(min(len(self._readings), self.flush_size))
+                ]
+                stopped = self._stopped
+            if batch:
+                if self._write(batch):
+                    with self._condition:
+                        for _ in batch:
+                            self._readings.popleft()
+                elif stopped:
+                    return
+                else:
+                    time.sleep(self.flush_interval)
+            elif stopped:
+                return
+
+    def _write(self, batch: list[tuple[datetime, float, int]]) -> bool:
+        """
+        Write a batch of readings, splitting it while the database refuses its data.
+
+        A single reading refused by the database is moved to `reading_rejected`. If one half of a split batch
+        is written and the other fails to reach the database, the whole batch is retried later;
+        the merge on (id_meter, time) makes writing the first half again harmless.
+
+        Args:
+            batch (list[tuple[datetime, float, int]]): Readings as (time, used_energy, id_meter).
+
+        Returns:
+            bool: True if every reading was written or rejected, False if the batch has to be retried.
+        """
+        try:
+            self._flush(batch)
+        except DATA_ERRORS as error:
+            self.failed_flushes += 1
+            if len(batch) == 1:
+                return self._reject(batch[0], error)
+            middle = len(batch) // 2
+            return self._write(batch[:middle]) and self._write(batch[middle:])
+        except Exception as error:
+            self.failed_flushes += 1
+            logger.warning(
+                "Failed to flush %d readings into the reading table, retrying: %s",
+                len(batch),
+                error,
+            )
+            return False
+        return True
+
+    def _connect(self):
+        """
+        Open a raw DB-API connection of the application's engine.
+        """
+        with self.app.app_context():
+            return db.engine.raw_connection()
+
+    def _flush(self, batch: list[tuple[datetime, float, int]]) -> None:
+        """
+        Write a batch of readings to the database in one transaction.
+
+        Args:
+            batch (list[tuple[datetime, float, int]]): Readings as (time, used_energy, id_meter).
+
+        Raises:
+            Exception: If the flush failed; nothing of the batch is written then.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(STAGING_TABLE_QUERY)
+            cursor.copy_expert(COPY_QUERY, buffer)
+            cursor.execute(REJECT_UNKNOWN_METERS_QUERY)
+            unknown = cursor.rowcount
+            cursor.execute(MERGE_QUERY)
+            merged = cursor.rowcount
+            cursor.execute(REFRESH_ROLLUPS_QUERY)
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+        if unknown:
+            logger.warning(
+                "%d readings of unknown meters moved to reading_rejected", unknown
+            )
+        self.flushed += merged
+        self.rejected += unknown
+        self.last_flush = datetime.now()
+
+    def _reject(self, reading: tuple[datetime, float, int], error: Exception) -> bool:
+        """
+        Move a reading refused by the database to the `reading_rejected` table.
+
+        If the table cannot be written for another reason than the connection, the reading is logged
+        and dropped, so that it does not block the queue.
+
+        Args:
+            reading (tuple[datetime, float, int]): The reading as (time, used_energy, id_meter).
+            error (Exception): The error raised by the database for the reading.
+
+        Returns:
+            bool: True if the reading was rejected, False if the database could not be reached.
+        """
+        message = str(error).strip()
+        try:
+            connection = self._connect()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(REJECT_QUERY, (*reading, message))
+                connection.commit()
+                cursor.close()
+            finally:
+                connection.close()
+        except CONNECTION_ERRORS as reject_error:
+            logger.warning("Failed to reject reading %s: %s", reading, reject_error)
+            return False
+        except Exception as reject_error:
+            logger.error(
+                "Dropped reading %s refused with %r; it could not be stored in reading_rejected: %s",
+                reading,
+                message,
+                reject_error,
+            )
+        else:
+            logger.warning(
+                "Reading %s refused by the database, moved to reading_rejected: %s",
+                reading,
+                message,
+            )
+        self.rejected += 1
+        return True
+
+
+def get_write_behind_queue() -> ReadingWriteBehindQueue:
+    """
+    Return the queue of the current process, starting it on first use.
+
+    The queue is created lazily, so every worker process of a pre-forking server gets its own flushing thread.
+    Its settings come from the `INGEST_QUEUE_CAPACITY`, `INGEST_FLUSH_SIZE` and `INGEST_FLUSH_INTERVAL`
+    configuration keys.
+
+    Returns:
+        ReadingWriteBehindQueue: The queue of the current process.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None or _queue.pid != os.getpid():
+            config = current_app.config
+            _queue = ReadingWriteBehindQueue(
+                current_app._get_current_object(),
+                capacity=config.get("INGEST_QUEUE_CAPACITY", 200_000),
+                flush_size=config.get("INGEST_FLUSH_SIZE", 10_000),
+                flush_interval=config.get("INGEST_FLUSH_INTERVAL", 1.0),
+            )
+            atexit.register(_queue.stop)
+        return _queue